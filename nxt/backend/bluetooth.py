@@ -14,9 +14,9 @@
 # GNU General Public License for more details.
 
 import logging
-import struct
 
 import nxt.brick
+from nxt.backend.framing import Framer
 
 logger = logging.getLogger(__name__)
 
@@ -33,10 +33,14 @@ class BluetoothSock:
     #: Connection type, used to evaluate latency.
     type = "bluetooth"
 
+    #: Several requests can be sent before reading replies, frames are buffered.
+    pipelining = True
+
     def __init__(self, bluetooth, host):
         self._bluetooth = bluetooth
         self._host = host
         self._sock = None
+        self._framer = None
 
     def __str__(self):
         return f"Bluetooth ({self._host})"
@@ -51,6 +55,7 @@ class BluetoothSock:
         sock = self._bluetooth.BluetoothSocket(self._bluetooth.RFCOMM)
         sock.connect((self._host, PORT))
         self._sock = sock
+        self._framer = Framer(sock.recv)
         return nxt.brick.Brick(self)
 
     def close(self):
@@ -59,15 +64,16 @@ class BluetoothSock:
             logger.info("closing %s connection", self)
             self._sock.close()
             self._sock = None
+            self._framer = None
 
     def send(self, data):
         """Send raw data.
 
         :param bytes data: Data to send.
         """
-        data = struct.pack("<H", len(data)) + data
+        data = Framer.frame(data)
         logger.debug("send: %s", data.hex())
-        self._sock.send(data)
+        self._sock.sendall(data)
 
     def recv(self):
         """Receive raw data.
@@ -75,10 +81,7 @@ class BluetoothSock:
         :return: Received data.
         :rtype: bytes
         """
-        data = self._sock.recv(2)
-        logger.debug("recv: %s", data.hex())
-        (plen,) = struct.unpack("<H", data)
-        data = self._sock.recv(plen)
+        data = self._framer.recv()
         logger.debug("recv: %s", data.hex())
         return data
 
@@ -12,19 +12,42 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+import asyncio
+import collections
 import glob
 import logging
+import os
 import platform
-import struct
+import select
+import threading
+import time
 import tty
 
 import nxt.brick
+from nxt.backend.framing import Framer
 
 logger = logging.getLogger(__name__)
 
 
 class DevFileSock:
-    """Device file socket connected to a NXT brick."""
+    """Device file socket connected to a NXT brick.
+
+    :param timeout: Maximum time to wait for a reply in seconds, or ``None`` to wait
+       forever.
+    :type timeout: float or None
+
+    The device file is used in non-blocking mode, waiting is done using
+    :func:`select.select` so that a dead link raises :exc:`TimeoutError` instead of
+    blocking forever. A pending wait can also be interrupted from another thread using
+    :meth:`cancel`.
+
+    The opcode of every sent command expecting a reply is remembered. When a reply is
+    abandoned after a timeout or a cancellation, it is discarded if it arrives later,
+    as its opcode does not match the one of the next command. A late reply can not be
+    told apart when the next command has the same opcode, but as this is a reply to
+    the same request, it is used. A reply which never arrives does not disturb the
+    following commands.
+    """
 
     #: Block size.
     bsize = 118
@@ -32,12 +55,32 @@ class DevFileSock:
     #: Connection type, used to evaluate latency.
     type = "bluetooth"
 
-    def __init__(self, filename):
+    def __init__(self, filename, timeout=None):
         self._filename = filename
+        self._device = None
+        self._framer = None
+        self._cancel_r = None
+        self._cancel_w = None
+        self._cancel_lock = threading.Lock()
+        self._busy = False
+        self._cancelled = False
+        self._expected = collections.deque()
+        #: Maximum time to wait for a reply in seconds, or ``None`` to wait forever.
+        self.timeout = timeout
 
     def __str__(self):
         return f"DevFile ({self._filename})"
 
+    @property
+    def pipelining(self):
+        """Whether several requests can be sent before reading replies.
+
+        Frames are buffered, but this is disabled when a :attr:`timeout` is set:
+        pipelined requests usually share the same opcode, so replies abandoned after
+        a timeout could not be told apart from the replies to the next requests.
+        """
+        return self.timeout is None
+
     def connect(self):
         """Connect to NXT brick.
 
@@ -47,6 +90,10 @@ class DevFileSock:
         logger.info("connecting via %s", self._filename)
         self._device = open(self._filename, "r+b", buffering=0)
         tty.setraw(self._device)
+        os.set_blocking(self._device.fileno(), False)
+        self._cancel_r, self._cancel_w = os.pipe()
+        self._framer = Framer(self._device.read)
+        self._expected.clear()
         return nxt.brick.Brick(self)
 
     def close(self):
@@ -55,26 +102,156 @@ class DevFileSock:
             logger.info("closing %s connection", self._filename)
             self._device.close()
             self._device = None
+            self._framer = None
+            os.close(self._cancel_r)
+            os.close(self._cancel_w)
+            self._cancel_r = None
+            self._cancel_w = None
+
+    def fileno(self):
+        """Return device file descriptor, can be used to wait for incoming data.
+
+        :return: File descriptor.
+        :rtype: int
+        """
+        return self._device.fileno()
+
+    def cancel(self):
+        """Interrupt a pending :meth:`send` or :meth:`recv` from another thread.
+
+        The interrupted call raises :exc:`ConnectionAbortedError`. Nothing is done if
+        no call is pending, the next call is not affected.
+        """
+        with self._cancel_lock:
+            if self._busy and not self._cancelled:
+                os.write(self._cancel_w, b"\0")
+                self._cancelled = True
+
+    def _begin(self):
+        """Mark the start of an operation which can be cancelled."""
+        with self._cancel_lock:
+            self._busy = True
+
+    def _end(self):
+        """Mark the end of an operation, discard any cancellation not handled."""
+        with self._cancel_lock:
+            self._busy = False
+            if self._cancelled:
+                os.read(self._cancel_r, 1)
+                self._cancelled = False
+
+    def _wait(self, write, deadline):
+        """Wait until device is ready, or raise on timeout or cancellation."""
+        if deadline is None:
+            remaining = None
+        else:
+            remaining = max(0.0, deadline - time.time())
+        if write:
+            rlist, wlist = [self._cancel_r], [self._device]
+        else:
+            rlist, wlist = [self._device, self._cancel_r], []
+        r, w, _ = select.select(rlist, wlist, [], remaining)
+        if self._cancel_r in r:
+            raise ConnectionAbortedError("operation cancelled")
+        if not r and not w:
+            raise TimeoutError("timeout waiting for %s" % self)
 
     def send(self, data):
         """Send raw data.
 
         :param bytes data: Data to send.
+        :raises TimeoutError: When device can not accept data before timeout.
+        :raises ConnectionAbortedError: When cancelled using :meth:`cancel`.
         """
-        data = struct.pack("<H", len(data)) + data
-        logger.debug("send: %s", data.hex())
-        self._device.write(data)
+        # Telegram type bit 7 is set when no reply is requested, next byte is opcode.
+        reply_opcode = data[1] if len(data) >= 2 and not data[0] & 0x80 else None
+        frame = Framer.frame(data)
+        logger.debug("send: %s", frame.hex())
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        view = memoryview(frame)
+        self._begin()
+        try:
+            while view:
+                size = self._device.write(view)
+                if size is None:
+                    self._wait(True, deadline)
+                else:
+                    view = view[size:]
+        finally:
+            self._end()
+        if reply_opcode is not None:
+            self._expected.append(reply_opcode)
+
+    def _recv_frame(self):
+        while True:
+            data = self._framer.recv_nowait()
+            if data is None:
+                return None
+            if not self._expected or len(data) < 2 or data[1] == self._expected[0]:
+                return data
+            logger.debug("drop stale reply: %s", data.hex())
+
+    def _abandon(self):
+        """Forget about replies to come, they will be dropped if they arrive."""
+        self._expected.clear()
+
+    def _received(self):
+        if self._expected:
+            self._expected.popleft()
 
     def recv(self):
         """Receive raw data.
 
         :return: Received data.
         :rtype: bytes
+        :raises TimeoutError: When no reply is received before timeout.
+        :raises ConnectionAbortedError: When cancelled using :meth:`cancel`.
         """
-        data = self._device.read(2)
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        self._begin()
+        try:
+            while True:
+                data = self._recv_frame()
+                if data is not None:
+                    break
+                self._wait(False, deadline)
+                self._framer.fill()
+        except (TimeoutError, ConnectionAbortedError):
+            self._abandon()
+            raise
+        finally:
+            self._end()
+        self._received()
         logger.debug("recv: %s", data.hex())
-        (plen,) = struct.unpack("<H", data)
-        data = self._device.read(plen)
+        return data
+
+    async def recv_async(self):
+        """Receive raw data, to be used with :mod:`asyncio`.
+
+        :return: Received data.
+        :rtype: bytes
+
+        Use :func:`asyncio.wait_for` to apply a timeout, the :attr:`timeout`
+        attribute is not used.
+        """
+        loop = asyncio.get_running_loop()
+        fd = self.fileno()
+        try:
+            while True:
+                data = self._recv_frame()
+                if data is not None:
+                    break
+                ready = loop.create_future()
+                loop.add_reader(fd, ready.set_result, None)
+                try:
+                    await ready
+                finally:
+                    loop.remove_reader(fd)
+                self._framer.fill()
+        except asyncio.CancelledError:
+            self._abandon()
+            raise
+        self._received()
         logger.debug("recv: %s", data.hex())
         return data
 
@@ -108,13 +285,16 @@ class Backend:
     communicate with the NXT brick.
     """
 
-    def find(self, name=None, filename=None, **kwargs):
+    def find(self, name=None, filename=None, devfile_timeout=None, **kwargs):
         """Find bricks connected using Bluetooth using device file.
 
         :param name: Brick name (example: ``"NXT"``).
         :type name: str or None
         :param filename: Device file name (example: ``"/dev/rfcomm0"``).
         :type filename: str or None
+        :param devfile_timeout: Maximum time to wait for a reply in seconds, or
+           ``None`` to wait forever.
+        :type devfile_timeout: str or float or None
         :param kwargs: Other parameters are ignored.
         :return: Iterator over all found bricks.
         :rtype: Iterator[Brick]
@@ -132,8 +312,10 @@ class Backend:
                     matches = glob.glob("/dev/*-DevB*")
             else:
                 matches = []
+        if devfile_timeout is not None:
+            devfile_timeout = float(devfile_timeout)
         for match in matches:
-            sock = DevFileSock(match)
+            sock = DevFileSock(match, devfile_timeout)
             try:
                 brick = sock.connect()
             except OSError:
@@ -0,0 +1,108 @@
+# nxt.backend.framing module -- Length prefixed frames handling
+# Copyright (C) 2021  Nicolas Schodet
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import collections
+import struct
+
+# Size of the length prefix.
+HEADER_SIZE = 2
+
+# Size requested to the underlying stream on each read.
+READ_SIZE = 1024
+
+
+class Framer:
+    """Split a byte stream into length prefixed frames.
+
+    :param read: Function reading from the stream, called with a maximum size, must
+       return at least one byte, an empty bytes object at end of stream, or ``None``
+       if no data is available on a non-blocking stream.
+
+    Used for Bluetooth links where each message is prefixed with its length as a 16 bit
+    little endian value. Reads are not assumed to return exactly the requested size:
+    as much data as available is read and buffered, and several complete frames can be
+    queued, waiting to be received.
+    """
+
+    def __init__(self, read):
+        self._read = read
+        self._buf = bytearray()
+        self._frames = collections.deque()
+
+    def __len__(self):
+        """Return the number of complete frames queued."""
+        return len(self._frames)
+
+    def feed(self, data):
+        """Add data to the buffer and extract complete frames.
+
+        :param bytes data: Data read from the stream.
+        """
+        buf = self._buf
+        buf += data
+        while len(buf) >= HEADER_SIZE:
+            (plen,) = struct.unpack_from("<H", buf)
+            end = HEADER_SIZE + plen
+            if len(buf) < end:
+                break
+            self._frames.append(bytes(buf[HEADER_SIZE:end]))
+            del buf[:end]
+
+    def fill(self):
+        """Read once from the stream and extract complete frames.
+
+        :raises ConnectionError: At end of stream.
+        """
+        data = self._read(READ_SIZE)
+        if data is None:
+            return
+        if not data:
+            raise ConnectionError("connection closed")
+        self.feed(data)
+
+    def recv(self):
+        """Receive the next frame, reading from the stream until it is complete.
+
+        :return: Received frame, without length prefix.
+        :rtype: bytes
+        :raises ConnectionError: At end of stream.
+        """
+        while not self._frames:
+            self.fill()
+        return self._frames.popleft()
+
+    def recv_nowait(self):
+        """Receive the next queued frame without reading from the stream.
+
+        :return: Received frame, without length prefix, or ``None`` if no complete
+           frame is queued.
+        :rtype: bytes or None
+        """
+        if self._frames:
+            return self._frames.popleft()
+        return None
+
+    def clear(self):
+        """Drop any buffered data and queued frames."""
+        self._buf.clear()
+        self._frames.clear()
+
+    @staticmethod
+    def frame(data):
+        """Prefix data with its length.
+
+        :param bytes data: Data to send.
+        :return: Framed data.
+        :rtype: bytes
+        """
+        return struct.pack("<H", len(data)) + data
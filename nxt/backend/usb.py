@@ -14,8 +14,11 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+import array
+import concurrent.futures
 import logging
 import os
+import threading
 
 import usb.core
 
@@ -29,6 +32,12 @@ ID_VENDOR_LEGO = 0x0694
 # NXT brick product ID.
 ID_PRODUCT_NXT = 0x0002
 
+# Maximum USB packet size.
+PACKET_SIZE = 64
+
+# Devices which were already reset, identified by bus and address.
+_reset_devices = set()
+
 
 class USBSock:
     """USB socket connected to a NXT brick."""
@@ -39,26 +48,31 @@ class USBSock:
     #: Connection type, used to evaluate latency.
     type = "usb"
 
-    def __init__(self, dev):
+    def __init__(self, dev, read_timeout=None, write_timeout=None):
         self._dev = dev
         self._epout = None
         self._epin = None
+        self._read_timeout = read_timeout
+        self._write_timeout = write_timeout
+        self._buf = array.array("B", bytes(PACKET_SIZE))
 
     def __str__(self):
         return "USB (Bus %03d Device %03d)" % (self._dev.bus, self._dev.address)
 
-    def connect(self):
+    def connect(self, reset=True):
         """Connect to NXT brick.
 
+        :param bool reset: ``True`` to reset the device before use.
         :return: Connected brick.
         :rtype: Brick
         """
         logger.info("connecting via %s", self)
-        if os.name != "nt":
+        if reset and os.name != "nt":
             # Do not reset device on Windows, see
             # https://github.com/schodet/nxt-python/issues/182 and
             # https://github.com/schodet/nxt-python/issues/33
             self._dev.reset()
+            _reset_devices.add((self._dev.bus, self._dev.address))
         self._dev.set_configuration()
         intf = self._dev.get_active_configuration()[(0, 0)]
         self._epout, self._epin = intf
@@ -77,7 +91,7 @@ class USBSock:
         :param bytes data: Data to send.
         """
         logger.debug("send: %s", data.hex())
-        self._epout.write(data)
+        self._epout.write(data, self._write_timeout)
 
     def recv(self):
         """Receive raw data.
@@ -85,27 +99,216 @@ class USBSock:
         :return: Received data.
         :rtype: bytes
         """
-        data = self._epin.read(64).tobytes()
+        size = self._epin.read(self._buf, self._read_timeout)
+        data = bytes(memoryview(self._buf)[:size])
         logger.debug("recv: %s", data.hex())
         return data
 
 
+def _check_params(read_timeout, write_timeout, reset):
+    if reset not in ("always", "once", "never"):
+        raise ValueError("invalid usb_reset value")
+    if read_timeout is not None:
+        read_timeout = int(read_timeout)
+    if write_timeout is not None:
+        write_timeout = int(write_timeout)
+    return read_timeout, write_timeout
+
+
+def _find_devices():
+    return usb.core.find(
+        find_all=True, idVendor=ID_VENDOR_LEGO, idProduct=ID_PRODUCT_NXT
+    )
+
+
+def _connect(dev, read_timeout, write_timeout, reset):
+    sock = USBSock(dev, read_timeout, write_timeout)
+    if reset == "once":
+        do_reset = (dev.bus, dev.address) not in _reset_devices
+    else:
+        do_reset = reset == "always"
+    return sock.connect(do_reset)
+
+
 class Backend:
     """USB backend."""
 
-    def find(self, **kwargs):
+    def find(
+        self,
+        usb_read_timeout=None,
+        usb_write_timeout=None,
+        usb_reset="always",
+        **kwargs,
+    ):
         """Find bricks connected using USB.
 
-        :param kwargs: Parameters are ignored.
+        :param usb_read_timeout: Read timeout in milliseconds, or ``None`` to use pyusb
+           default.
+        :type usb_read_timeout: str or int or None
+        :param usb_write_timeout: Write timeout in milliseconds, or ``None`` to use
+           pyusb default.
+        :type usb_write_timeout: str or int or None
+        :param str usb_reset: When to reset the device on connection: ``"always"``
+           (default), ``"once"`` to skip reset when reattaching to a device already
+           reset by this process, or ``"never"``.
+        :param kwargs: Other parameters are ignored.
         :return: Iterator over all found bricks.
         :rtype: Iterator[Brick]
         """
-        for dev in usb.core.find(
-            find_all=True, idVendor=ID_VENDOR_LEGO, idProduct=ID_PRODUCT_NXT
-        ):
-            sock = USBSock(dev)
-            brick = sock.connect()
-            yield brick
+        usb_read_timeout, usb_write_timeout = _check_params(
+            usb_read_timeout, usb_write_timeout, usb_reset
+        )
+        for dev in _find_devices():
+            yield _connect(dev, usb_read_timeout, usb_write_timeout, usb_reset)
+
+
+class Monitor:
+    """Watch for NXT bricks plugged or unplugged on USB.
+
+    :param on_add: Function called with a connected :class:`~nxt.brick.Brick` when
+       a new brick is found.
+    :param on_remove: Function called with the :class:`~nxt.brick.Brick` when a brick
+       disappears, or ``None``.
+    :param float interval: Time between two scans in seconds.
+    :param int max_workers: Maximum number of bricks connected in parallel, or
+       ``None`` for default.
+    :param usb_read_timeout: Same as :meth:`Backend.find` parameter.
+    :param usb_write_timeout: Same as :meth:`Backend.find` parameter.
+    :param str usb_reset: Same as :meth:`Backend.find` parameter.
+
+    Devices are detected by periodically listing connected USB devices and comparing
+    with the previous list. New devices are connected concurrently, which is much
+    faster than :meth:`Backend.find` when many bricks are plugged, as the device reset
+    and configuration dominates the connection time.
+
+    Callbacks are called from the monitor thread. To feed a queue instead, give the
+    queue :meth:`~queue.Queue.put` method as callback.
+
+    Bricks given to `on_add` are owned by the caller, the monitor never closes them.
+    When a brick is unplugged, it is given to `on_remove` which should close it.
+
+    Example:
+
+    >>> import queue
+    >>> import nxt.backend.usb
+    >>> q = queue.Queue()
+    >>> monitor = nxt.backend.usb.Monitor(q.put)
+    >>> monitor.start()  # doctest: +SKIP
+    >>> brick = q.get()  # doctest: +SKIP
+    >>> monitor.stop()  # doctest: +SKIP
+    """
+
+    def __init__(
+        self,
+        on_add,
+        on_remove=None,
+        interval=1.0,
+        max_workers=None,
+        usb_read_timeout=None,
+        usb_write_timeout=None,
+        usb_reset="always",
+    ):
+        self._on_add = on_add
+        self._on_remove = on_remove
+        self._interval = interval
+        self._max_workers = max_workers
+        self._read_timeout, self._write_timeout = _check_params(
+            usb_read_timeout, usb_write_timeout, usb_reset
+        )
+        self._reset = usb_reset
+        self._bricks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def scan(self):
+        """Scan once for plugged and unplugged bricks.
+
+        :return: Newly connected bricks.
+        :rtype: list[Brick]
+
+        This is called periodically by the monitor thread once started, but it can
+        also be called directly, for example to connect all bricks at startup. It is
+        safe to call it while the monitor thread is running.
+
+        Callbacks are called after all new bricks are registered, an exception raised
+        by a callback is logged and ignored.
+        """
+        with self._lock:
+            removed, added = self._scan()
+        for brick in removed:
+            if self._on_remove is not None:
+                self._call(self._on_remove, brick)
+        for brick in added:
+            self._call(self._on_add, brick)
+        return added
+
+    def _scan(self):
+        devices = {(dev.bus, dev.address): dev for dev in _find_devices()}
+        removed = []
+        for key in list(self._bricks):
+            if key not in devices:
+                brick = self._bricks.pop(key)
+                logger.info("brick removed from %s", brick._sock)
+                removed.append(brick)
+        new = [(key, dev) for key, dev in devices.items() if key not in self._bricks]
+        added = []
+        if not new:
+            return removed, added
+        with concurrent.futures.ThreadPoolExecutor(self._max_workers) as executor:
+            futures = {
+                executor.submit(
+                    _connect, dev, self._read_timeout, self._write_timeout, self._reset
+                ): key
+                for key, dev in new
+            }
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    brick = future.result()
+                except usb.core.USBError:
+                    # Not remembered, will be retried on next scan.
+                    logger.warning("failed to connect to device %s", futures[future])
+                    logger.debug("error from connect", exc_info=True)
+                    continue
+                self._bricks[futures[future]] = brick
+                added.append(brick)
+        return removed, added
+
+    @staticmethod
+    def _call(callback, brick):
+        try:
+            callback(brick)
+        except Exception:
+            logger.exception("error from monitor callback")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except usb.core.USBError:
+                logger.warning("failed to scan USB devices")
+                logger.debug("error from scan", exc_info=True)
+            except Exception:
+                logger.exception("unexpected error from scan")
+            self._stop.wait(self._interval)
+
+    def start(self):
+        """Start monitoring in a background thread."""
+        if self._thread is not None:
+            raise RuntimeError("monitor already started")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop monitoring.
+
+        Connected bricks are not closed, they are owned by the caller.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
 
 
 def get_backend():
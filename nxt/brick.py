@@ -14,22 +14,46 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+import concurrent.futures
 import io
+import struct
 import sys
 import threading
 import time
-from collections.abc import Iterator
+from collections.abc import Generator, Iterator
 from types import TracebackType
 from typing import IO, Any, Optional, cast
 
 import nxt.error
 import nxt.motor
 import nxt.sensor
+import nxt.sensor.analog
 import nxt.sensor.digital
 from nxt.telegram import Opcode, Telegram
 
 __all__ = ["Brick"]
 
+# Weight of a new round trip time sample in link latency estimation.
+LATENCY_WEIGHT = 0.2
+
+# Output module IO map, one structure per port: TachoCnt, BlockTachoCount,
+# RotationCount, TachoLimit, MotorRPM, Flags, Mode, Speed, ActualSpeed, RegPParameter,
+# RegIParameter, RegDParameter, RunState, RegMode, Overloaded, SyncTurnParameter and
+# three spare bytes.
+OUTPUT_MODULE = "Output.mod"
+OUTPUT_IOMAP_STRUCT = struct.Struct("<iiiIhBBbbBBBBBBb3x")
+
+# Input module IO map, one structure per port: CustomZeroOffset, ADRaw, SensorRaw,
+# SensorValue, SensorType, SensorMode, SensorBoolean, DigiPinsDir, DigiPinsIn,
+# DigiPinsOut, CustomPctFullScale, CustomActiveStatus, InvalidData and three spare
+# bytes.
+INPUT_MODULE = "Input.mod"
+INPUT_IOMAP_STRUCT = struct.Struct("<HHHhBBBBBBBBB3x")
+
+# Raw value under which an analog sensor is considered connected, an unconnected
+# input is pulled up to the maximum value.
+ANALOG_DETECT_THRESHOLD = 1000
+
 
 # No Buffer before 3.12.
 if sys.version_info >= (3, 12):
@@ -107,6 +131,8 @@ class Brick:
     def __init__(self, sock) -> None:
         self._sock = sock
         self._lock = threading.Lock()
+        self._latency: Optional[float] = None
+        self._module_ids: dict[str, int] = {}
 
     def play_tone_and_wait(self, frequency_hz: int, duration_ms: int) -> None:
         """Play a tone and wait until finished.
@@ -137,6 +163,34 @@ class Brick:
     def __del__(self) -> None:
         self.close()
 
+    @property
+    def latency(self) -> Optional[float]:
+        """Estimated link round trip time in seconds, or ``None`` if not known yet.
+
+        The estimation is updated on every direct command with a reply, system
+        commands are ignored as they can take a long time to execute on the brick (for
+        example when writing to flash). Use :meth:`measure_latency` to get an initial
+        estimation.
+        """
+        return self._latency
+
+    def measure_latency(self, count: int = 5) -> float:
+        """Measure link round trip time using :meth:`keep_alive` commands.
+
+        :param count: Number of round trips.
+        :return: Estimated link round trip time in seconds.
+        """
+        for _ in range(count):
+            self.keep_alive()
+        assert self._latency is not None
+        return self._latency
+
+    def _update_latency(self, rtt: float) -> None:
+        if self._latency is None:
+            self._latency = rtt
+        else:
+            self._latency += LATENCY_WEIGHT * (rtt - self._latency)
+
     def open_file(
         self,
         name: str,
@@ -263,7 +317,9 @@ class Brick:
         finally:
             self.file_close(handle)
 
-    def find_modules(self, pattern: str = "*.*") -> Iterator[tuple[str, int, int, int]]:
+    def find_modules(
+        self, pattern: str = "*.*"
+    ) -> Generator[tuple[str, int, int, int], None, None]:
         """Find all modules matching a pattern.
 
         :param pattern: Pattern to match modules against, use ``*.*`` (default) to match
@@ -286,6 +342,42 @@ class Brick:
         finally:
             self.module_close(handle)
 
+    def _get_module_id(self, name: str) -> int:
+        """Return a module identifier, cached after first lookup.
+
+        :param name: Module name.
+        :return: Module identifier.
+        :raises nxt.error.ModuleNotFoundError: When module is not found.
+        """
+        mod_id = self._module_ids.get(name)
+        if mod_id is None:
+            modules = self.find_modules(name)
+            try:
+                _, mod_id, _, _ = next(modules)
+            except StopIteration:
+                raise nxt.error.ModuleNotFoundError(f"no module {name}") from None
+            finally:
+                modules.close()
+            self._module_ids[name] = mod_id
+        return mod_id
+
+    def _read_io_map_all(self, mod_id: int, offset: int, size: int) -> bytes:
+        """Read module IO map, using several requests if it does not fit in one.
+
+        :param mod_id: Module identifier.
+        :param offset: Offset in IO map.
+        :param size: Number of bytes to read.
+        :return: Read data.
+        """
+        data = bytearray()
+        while len(data) < size:
+            rsize = min(self._sock.bsize, size - len(data))
+            _, chunk = self.read_io_map(mod_id, offset + len(data), rsize)
+            if not chunk:
+                raise nxt.error.ProtocolError("empty IO map read")
+            data += chunk
+        return bytes(data)
+
     def get_motor(self, port: nxt.motor.Port) -> nxt.motor.Motor:
         """Return a motor object connected to one of the brick output port.
 
@@ -316,20 +408,72 @@ class Brick:
 
         For autodetection to work, the module containing the sensor class must be
         imported at least once. See modules in :mod:`nxt.sensor`.
+
+        Autodetection does not wait a fixed delay for the sensor to start, the sensor
+        is polled until it answers instead, and the returned sensor object reuses this
+        initialization.
         """
         if cls is None:
             if args or kwargs:
                 raise ValueError("extra arguments with autodetect")
             base_sensor = nxt.sensor.digital.BaseDigitalSensor(
-                self, port, check_compatible=False
+                self, port, check_compatible=False, fast_init=True
             )
-            info = base_sensor.get_sensor_info()
+            info = base_sensor.get_sensor_info(cached=True)
             return nxt.sensor.digital.find_class(info)(
                 self, port, check_compatible=False
             )
         else:
             return cls(self, port, *args, **kwargs)
 
+    def detect_sensors(
+        self, ports: Optional[list[nxt.sensor.Port]] = None
+    ) -> dict[nxt.sensor.Port, Optional[nxt.sensor.Sensor]]:
+        """Detect sensors connected to the brick input ports.
+
+        :param ports: Input ports to probe, or ``None`` for all of them.
+        :return: A mapping from input port identifier to sensor object, or ``None``
+           when nothing was detected.
+
+        All ports are probed at the same time, so that the time needed to initialize
+        the digital sensors is paid once for all ports.
+
+        On each port, digital sensors are detected like with :meth:`get_sensor`. When
+        the detected sensor has no known class, a
+        :class:`nxt.sensor.digital.BaseDigitalSensor` is returned. When no digital
+        sensor answers, the port voltage is measured and a
+        :class:`nxt.sensor.analog.BaseAnalogSensor` is returned if something pulls it
+        down. Analog sensors which do not, like a released touch sensor, can not be
+        distinguished from an empty port.
+
+        For detection to work, the modules containing the sensor classes must be
+        imported at least once. See modules in :mod:`nxt.sensor`.
+        """
+        if ports is None:
+            ports = list(nxt.sensor.Port)
+        with concurrent.futures.ThreadPoolExecutor(len(ports)) as executor:
+            sensors = list(executor.map(self._detect_sensor, ports))
+        return dict(zip(ports, sensors))
+
+    def _detect_sensor(self, port: nxt.sensor.Port) -> Optional[nxt.sensor.Sensor]:
+        """Detect sensor connected to one input port, see :meth:`detect_sensors`."""
+        digital = nxt.sensor.digital.BaseDigitalSensor(
+            self, port, check_compatible=False, fast_init=True
+        )
+        if nxt.sensor.digital.get_bus(self, port).initialized:
+            info = digital.get_sensor_info(cached=True)
+            try:
+                cls = nxt.sensor.digital.find_class(info)
+            except (nxt.sensor.digital.SearchError, KeyError):
+                return digital
+            return cls(self, port, check_compatible=False)
+        analog = nxt.sensor.analog.BaseAnalogSensor(self, port)
+        analog.set_input_mode(nxt.sensor.Type.NO_SENSOR, nxt.sensor.Mode.RAW)
+        reading = analog.get_valid_input_values()
+        if reading.raw_value < ANALOG_DETECT_THRESHOLD:
+            return analog
+        return None
+
     def _cmd(self, tgram: nxt.telegram.Telegram) -> nxt.telegram.Telegram:
         """Send a message to the NXT brick and read reply.
 
@@ -338,11 +482,40 @@ class Brick:
         """
         assert tgram.reply_req
         with self._lock:
+            start = time.time()
             self._sock.send(tgram.to_bytes())
-            reply_tgram = Telegram(opcode=tgram.opcode, pkt=self._sock.recv())
+            pkt = self._sock.recv()
+            if not tgram.opcode.is_system():
+                self._update_latency(time.time() - start)
+        reply_tgram = Telegram(opcode=tgram.opcode, pkt=pkt)
         reply_tgram.check_status()
         return reply_tgram
 
+    def _cmds(self, tgrams: list[Telegram]) -> list[Telegram]:
+        """Send several messages to the NXT brick and read replies.
+
+        :param tgrams: Messages to send.
+        :return: Reply messages after status has been checked.
+
+        If the connection supports it, all messages are sent before reading the
+        replies, so that the link latency is paid once. Connections which can time out
+        do not support it, as replies still to come after a failure could be taken as
+        the replies to the next messages.
+        """
+        if not getattr(self._sock, "pipelining", False):
+            return [self._cmd(tgram) for tgram in tgrams]
+        assert all(tgram.reply_req for tgram in tgrams)
+        with self._lock:
+            for tgram in tgrams:
+                self._sock.send(tgram.to_bytes())
+            pkts = [self._sock.recv() for tgram in tgrams]
+        reply_tgrams = []
+        for tgram, pkt in zip(tgrams, pkts):
+            reply_tgram = Telegram(opcode=tgram.opcode, pkt=pkt)
+            reply_tgram.check_status()
+            reply_tgrams.append(reply_tgram)
+        return reply_tgrams
+
     def _cmd_noreply(self, tgram: nxt.telegram.Telegram) -> None:
         """Send a message to the NXT brick with no reply.
 
@@ -455,6 +628,8 @@ class Brick:
         tgram.add_u8(sensor_type.value)
         tgram.add_u8(sensor_mode.value)
         self._cmd_noreply(tgram)
+        # Any digital sensor must be initialized again.
+        nxt.sensor.digital.reset_bus(self, port)
 
     def get_output_state(
         self, port: nxt.motor.Port
@@ -498,6 +673,120 @@ class Brick:
         tgram = Telegram(Opcode.DIRECT_GET_OUT_STATE)
         tgram.add_u8(port.value)
         tgram = self._cmd(tgram)
+        return self._parse_output_state(tgram)
+
+    def get_output_states(self, ports: list[nxt.motor.Port]) -> list[
+        tuple[
+            nxt.motor.Port,
+            int,
+            nxt.motor.Mode,
+            nxt.motor.RegulationMode,
+            int,
+            nxt.motor.RunState,
+            int,
+            int,
+            int,
+            int,
+        ]
+    ]:
+        """Get state of several output ports from the brick.
+
+        :param ports: Output port identifiers.
+        :return: A list of tuples, one for each port, see :meth:`get_output_state`.
+
+        When the connection allows it, requests are pipelined: they are all sent before
+        reading the replies, which is faster than several calls to
+        :meth:`get_output_state` over Bluetooth.
+
+        .. warning:: This is a low level function, prefer to use
+           :meth:`nxt.motor.Motor`, you can get one from :meth:`get_motor`.
+        """
+        tgrams = []
+        for port in ports:
+            tgram = Telegram(Opcode.DIRECT_GET_OUT_STATE)
+            tgram.add_u8(port.value)
+            tgrams.append(tgram)
+        return [self._parse_output_state(tgram) for tgram in self._cmds(tgrams)]
+
+    def get_all_output_states(self) -> list[
+        tuple[
+            nxt.motor.Port,
+            int,
+            nxt.motor.Mode,
+            nxt.motor.RegulationMode,
+            int,
+            nxt.motor.RunState,
+            int,
+            int,
+            int,
+            int,
+        ]
+    ]:
+        """Get state of all output ports from the output module IO map.
+
+        :return: A list of tuples, one for each port, see :meth:`get_output_state`.
+
+        The output module IO map contains the state of all ports, it is read with one
+        request on Bluetooth, two on USB where messages are smaller. Output module
+        identifier is looked up on first call.
+
+        .. warning:: This is a low level function, prefer to use
+           :meth:`nxt.motor.Motor`, you can get one from :meth:`get_motor`.
+        """
+        mod_id = self._get_module_id(OUTPUT_MODULE)
+        size = len(nxt.motor.Port) * OUTPUT_IOMAP_STRUCT.size
+        data = self._read_io_map_all(mod_id, 0, size)
+        states = []
+        for port, values in zip(nxt.motor.Port, OUTPUT_IOMAP_STRUCT.iter_unpack(data)):
+            (
+                tacho_count,
+                block_tacho_count,
+                rotation_count,
+                tacho_limit,
+                _rpm,
+                _flags,
+                mode,
+                power,
+                _actual_speed,
+                _p,
+                _i,
+                _d,
+                run_state,
+                regulation_mode,
+                _overloaded,
+                turn_ratio,
+            ) = values
+            states.append(
+                (
+                    port,
+                    power,
+                    nxt.motor.Mode(mode),
+                    nxt.motor.RegulationMode(regulation_mode),
+                    turn_ratio,
+                    nxt.motor.RunState(run_state),
+                    tacho_limit,
+                    tacho_count,
+                    block_tacho_count,
+                    rotation_count,
+                )
+            )
+        return states
+
+    @staticmethod
+    def _parse_output_state(
+        tgram: Telegram,
+    ) -> tuple[
+        nxt.motor.Port,
+        int,
+        nxt.motor.Mode,
+        nxt.motor.RegulationMode,
+        int,
+        nxt.motor.RunState,
+        int,
+        int,
+        int,
+        int,
+    ]:
         port = nxt.motor.Port(tgram.parse_u8())
         power = tgram.parse_s8()
         mode = nxt.motor.Mode(tgram.parse_u8())
@@ -581,6 +870,65 @@ class Brick:
             calibrated_value,
         )
 
+    def get_all_input_values(self) -> list[
+        tuple[
+            nxt.sensor.Port,
+            bool,
+            bool,
+            nxt.sensor.Type,
+            nxt.sensor.Mode,
+            int,
+            int,
+            int,
+            int,
+        ]
+    ]:
+        """Get values of all input ports from the input module IO map.
+
+        :return: A list of tuples, one for each port, see :meth:`get_input_values`.
+
+        The input module IO map contains the values of all ports, it is read with one
+        request on Bluetooth, two on USB where messages are smaller. Input module
+        identifier is looked up on first call.
+
+        .. warning:: This is a low level function, prefer to use
+           :class:`nxt.sensor.analog.Sampler`.
+        """
+        mod_id = self._get_module_id(INPUT_MODULE)
+        size = len(nxt.sensor.Port) * INPUT_IOMAP_STRUCT.size
+        data = self._read_io_map_all(mod_id, 0, size)
+        values = []
+        for port, fields in zip(nxt.sensor.Port, INPUT_IOMAP_STRUCT.iter_unpack(data)):
+            (
+                _custom_zero_offset,
+                raw_value,
+                normalized_value,
+                scaled_value,
+                sensor_type,
+                sensor_mode,
+                _boolean,
+                _digi_pins_dir,
+                _digi_pins_in,
+                _digi_pins_out,
+                _custom_pct_full_scale,
+                _custom_active_status,
+                invalid_data,
+            ) = fields
+            values.append(
+                (
+                    port,
+                    not invalid_data,
+                    False,
+                    nxt.sensor.Type(sensor_type),
+                    nxt.sensor.Mode(sensor_mode),
+                    raw_value,
+                    normalized_value,
+                    scaled_value,
+                    normalized_value,
+                )
+            )
+        return values
+
     def reset_input_scaled_value(self, port: nxt.sensor.Port) -> None:
         """Reset scaled value for an input port on the brick.
 
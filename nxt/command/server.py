@@ -14,28 +14,269 @@
 """Network server for the NXT brick."""
 
 import argparse
+import collections
+import http.server
 import logging
 import socket
+import threading
+import time
 import traceback
+from typing import Optional
 
 import nxt.locator
+from nxt.telegram import Opcode
+
+logger = logging.getLogger(__name__)
+
+# Number of round trip samples kept to compute latency quantiles.
+LATENCY_SAMPLES = 1000
+
+# Reported latency quantiles.
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+# Minimum interval between two battery level readings, in seconds.
+BATTERY_INTERVAL = 10.0
 
 
 def get_parser() -> argparse.ArgumentParser:
     """Return argument parser."""
     p = argparse.ArgumentParser(description=__doc__)
     p.add_argument("-p", "--port", type=int, default=2727, help="bind port")
+    p.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="serve Prometheus metrics over HTTP on this port",
+    )
+    p.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        metavar="HOST",
+        help="metrics bind address (default: 127.0.0.1)",
+    )
     nxt.locator.add_arguments(p)
     levels = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
     p.add_argument("--log-level", type=str.upper, choices=levels, help="set log level")
     return p
 
 
+def _opcode_name(code: int) -> str:
+    try:
+        return Opcode(code).name
+    except ValueError:
+        return f"0x{code:02x}"
+
+
+class Metrics:
+    """Collect server statistics and render them in Prometheus text format.
+
+    :param brick: Brick served, used to read battery level.
+    """
+
+    def __init__(self, brick: nxt.brick.Brick) -> None:
+        self._brick = brick
+        self._lock = threading.Lock()
+        self._commands: collections.Counter[tuple[str, bool]] = collections.Counter()
+        self._client_commands: collections.Counter[str] = collections.Counter()
+        self._connections: collections.Counter[str] = collections.Counter()
+        self._bytes_received = 0
+        self._bytes_sent = 0
+        self._errors = 0
+        self._queue_delay_sum = 0.0
+        self._queue_delay_count = 0
+        self._latencies: collections.deque[float] = collections.deque(
+            maxlen=LATENCY_SAMPLES
+        )
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._battery_lock = threading.Lock()
+        self._battery: Optional[int] = None
+        self._battery_time: Optional[float] = None
+
+    def connection(self, client: str) -> None:
+        """Record a new client connection."""
+        with self._lock:
+            self._connections[client] += 1
+
+    def command(
+        self,
+        client: str,
+        data: bytes,
+        reply: Optional[bytes],
+        queue_delay: float,
+        latency: Optional[float],
+    ) -> None:
+        """Record a command forwarded to the brick.
+
+        :param client: Client address.
+        :param data: Command received from client.
+        :param reply: Reply sent back to client, or ``None`` for no reply.
+        :param queue_delay: Time spent waiting for the brick to be available, in
+           seconds.
+        :param latency: Brick round trip time in seconds, or ``None`` for no reply.
+        """
+        opcode = _opcode_name(data[1]) if len(data) > 1 else "none"
+        with self._lock:
+            self._commands[opcode, reply is not None] += 1
+            self._client_commands[client] += 1
+            self._bytes_received += len(data)
+            self._queue_delay_sum += queue_delay
+            self._queue_delay_count += 1
+            if reply is not None:
+                self._bytes_sent += len(reply)
+            if latency is not None:
+                self._latencies.append(latency)
+                self._latency_sum += latency
+                self._latency_count += 1
+
+    def error(self) -> None:
+        """Record an error while serving a client."""
+        with self._lock:
+            self._errors += 1
+
+    def _read_battery(self) -> Optional[int]:
+        # Scrapes may run concurrently, only one of them should query the brick.
+        with self._battery_lock:
+            now = time.monotonic()
+            if (
+                self._battery_time is None
+                or now - self._battery_time >= BATTERY_INTERVAL
+            ):
+                self._battery_time = now
+                try:
+                    self._battery = self._brick.get_battery_level()
+                except Exception:
+                    logger.debug("error reading battery level", exc_info=True)
+                    self._battery = None
+            return self._battery
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        battery = self._read_battery()
+        out = []
+
+        def metric(name: str, typ: str, doc: str) -> None:
+            out.append(f"# HELP {name} {doc}")
+            out.append(f"# TYPE {name} {typ}")
+
+        with self._lock:
+            metric("nxt_server_commands_total", "counter", "Commands sent to brick.")
+            for (opcode, reply), count in sorted(self._commands.items()):
+                reply_str = "true" if reply else "false"
+                out.append(
+                    f'nxt_server_commands_total{{opcode="{opcode}",'
+                    f'reply="{reply_str}"}} {count}'
+                )
+            metric(
+                "nxt_server_client_commands_total",
+                "counter",
+                "Commands received per client.",
+            )
+            for client, count in sorted(self._client_commands.items()):
+                out.append(
+                    f'nxt_server_client_commands_total{{client="{client}"}} {count}'
+                )
+            metric(
+                "nxt_server_connections_total",
+                "counter",
+                "Client connections per client.",
+            )
+            for client, count in sorted(self._connections.items()):
+                out.append(f'nxt_server_connections_total{{client="{client}"}} {count}')
+            metric(
+                "nxt_server_reconnects_total",
+                "counter",
+                "Client connections from an already seen client.",
+            )
+            reconnects = sum(count - 1 for count in self._connections.values())
+            out.append(f"nxt_server_reconnects_total {reconnects}")
+            metric(
+                "nxt_server_received_bytes_total",
+                "counter",
+                "Bytes received from clients.",
+            )
+            out.append(f"nxt_server_received_bytes_total {self._bytes_received}")
+            metric("nxt_server_sent_bytes_total", "counter", "Bytes sent to clients.")
+            out.append(f"nxt_server_sent_bytes_total {self._bytes_sent}")
+            metric("nxt_server_errors_total", "counter", "Errors serving clients.")
+            out.append(f"nxt_server_errors_total {self._errors}")
+            metric(
+                "nxt_server_queue_delay_seconds",
+                "summary",
+                "Time spent waiting for the brick to be available.",
+            )
+            out.append(f"nxt_server_queue_delay_seconds_sum {self._queue_delay_sum}")
+            out.append(
+                f"nxt_server_queue_delay_seconds_count {self._queue_delay_count}"
+            )
+            metric(
+                "nxt_server_brick_latency_seconds",
+                "summary",
+                "Brick command round trip time.",
+            )
+            latencies = sorted(self._latencies)
+            if latencies:
+                for q in LATENCY_QUANTILES:
+                    value = latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+                    out.append(
+                        f'nxt_server_brick_latency_seconds{{quantile="{q}"}} {value}'
+                    )
+            out.append(f"nxt_server_brick_latency_seconds_sum {self._latency_sum}")
+            out.append(f"nxt_server_brick_latency_seconds_count {self._latency_count}")
+        if battery is not None:
+            metric("nxt_brick_battery_volts", "gauge", "Brick battery voltage.")
+            out.append(f"nxt_brick_battery_volts {battery / 1000}")
+        return "\n".join(out) + "\n"
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Serve metrics on ``/metrics``."""
+
+    metrics: Metrics
+
+    def do_GET(self) -> None:
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("metrics: " + format, *args)
+
+
+def start_metrics_server(
+    metrics: Metrics, host: str, port: int
+) -> http.server.ThreadingHTTPServer:
+    """Start a HTTP server exposing metrics in a background thread.
+
+    :param metrics: Metrics to expose.
+    :param host: Bind address.
+    :param port: Bind port.
+    :return: The started HTTP server, use its ``shutdown`` method to stop it.
+    """
+    handler = type("Handler", (MetricsHandler,), {"metrics": metrics})
+    httpd = http.server.ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
+
+
 def serve(
-    brick: nxt.brick.Brick, channel: socket.socket, details: tuple[str, int]
+    brick: nxt.brick.Brick,
+    channel: socket.socket,
+    details: tuple[str, int],
+    metrics: Optional[Metrics] = None,
 ) -> None:
     """Handles serving the client."""
     print(f"Connection from {details[0]}.")
+    client = details[0]
+    if metrics:
+        metrics.connection(client)
     run = True
     try:
         while run:
@@ -44,11 +285,22 @@ def serve(
                 break
             code = data[0]
             if code == 0x00 or code == 0x01 or code == 0x02:
-                brick._sock.send(data)
-                reply = brick._sock.recv()
+                queued = time.perf_counter()
+                with brick._lock:
+                    sent = time.perf_counter()
+                    brick._sock.send(data)
+                    reply = brick._sock.recv()
+                    received = time.perf_counter()
                 channel.send(reply)
+                if metrics:
+                    metrics.command(client, data, reply, sent - queued, received - sent)
             elif code == 0x80 or code == 0x81:
-                brick._sock.send(data)
+                queued = time.perf_counter()
+                with brick._lock:
+                    sent = time.perf_counter()
+                    brick._sock.send(data)
+                if metrics:
+                    metrics.command(client, data, None, sent - queued, None)
             elif code == 0x98:
                 channel.send(brick._sock.type.encode("ascii"))
             elif code == 0x99:
@@ -56,6 +308,8 @@ def serve(
             else:
                 raise RuntimeError("Bad protocol")
     except Exception:
+        if metrics:
+            metrics.error()
         traceback.print_exc()
     finally:
         channel.close()
@@ -71,6 +325,14 @@ def run() -> None:
 
     print("Finding brick...")
     with nxt.locator.find_with_options(options) as brick:
+        metrics = None
+        if options.metrics_port is not None:
+            metrics = Metrics(brick)
+            start_metrics_server(metrics, options.metrics_host, options.metrics_port)
+            print(
+                f"Serving metrics on http://{options.metrics_host}:"
+                f"{options.metrics_port}/metrics."
+            )
         print(f"Brick found, starting server on port {options.port}.")
         print("Use Ctrl-C to interrupt.")
         server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -80,7 +342,7 @@ def run() -> None:
             # Have the server serve "forever":
             while True:
                 channel, details = server.accept()
-                serve(brick, channel, details)
+                serve(brick, channel, details, metrics)
         except KeyboardInterrupt:
             pass
 
@@ -0,0 +1,281 @@
+# nxt.control module -- Host side closed loop motor control
+# Copyright (C) 2021  Nicolas Schodet
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import nxt.brick
+import nxt.motor
+
+__all__ = ["PID", "Controller", "LoopStats"]
+
+logger = logging.getLogger(__name__)
+
+
+class PID:
+    """Proportional, integral, derivative controller.
+
+    :param kp: Proportional gain.
+    :param ki: Integral gain, per second.
+    :param kd: Derivative gain, in seconds.
+    :param output_limit: Maximum absolute output value.
+    :param rate_limit: Maximum output change per second, or ``None`` for no limit.
+
+    The integral term is not updated when the output is saturated and the error
+    would increase the saturation, so that it does not wind up while the motor can
+    not follow.
+    """
+
+    def __init__(
+        self,
+        kp: float,
+        ki: float = 0.0,
+        kd: float = 0.0,
+        output_limit: float = 100.0,
+        rate_limit: Optional[float] = None,
+    ) -> None:
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limit = output_limit
+        self.rate_limit = rate_limit
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset controller state."""
+        self._integral = 0.0
+        self._last_error: Optional[float] = None
+        self._output = 0.0
+
+    def update(self, error: float, dt: float) -> float:
+        """Compute a new output.
+
+        :param error: Difference between target and measure.
+        :param dt: Time since last update, in seconds.
+        :return: Controller output.
+        """
+        integral = self._integral + error * dt
+        if self._last_error is not None and dt > 0:
+            derivative = (error - self._last_error) / dt
+        else:
+            derivative = 0.0
+        self._last_error = error
+        output = self.kp * error + self.ki * integral + self.kd * derivative
+        limit = self.output_limit
+        if -limit <= output <= limit or output * error < 0:
+            self._integral = integral
+        output = max(-limit, min(limit, output))
+        if self.rate_limit is not None:
+            change = self.rate_limit * dt
+            output = max(self._output - change, min(self._output + change, output))
+        self._output = output
+        return output
+
+
+@dataclass
+class LoopStats:
+    """Control loop timing statistics."""
+
+    #: Number of loop iterations.
+    ticks: int = 0
+    #: Achieved loop rate, in iterations per second.
+    rate: float = 0.0
+    #: Mean absolute difference between iteration period and requested period, in
+    #: seconds.
+    jitter_mean: float = 0.0
+    #: Maximum absolute difference between iteration period and requested period, in
+    #: seconds.
+    jitter_max: float = 0.0
+
+
+class _Loop:
+    """A motor controlled by a :class:`Controller`."""
+
+    def __init__(self, motor, pid, target, speed):
+        self.motor = motor
+        self.pid = pid
+        self.target = target
+        self.speed = speed
+        self.last_tacho = None
+        self.power = None
+
+
+class Controller:
+    """Run closed loop control of several motors of a brick at a fixed rate.
+
+    :param period: Requested time between two iterations, in seconds.
+
+    At each iteration, the state of all controlled motors is read using
+    :meth:`nxt.brick.Brick.get_output_states`, which pipelines requests when the
+    connection allows it, then a new power is computed for each motor and sent with
+    a message requiring no reply, only when it changed.
+
+    Iterations can be run from a background thread using :meth:`start`, or by calling
+    :meth:`step` directly. Use :attr:`stats` to check the loop rate achieved over the
+    used link.
+
+    >>> c = Controller(period=0.02)
+    >>> pid = PID(0.8, ki=0.5, kd=0.02, rate_limit=1000)
+    >>> c.add(m, pid, target=360)  # doctest: +SKIP
+    >>> c.start()  # doctest: +SKIP
+    """
+
+    def __init__(self, period: float = 0.02) -> None:
+        self.period = period
+        self._lock = threading.Lock()
+        self._loops: dict[nxt.motor.Port, _Loop] = {}
+        self._brick: Optional[nxt.brick.Brick] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_time: Optional[float] = None
+        self._first_time: Optional[float] = None
+        self._stats = LoopStats()
+        self._jitter_sum = 0.0
+
+    def add(
+        self,
+        motor: nxt.motor.Motor,
+        pid: PID,
+        target: float = 0,
+        speed: bool = False,
+    ) -> None:
+        """Add a motor to control.
+
+        :param motor: Motor to control.
+        :param pid: Controller used for this motor.
+        :param target: Initial target, tachometer count in degrees, or speed in degrees
+           per second.
+        :param speed: If ``True``, control the motor speed instead of its position.
+        :raises ValueError: When motor does not belong to the same brick as other
+           motors.
+        """
+        with self._lock:
+            if self._brick is not None and motor.brick is not self._brick:
+                raise ValueError("motors belong to different bricks")
+            self._brick = motor.brick
+            self._loops[motor.port] = _Loop(motor, pid, target, speed)
+
+    def set_target(self, motor: nxt.motor.Motor, target: float) -> None:
+        """Change target of a controlled motor.
+
+        :param motor: Controlled motor.
+        :param target: New target, tachometer count in degrees, or speed in degrees per
+           second.
+        """
+        with self._lock:
+            self._loops[motor.port].target = target
+
+    @property
+    def stats(self) -> LoopStats:
+        """Loop timing statistics."""
+        with self._lock:
+            return LoopStats(**vars(self._stats))
+
+    def step(self) -> None:
+        """Run one control iteration."""
+        with self._lock:
+            loops = list(self._loops.values())
+            brick = self._brick
+        if not loops:
+            return
+        assert brick is not None
+        now = time.time()
+        dt = self.period if self._last_time is None else now - self._last_time
+        states = brick.get_output_states([loop.motor.port for loop in loops])
+        for loop, values in zip(loops, states):
+            tacho = values[7]
+            if loop.speed:
+                if loop.last_tacho is None or dt <= 0:
+                    measure = 0.0
+                else:
+                    measure = (tacho - loop.last_tacho) / dt
+            else:
+                measure = tacho
+            loop.last_tacho = tacho
+            output = loop.pid.update(loop.target - measure, dt)
+            power = max(-100, min(100, round(output)))
+            if power != loop.power:
+                loop.motor.run(power)
+                loop.power = power
+        self._update_stats(now)
+
+    def _update_stats(self, now: float) -> None:
+        with self._lock:
+            stats = self._stats
+            if self._last_time is None:
+                self._first_time = now
+            else:
+                jitter = abs(now - self._last_time - self.period)
+                self._jitter_sum += jitter
+                stats.jitter_max = max(stats.jitter_max, jitter)
+                stats.jitter_mean = self._jitter_sum / stats.ticks
+                assert self._first_time is not None
+                stats.rate = stats.ticks / (now - self._first_time)
+            stats.ticks += 1
+            self._last_time = now
+
+    def _run(self) -> None:
+        start = time.time()
+        tick = 0
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception:
+                logger.exception("control loop error")
+                break
+            tick += 1
+            now = time.time()
+            delay = start + tick * self.period - now
+            if delay < 0:
+                # Late, do not try to catch up.
+                tick = int((now - start) / self.period) + 1
+                delay = start + tick * self.period - now
+            self._stop.wait(delay)
+
+    def start(self) -> None:
+        """Start control loop in a background thread, statistics are reset.
+
+        :raises RuntimeError: When already started.
+        """
+        if self._thread is not None:
+            raise RuntimeError("controller already started")
+        with self._lock:
+            self._stats = LoopStats()
+            self._jitter_sum = 0.0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, brake: bool = True) -> None:
+        """Stop control loop and motors.
+
+        :param brake: Whether to hold the motors, else they are left idle.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            loops = list(self._loops.values())
+        for loop in loops:
+            if brake:
+                loop.motor.brake()
+            else:
+                loop.motor.idle()
+            loop.power = None
+            loop.last_tacho = None
+            loop.pid.reset()
+        self._last_time = None
@@ -12,16 +12,34 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+import concurrent.futures
+import logging
 import time
 from collections.abc import Iterable
-from threading import Lock
-from typing import Union
+from threading import Condition, Event, Lock, Thread
+from typing import Optional, Union
 
 import nxt.brick
 import nxt.error
 import nxt.motor
 
-__all__ = ["MotCont"]
+__all__ = ["MotCont", "MotContScheduler", "ReadyPoller", "get_ready_poller"]
+
+logger = logging.getLogger(__name__)
+
+# Minimum delay after an is_ready command, in seconds.
+IS_READY_INTERVAL = 0.010
+
+# Minimum delay between two commands on the same motor, in seconds.
+MOTOR_INTERVAL = 0.015
+
+# Delay between is_ready request and reply, in seconds, 10 ms pause from the docs
+# seems to not be adequate.
+IS_READY_REPLY_DELAY = 0.015
+
+# Number of tries to read an is_ready reply not yet available, IS_READY_INTERVAL
+# apart.
+IS_READY_READ_TRIES = 3
 
 
 def _power(power: int) -> str:
@@ -61,30 +79,41 @@ class MotCont:
 
     def __init__(self, brick: nxt.brick.Brick) -> None:
         self._brick = brick
-        self._is_ready_lock = Lock()
+        # Serialize exchanges with MotorControl, so that the interface can be used
+        # from several threads.
+        self._lock = Lock()
         self._last_is_ready = time.time() - 1
         self._last_cmd: dict[nxt.motor.Port, float] = {}
-
-    def _interval_is_ready(self) -> None:
-        delay = 0.010
-        diff = time.time() - self._last_is_ready
-        if diff < delay:
-            time.sleep(delay - diff)
-
-    def _interval_motors(self, ports: Iterable[nxt.motor.Port]) -> None:
-        delay = 0.015
-        now = time.time()
-        diff = delay
-        for port in ports:
-            if port in self._last_cmd:
-                diff = min(diff, now - self._last_cmd[port])
-        if diff < delay:
-            time.sleep(delay - diff)
-
-    def _record_time_motors(self, ports: Iterable[nxt.motor.Port]) -> None:
-        now = time.time()
-        for port in ports:
-            self._last_cmd[port] = now
+        self._ready: dict[nxt.motor.Port, tuple[bool, float]] = {}
+        self._ready_poller: Optional["ReadyPoller"] = None
+
+    def _ready_time(
+        self, ports: Iterable[nxt.motor.Port], motor_interval: bool = True
+    ) -> float:
+        """Return the earliest time a command can be sent for the given ports."""
+        ready = self._last_is_ready + IS_READY_INTERVAL
+        if motor_interval:
+            for port in ports:
+                if port in self._last_cmd:
+                    ready = max(ready, self._last_cmd[port] + MOTOR_INTERVAL)
+        return ready
+
+    @staticmethod
+    def _wait_until(ready: float) -> None:
+        delay = ready - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send(
+        self, ports: Iterable[nxt.motor.Port], command: str, motor_interval: bool = True
+    ) -> None:
+        """Send a command as soon as allowed by MotorControl timings."""
+        with self._lock:
+            self._wait_until(self._ready_time(ports, motor_interval))
+            self._brick.message_write(1, command.encode("ascii"))
+            now = time.time()
+            for port in ports:
+                self._last_cmd[port] = now
 
     def _decode_ports(
         self, ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]], max_ports: int
@@ -134,13 +163,23 @@ class MotCont:
         In certain situations, :meth:`set_output_state` method should be used instead.
         See :meth:`set_output_state` for more details.
         """
-        self._interval_is_ready()
+        ports, command = self._cmd_command(
+            ports, power, tacholimit, speedreg, smoothstart, brake
+        )
+        self._send(ports, command)
+
+    def _cmd_command(
+        self,
+        ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]],
+        power: int,
+        tacholimit: int,
+        speedreg: bool,
+        smoothstart: bool,
+        brake: bool,
+    ) -> tuple[frozenset[nxt.motor.Port], str]:
         ports, strports = self._decode_ports(ports, 2)
-        self._interval_motors(ports)
         mode = str(0x01 * int(brake) + 0x02 * int(speedreg) + 0x04 * int(smoothstart))
-        command = "1" + strports + _power(power) + _tacho(tacholimit) + mode
-        self._brick.message_write(1, command.encode("ascii"))
-        self._record_time_motors(ports)
+        return ports, "1" + strports + _power(power) + _tacho(tacholimit) + mode
 
     def reset_tacho(
         self, ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]]
@@ -150,11 +189,8 @@ class MotCont:
         :param ports: Port or ports to control, use one of the port identifiers, or
            an iterable returning one to three of them.
         """
-        self._interval_is_ready()
         ports, strports = self._decode_ports(ports, 3)
-        command = "2" + strports
-        self._brick.message_write(1, command.encode("ascii"))
-        self._record_time_motors(ports)
+        self._send(ports, "2" + strports, motor_interval=False)
 
     def is_ready(self, port: Union[nxt.motor.Port, Iterable[nxt.motor.Port]]) -> bool:
         """Determine the state of a single motor.
@@ -163,16 +199,83 @@ class MotCont:
            returning one of them.
         :return: ``True`` if the motor is ready to accept new commands.
         """
-        self._interval_is_ready()
-        ports, strports = self._decode_ports(port, 1)
-        with self._is_ready_lock:
-            command = "3" + strports
-            self._brick.message_write(1, command.encode("ascii"))
-            time.sleep(0.015)  # 10ms pause from the docs seems to not be adequate
-            reply = self._brick.message_read(0, 1, True)[1]
-            if chr(reply[0]) != strports:
-                raise nxt.error.ProtocolError("wrong port returned from ISMOTORREADY")
-        self._last_is_ready = time.time()
+        ports, _ = self._decode_ports(port, 1)
+        return self._query_ready(ports)[next(iter(ports))]
+
+    def _query_ready(
+        self, ports: Iterable[nxt.motor.Port]
+    ) -> dict[nxt.motor.Port, bool]:
+        """Request state of several motors, waiting for all replies at once.
+
+        Requests are sent IS_READY_INTERVAL apart, replies are read after the reply
+        delay of the last request.
+        """
+        ports = sorted(ports, key=lambda port: port.value)
+        strports = [self._decode_ports(port, 1)[1] for port in ports]
+        with self._lock:
+            self._wait_until(self._ready_time(ports, motor_interval=False))
+            for i, strport in enumerate(strports):
+                if i:
+                    time.sleep(IS_READY_INTERVAL)
+                command = "3" + strport
+                self._brick.message_write(1, command.encode("ascii"))
+            time.sleep(IS_READY_REPLY_DELAY)
+            replies = [self._read_is_ready_reply() for _ in strports]
+        now = self._last_is_ready = time.time()
+        result = {}
+        # Replies are sent in order by MotorControl.
+        for port, strport, reply in zip(ports, strports, replies):
+            result[port] = self._parse_is_ready(strport, reply)
+            self._ready[port] = (result[port], now)
+        return result
+
+    def _read_is_ready_reply(self) -> bytes:
+        """Read an is_ready reply, waiting for it if not yet available."""
+        for _ in range(IS_READY_READ_TRIES - 1):
+            try:
+                return self._brick.message_read(0, 1, True)[1]
+            except nxt.error.EmptyMailboxError:
+                time.sleep(IS_READY_INTERVAL)
+        return self._brick.message_read(0, 1, True)[1]
+
+    def last_ready(self, port: nxt.motor.Port) -> Optional[tuple[bool, float]]:
+        """Return the last known state of a motor, without querying the brick.
+
+        :param port: Port to look up.
+        :return: Motor state as returned by :meth:`is_ready`, and the time it was
+           received at, as given by :func:`time.time`, or ``None`` if unknown.
+        """
+        return self._ready.get(port)
+
+    def wait_ready(
+        self,
+        ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]],
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Wait until motors are ready to accept new commands.
+
+        :param ports: Port or ports to wait for, use one of the port identifiers, or an
+           iterable returning one to three of them.
+        :param timeout: Maximum time to wait, in seconds, or ``None`` to wait forever.
+        :return: ``True`` if all motors are ready, ``False`` on timeout.
+
+        State of all the motors not yet ready is requested at once, so that waiting for
+        several motors costs a single reply delay per poll.
+        """
+        waited = list(self._decode_ports(ports, 3)[0])
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            states = self._query_ready(waited)
+            waited = [port for port in waited if not states[port]]
+            if not waited:
+                return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+
+    @staticmethod
+    def _parse_is_ready(strports: str, reply: bytes) -> bool:
+        if chr(reply[0]) != strports:
+            raise nxt.error.ProtocolError("wrong port returned from ISMOTORREADY")
         return bool(int(chr(reply[1])))
 
     def set_output_state(
@@ -206,12 +309,21 @@ class MotCont:
           regulation.
         - To stop and hold the current position (brake), use `power` 0 with regulation.
         """
-        self._interval_is_ready()
+        ports, command = self._set_output_state_command(
+            ports, power, tacholimit, speedreg
+        )
+        self._send(ports, command)
+
+    def _set_output_state_command(
+        self,
+        ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]],
+        power: int,
+        tacholimit: int,
+        speedreg: bool,
+    ) -> tuple[frozenset[nxt.motor.Port], str]:
         ports, strports = self._decode_ports(ports, 2)
-        self._interval_motors(ports)
-        command = "4" + strports + _power(power) + _tacho(tacholimit) + str(speedreg)
-        self._brick.message_write(1, command.encode("ascii"))
-        self._record_time_motors(ports)
+        mode = str(int(speedreg))
+        return ports, "4" + strports + _power(power) + _tacho(tacholimit) + mode
 
     def start(self, version: int = 22) -> None:
         """Start the MotorControl program on the brick.
@@ -225,13 +337,14 @@ class MotCont:
         .. warning:: When starting or stopping a program, the NXT firmware resets every
            sensors and motors.
         """
-        try:
-            self._brick.stop_program()
-            time.sleep(1)
-        except nxt.error.DirectProtocolError:
-            pass
-        self._brick.start_program("MotorControl%d.rxe" % version)
-        time.sleep(0.1)
+        with self._lock:
+            try:
+                self._brick.stop_program()
+                time.sleep(1)
+            except nxt.error.DirectProtocolError:
+                pass
+            self._brick.start_program("MotorControl%d.rxe" % version)
+            time.sleep(0.1)
 
     def stop(self) -> None:
         """Stop the MotorControl program.
@@ -241,4 +354,335 @@ class MotCont:
         .. warning:: When starting or stopping a program, the NXT firmware resets every
            sensors and motors.
         """
-        self._brick.stop_program()
+        with self._lock:
+            self._brick.stop_program()
+
+
+class _Request:
+    """A request queued in a :class:`MotContScheduler`."""
+
+    def __init__(
+        self,
+        kind: str,
+        ports: frozenset[nxt.motor.Port],
+        command: str,
+        motor_interval: bool = True,
+    ) -> None:
+        self.kind = kind
+        self.ports = ports
+        self.command = command
+        self.motor_interval = motor_interval
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+
+
+class MotContScheduler:
+    """Queue MotorControl commands and send them from a background worker.
+
+    :param motcont: MotorControl interface used to send commands.
+
+    MotorControl requires a minimum delay between two commands for the same motor,
+    and after a motor state request. Instead of waiting in the caller thread like
+    :class:`MotCont` does, commands are queued with the earliest time they can be sent
+    at, and a worker thread sends them as soon as possible. Commands for different
+    ports do not wait for each other, and commands for the same port are sent in
+    order.
+
+    Every method returns immediately with a :class:`concurrent.futures.Future` which
+    is resolved once the command is sent, or once the reply is received for
+    :meth:`is_ready`. No command is sent while waiting for a reply, as MotorControl
+    requires a minimum delay after a motor state request. The worker thread is started
+    when a command is queued and exits when the queue is empty.
+
+    The :class:`MotCont` methods can still be used from other threads, for example
+    by a :class:`ReadyPoller`, exchanges with MotorControl are serialized.
+
+    >>> s = MotContScheduler(mc)  # doctest: +SKIP
+    >>> s.cmd(Port.A, 50, 360)  # doctest: +SKIP
+    >>> s.cmd(Port.B, 50, 360)  # doctest: +SKIP
+    >>> s.is_ready(Port.A).result()  # doctest: +SKIP
+    """
+
+    def __init__(self, motcont: MotCont) -> None:
+        self._mc = motcont
+        self._lock = Lock()
+        self._cond = Condition(self._lock)
+        self._pending: list[_Request] = []
+        self._thread: Optional[Thread] = None
+
+    def _queue(self, request: _Request) -> concurrent.futures.Future:
+        with self._cond:
+            self._pending.append(request)
+            if self._thread is None:
+                self._start()
+            self._cond.notify()
+        return request.future
+
+    def _start(self) -> None:
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            delay = self.step()
+            with self._cond:
+                if not self._pending:
+                    self._thread = None
+                    return
+                if delay:
+                    self._cond.wait(delay)
+
+    def cmd(
+        self,
+        ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]],
+        power: int,
+        tacholimit: int,
+        speedreg: bool = True,
+        smoothstart: bool = False,
+        brake: bool = False,
+    ) -> concurrent.futures.Future:
+        """Queue a controlled motor command, see :meth:`MotCont.cmd`.
+
+        :return: A future resolved when the command is sent.
+        """
+        ports, command = self._mc._cmd_command(
+            ports, power, tacholimit, speedreg, smoothstart, brake
+        )
+        return self._queue(_Request("write", ports, command))
+
+    def reset_tacho(
+        self, ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]]
+    ) -> concurrent.futures.Future:
+        """Queue a tacho count reset, see :meth:`MotCont.reset_tacho`.
+
+        :return: A future resolved when the command is sent.
+        """
+        ports, strports = self._mc._decode_ports(ports, 3)
+        return self._queue(
+            _Request("write", ports, "2" + strports, motor_interval=False)
+        )
+
+    def set_output_state(
+        self,
+        ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]],
+        power: int,
+        tacholimit: int,
+        speedreg: bool = True,
+    ) -> concurrent.futures.Future:
+        """Queue a classic motor command, see :meth:`MotCont.set_output_state`.
+
+        :return: A future resolved when the command is sent.
+        """
+        ports, command = self._mc._set_output_state_command(
+            ports, power, tacholimit, speedreg
+        )
+        return self._queue(_Request("write", ports, command))
+
+    def is_ready(
+        self, port: Union[nxt.motor.Port, Iterable[nxt.motor.Port]]
+    ) -> concurrent.futures.Future:
+        """Queue a motor state request, see :meth:`MotCont.is_ready`.
+
+        :return: A future resolved with ``True`` if the motor is ready to accept new
+           commands.
+        """
+        ports, strports = self._mc._decode_ports(port, 1)
+        return self._queue(
+            _Request("query", ports, "3" + strports, motor_interval=False)
+        )
+
+    def _ready_time(self, request: _Request) -> float:
+        return self._mc._ready_time(request.ports, request.motor_interval)
+
+    def _select(self) -> tuple[Optional[_Request], Optional[float]]:
+        """Return the next request if due, and the delay before the next one."""
+        if not self._pending:
+            return None, None
+        busy: set = set()
+        best = None
+        best_time = 0.0
+        for request in self._pending:
+            # Only the first request using a port can be sent.
+            if not request.ports & busy:
+                ready = self._ready_time(request)
+                if best is None or ready < best_time:
+                    best, best_time = request, ready
+            busy |= request.ports
+        delay = best_time - time.time()
+        if delay > 0:
+            return None, delay
+        return best, 0.0
+
+    def step(self) -> Optional[float]:
+        """Send the next command if it is due.
+
+        :return: Delay until the next command can be sent, in seconds, or ``None``
+           if no command is queued.
+        """
+        with self._lock:
+            request, delay = self._select()
+            if request is None:
+                return delay
+            self._pending.remove(request)
+        self._execute(request)
+        with self._lock:
+            return self._select()[1]
+
+    def _execute(self, request: _Request) -> None:
+        mc = self._mc
+        if not request.future.set_running_or_notify_cancel():
+            return
+        try:
+            if request.kind == "write":
+                mc._send(request.ports, request.command, request.motor_interval)
+                request.future.set_result(None)
+            else:
+                # The whole exchange is done at once, later commands are held until
+                # the reply is received.
+                port = next(iter(request.ports))
+                request.future.set_result(mc._query_ready(request.ports)[port])
+        except Exception as e:
+            logger.debug("MotorControl request failed", exc_info=True)
+            request.future.set_exception(e)
+
+
+class ReadyPoller:
+    """Track motors state in a background thread.
+
+    :param motcont: MotorControl interface used to query motors.
+    :param period: Time between two polls, in seconds.
+
+    Watched motors are polled together until they are ready to accept new commands,
+    see :meth:`MotCont.wait_ready`. Results are cached in the MotorControl interface
+    and can be read using :meth:`MotCont.last_ready` without waiting for the brick.
+    The background thread is started when a motor is watched and exits when all
+    watched motors are ready.
+
+    Use :func:`get_ready_poller` to get the poller shared by all users of
+    a MotorControl interface, so that many concurrent movements are tracked by a single
+    thread:
+
+    >>> p = get_ready_poller(mc)  # doctest: +SKIP
+    >>> a = p.cmd(Port.A, 50, 360)  # doctest: +SKIP
+    >>> b = p.cmd(Port.B, -50, 720)  # doctest: +SKIP
+    >>> concurrent.futures.wait([a, b])  # doctest: +SKIP
+
+    Returned futures can be awaited from :mod:`asyncio` code using
+    :func:`asyncio.wrap_future`. The poller can be used together with
+    a :class:`MotContScheduler` or other threads using the same interface.
+    """
+
+    def __init__(self, motcont: MotCont, period: float = 0.02) -> None:
+        self._mc = motcont
+        self.period = period
+        self._lock = Lock()
+        # Watched ports, with the number of times they were watched, to detect
+        # motors watched again during a poll.
+        self._watched: dict[nxt.motor.Port, int] = {}
+        self._futures: list[
+            tuple[frozenset[nxt.motor.Port], concurrent.futures.Future]
+        ] = []
+        self._thread: Optional[Thread] = None
+        self._wake = Event()
+
+    def watch(
+        self, ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]]
+    ) -> concurrent.futures.Future:
+        """Poll motors until they are ready.
+
+        :param ports: Port or ports to watch, use one of the port identifiers, or an
+           iterable returning one to three of them.
+        :return: A future resolved when all motors are ready.
+        """
+        ports, _ = self._mc._decode_ports(ports, 3)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            for port in ports:
+                self._watched[port] = self._watched.get(port, 0) + 1
+            self._futures.append((ports, future))
+            if self._thread is None:
+                self._start()
+        self._wake.set()
+        return future
+
+    def cmd(
+        self,
+        ports: Union[nxt.motor.Port, Iterable[nxt.motor.Port]],
+        power: int,
+        tacholimit: int,
+        speedreg: bool = True,
+        smoothstart: bool = False,
+        brake: bool = False,
+    ) -> concurrent.futures.Future:
+        """Send a controlled motor command and watch motors until the end of movement.
+
+        Parameters are the same as :meth:`MotCont.cmd`.
+
+        :return: A future resolved when MotorControl reports the motors ready again.
+        """
+        self._mc.cmd(ports, power, tacholimit, speedreg, smoothstart, brake)
+        return self.watch(ports)
+
+    def _start(self) -> None:
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            delay = self.step()
+            with self._lock:
+                if delay is None or not self._watched:
+                    self._thread = None
+                    return
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def step(self) -> Optional[float]:
+        """Poll watched motors and resolve futures of ready motors.
+
+        :return: Delay until the next poll, in seconds, or ``None`` if all watched
+           motors are ready.
+        """
+        with self._lock:
+            watched = dict(self._watched)
+        if not watched:
+            return None
+        try:
+            states = self._mc._query_ready(list(watched))
+        except Exception as e:
+            logger.debug("motor state polling failed", exc_info=True)
+            with self._lock:
+                futures = self._futures
+                self._futures = []
+                self._watched.clear()
+            for _, future in futures:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return None
+        with self._lock:
+            for port, count in watched.items():
+                if states[port] and self._watched.get(port) == count:
+                    del self._watched[port]
+            done = [f for f in self._futures if not f[0] & self._watched.keys()]
+            self._futures = [f for f in self._futures if f not in done]
+            delay = self.period if self._watched else None
+        for _, future in done:
+            if future.set_running_or_notify_cancel():
+                future.set_result(None)
+        return delay
+
+
+_ready_pollers_lock = Lock()
+
+
+def get_ready_poller(motcont: MotCont) -> ReadyPoller:
+    """Return the readiness poller shared by all users of a MotorControl interface.
+
+    :param motcont: MotorControl interface to poll.
+    :return: The poller, created on first call.
+
+    The poller is kept by the interface, it is freed with it.
+    """
+    with _ready_pollers_lock:
+        if motcont._ready_poller is None:
+            motcont._ready_poller = ReadyPoller(motcont)
+        return motcont._ready_poller
@@ -14,9 +14,16 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+import concurrent.futures
 import enum
 import logging
+import threading
 import time
+import weakref
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    import nxt.brick
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +93,12 @@ class RunState(enum.Enum):
 LIMIT_RUN_FOREVER = 0
 """No angle limit."""
 
+DEGREES_PER_SECOND_PER_POWER = 9.0
+"""Approximate motor speed in degrees per second for one unit of power."""
+
+MIN_THRESHOLD = 5
+"""Minimum stopping threshold in degrees."""
+
 
 class BlockedException(Exception):
     """Raised when a motor is not moving as expected."""
@@ -93,30 +106,35 @@ class BlockedException(Exception):
     pass
 
 
-class OutputState:
-    """An object holding the internal state of a motor, not including rotation
-    counters."""
+class _OutputStateFields(NamedTuple):
+    power: int
+    mode: Mode
+    regulation_mode: RegulationMode
+    turn_ratio: int
+    run_state: RunState
+    tacho_limit: int
+
+
+class OutputState(_OutputStateFields):
+    """Internal state of a motor, not including rotation counters.
+
+    This is an immutable record, use :meth:`_replace` to get a modified copy.
+
+    It can be built from its fields, or, as in previous versions, from a single list
+    of values: ``OutputState([power, mode, regulation_mode, turn_ratio, run_state,
+    tacho_limit])``.
+    """
+
+    __slots__ = ()
 
-    def __init__(self, values):
-        (
-            self.power,
-            self.mode,
-            self.regulation_mode,
-            self.turn_ratio,
-            self.run_state,
-            self.tacho_limit,
-        ) = values
+    def __new__(cls, *args, **kwargs):
+        if len(args) == 1 and not kwargs:
+            return cls._make(args[0])
+        return super().__new__(cls, *args, **kwargs)
 
     def to_list(self):
         """Returns a list of properties that can be used with set_output_state."""
-        return [
-            self.power,
-            self.mode,
-            self.regulation_mode,
-            self.turn_ratio,
-            self.run_state,
-            self.tacho_limit,
-        ]
+        return list(self)
 
     def __str__(self):
         return ", ".join(
@@ -130,11 +148,27 @@ class OutputState:
         )
 
 
-class TachoInfo:
-    """An object containing the information about the rotation of a motor."""
+class _TachoInfoFields(NamedTuple):
+    tacho_count: int
+    block_tacho_count: Optional[int]
+    rotation_count: Optional[int]
+
+
+class TachoInfo(_TachoInfoFields):
+    """Information about the rotation of a motor.
+
+    This is an immutable record.
+
+    It can be built from its fields, or, as in previous versions, from a single list
+    of values: ``TachoInfo([tacho_count, block_tacho_count, rotation_count])``.
+    """
+
+    __slots__ = ()
 
-    def __init__(self, values):
-        self.tacho_count, self.block_tacho_count, self.rotation_count = values
+    def __new__(cls, *args, **kwargs):
+        if len(args) == 1 and not kwargs:
+            return cls._make(args[0])
+        return super().__new__(cls, *args, **kwargs)
 
     def get_target(self, tacho_limit, direction):
         """Returns a TachoInfo object which corresponds to tacho state after
@@ -149,7 +183,7 @@ class TachoInfo:
         if abs(direction) != 1:
             raise ValueError("invalid direction")
         new_tacho = self.tacho_count + direction * tacho_limit
-        return TachoInfo([new_tacho, None, None])
+        return TachoInfo(new_tacho, None, None)
 
     def is_greater(self, target, direction):
         return direction * (self.tacho_count - target.tacho_count) > 0
@@ -158,11 +192,24 @@ class TachoInfo:
         difference = abs(target.tacho_count - self.tacho_count)
         return difference < threshold
 
+    def distance(self, target, direction):
+        """Returns the remaining distance to target in the given direction, negative
+        if target has been overshot.
+
+        :param TachoInfo target: Target state.
+        :param int direction: 1 (add) or -1 (subtract).
+        :return: Remaining distance in degrees.
+        :rtype: int
+        """
+        return direction * (target.tacho_count - self.tacho_count)
+
     def __str__(self):
         return str((self.tacho_count, self.block_tacho_count, self.rotation_count))
 
 
 class SynchronizedTacho:
+    __slots__ = ("leader_tacho", "follower_tacho")
+
     def __init__(self, leader_tacho, follower_tacho):
         self.leader_tacho = leader_tacho
         self.follower_tacho = follower_tacho
@@ -178,6 +225,9 @@ class SynchronizedTacho:
     def is_near(self, other, threshold):
         return self.leader_tacho.is_near(other.leader_tacho, threshold)
 
+    def distance(self, other, direction):
+        return self.leader_tacho.distance(other.leader_tacho, direction)
+
     def __str__(self):
         if self.follower_tacho is not None:
             t2 = str(self.follower_tacho.tacho_count)
@@ -191,7 +241,7 @@ def get_tacho_and_state(values):
     """A convenience function. values is the list of values from
     get_output_state. Returns both OutputState and TachoInfo.
     """
-    return OutputState(values[1:7]), TachoInfo(values[7:])
+    return OutputState._make(values[1:7]), TachoInfo._make(values[7:])
 
 
 class BaseMotor:
@@ -205,6 +255,7 @@ class BaseMotor:
         timeout=1,
         emulate=True,
         stop_turn=lambda: False,
+        predict=False,
     ):
         """Use this to turn a motor.
 
@@ -219,37 +270,45 @@ class BaseMotor:
         :param bool emulate: If set to ``False``, the motor is aware of the tacho limit.
            If ``True``, a run() function equivalent is used. Warning: motors remember
            their positions and not using emulate may lead to strange behavior,
-           especially with synced motors
+           especially with synced motors. To let the firmware handle the tacho limit,
+           use :meth:`Motor.turn_limited` instead.
         :param lambda: bool stop_turn: If stop_turn returns ``True`` the motor stops
            turning. Depending on ``brake`` it stops by holding or not holding the motor.
+        :param bool predict: If ``True``, track the motor motion: estimate its speed
+           from successive positions and send the stop command ahead of time, so that
+           the motor lands on target.
 
         The motor will not stop until it turns the desired distance or stop_turn returns
         True. Accuracy is much better over a USB connection than with bluetooth...
+
+        The motor is stopped before the target is reached to account for the link
+        latency. When the brick link latency is known (see
+        :attr:`nxt.brick.Brick.latency`), the stopping threshold and the polling period
+        are computed from it and from the motor speed, else a default value is used
+        depending on the connection type.
+
+        With ``predict``, the motor speed is measured instead of relying on fixed
+        thresholds. Positions are read less often when far from target, and the stop
+        command is sent when the remaining distance is the one covered during the link
+        latency.
         """
 
         tacho_limit = tacho_units
 
         if tacho_limit < 0:
             raise ValueError("tacho_units must be greater than 0!")
-        # TODO Calibrate the new values for ip socket latency.
-        if self.method == "bluetooth":
-            threshold = 70
-        elif self.method == "usb":
-            threshold = 5
-        elif self.method == "ipbluetooth":
-            threshold = 80
-        elif self.method == "ipusb":
-            threshold = 15
-        else:
-            threshold = 30  # compromise
+        if predict:
+            self._turn_predict(power, tacho_limit, brake, timeout, emulate, stop_turn)
+            return
+        threshold, period = self._turn_parameters(power)
 
         tacho = self.get_tacho()
         state = self._get_new_state()
 
         # Update modifiers even if they aren't used, might have been changed
-        state.power = power
+        state = state._replace(power=power)
         if not emulate:
-            state.tacho_limit = tacho_limit
+            state = state._replace(tacho_limit=tacho_limit)
 
         logger.debug("updating motor information")
         self._set_state(state)
@@ -265,7 +324,7 @@ class BaseMotor:
 
         try:
             while not stop_turn():
-                time.sleep(0.1)
+                time.sleep(period)
 
                 if current_time - last_time < sleep_time:
                     current_time = time.time()
@@ -302,6 +361,88 @@ class BaseMotor:
             else:
                 self.idle()
 
+    def _turn_predict(self, power, tacho_limit, brake, timeout, emulate, stop_turn):
+        """Turn a motor, tracking its motion to stop it right on target."""
+        threshold, period = self._turn_parameters(power)
+        # Start with the theoretical speed, it is refined with each position read.
+        speed = max(1, abs(power)) * DEGREES_PER_SECOND_PER_POWER
+        latency = self.brick.latency
+        if latency is None:
+            latency = threshold / speed
+
+        tacho = self.get_tacho()
+        state = self._get_new_state()._replace(power=power)
+        if not emulate:
+            state = state._replace(tacho_limit=tacho_limit)
+        logger.debug("updating motor information")
+        self._set_state(state)
+
+        direction = 1 if power > 0 else -1
+        tacho_target = tacho.get_target(tacho_limit, direction)
+        last_tacho = tacho
+        last_time = moving_time = time.time()
+
+        try:
+            while not stop_turn():
+                # Time left before the stop command must be sent.
+                lead = tacho.distance(tacho_target, direction) / speed - latency
+                if lead <= 0:
+                    break
+                if lead <= latency:
+                    # Reading position again would make the stop command late.
+                    time.sleep(lead)
+                    break
+                # Halve the wait to refine the speed estimation near the target.
+                time.sleep(max(period, lead / 2))
+                tacho = self.get_tacho()
+                current_time = time.time()
+                advance = last_tacho.distance(tacho, direction)
+                if advance > 0:
+                    speed = advance / (current_time - last_time)
+                    logger.debug("advancing: %s %s %.1f", last_tacho, tacho, speed)
+                    last_tacho = tacho
+                    last_time = moving_time = current_time
+                else:
+                    logger.debug("not advancing: %s %s", last_tacho, tacho)
+                    if current_time - moving_time > timeout:
+                        if tacho.is_near(tacho_target, threshold):
+                            break
+                        else:
+                            raise BlockedException("Blocked!")
+                    # Poll again after a period while the motor is blocked.
+                    speed = tacho.distance(tacho_target, direction) / (
+                        latency + 2 * period
+                    )
+                    if speed <= 0:
+                        break
+        finally:
+            if brake:
+                self.brake()
+            else:
+                self.idle()
+
+    def _turn_parameters(self, power):
+        """Return stopping threshold in degrees and polling period in seconds."""
+        latency = self.brick.latency
+        if latency is None:
+            if self.method == "bluetooth":
+                threshold = 70
+            elif self.method == "usb":
+                threshold = 5
+            elif self.method == "ipbluetooth":
+                threshold = 80
+            elif self.method == "ipusb":
+                threshold = 15
+            else:
+                threshold = 30  # compromise
+            return threshold, 0.1
+        # Distance covered between the last position read and the brake command.
+        speed = abs(power) * DEGREES_PER_SECOND_PER_POWER
+        threshold = max(MIN_THRESHOLD, speed * latency)
+        # No need to poll faster than the link can answer.
+        period = min(0.1, max(0.01, latency))
+        return threshold, period
+
 
 class Motor(BaseMotor):
     def __init__(self, brick, port):
@@ -321,27 +462,32 @@ class Motor(BaseMotor):
     def _read_state(self):
         logger.debug("getting brick output state")
         values = self.brick.get_output_state(self.port)
+        return self._update_state(values)
+
+    def _update_state(self, values):
+        """Update state from get_output_state values, return state and tacho."""
         self._state, tacho = get_tacho_and_state(values)
         return self._state, tacho
 
     # def get_tacho_and_state here would allow tacho manipulation
 
     def _get_state(self):
-        """Returns a copy of the current motor state for manipulation."""
-        return OutputState(self._state.to_list())
+        """Returns the current motor state, use _replace to modify it."""
+        return self._state
 
     def _get_new_state(self):
         state = self._get_state()
         if self.sync:
-            state.mode = Mode.ON | Mode.REGULATED
-            state.regulation_mode = RegulationMode.SYNC
-            state.turn_ratio = self.turn_ratio
+            state = state._replace(
+                mode=Mode.ON | Mode.REGULATED,
+                regulation_mode=RegulationMode.SYNC,
+                turn_ratio=self.turn_ratio,
+            )
         else:
-            state.mode = Mode.ON | Mode.REGULATED
-            state.regulation_mode = RegulationMode.SPEED
-        state.run_state = RunState.RUNNING
-        state.tacho_limit = LIMIT_RUN_FOREVER
-        return state
+            state = state._replace(
+                mode=Mode.ON | Mode.REGULATED, regulation_mode=RegulationMode.SPEED
+            )
+        return state._replace(run_state=RunState.RUNNING, tacho_limit=LIMIT_RUN_FOREVER)
 
     def get_tacho(self):
         return self._read_state()[1]
@@ -356,27 +502,128 @@ class Motor(BaseMotor):
         :param int power: Motor power or speed if `regulated`.
         :param bool regulated: If ``True``, use speed regulation.
         """
-        state = self._get_new_state()
-        state.power = power
+        state = self._get_new_state()._replace(power=power)
         if not regulated:
-            state.mode = Mode.ON
+            state = state._replace(mode=Mode.ON)
         self._set_state(state)
 
     def brake(self):
         """Holds the motor in place"""
-        state = self._get_new_state()
-        state.power = 0
-        state.mode = Mode.ON | Mode.BRAKE | Mode.REGULATED
+        state = self._get_new_state()._replace(
+            power=0, mode=Mode.ON | Mode.BRAKE | Mode.REGULATED
+        )
         self._set_state(state)
 
     def idle(self):
         """Tells the motor to stop whatever it's doing. It also desyncs it."""
-        state = self._get_new_state()
-        state.power = 0
-        state.mode = Mode.IDLE
-        state.regulation_mode = RegulationMode.IDLE
-        state.run_state = RunState.IDLE
+        state = self._get_new_state()._replace(
+            power=0,
+            mode=Mode.IDLE,
+            regulation_mode=RegulationMode.IDLE,
+            run_state=RunState.IDLE,
+        )
+        self._set_state(state)
+
+    def turn_limited(self, power, tacho_units, brake=True, timeout=1):
+        """Turn the motor, letting the brick firmware stop it.
+
+        :param int power: Value between -100 and 100.
+        :param int tacho_units: Number of degrees to turn the motor.
+        :param bool brake: Whether or not to hold the motor once stopped.
+        :param int timeout: Number of seconds after which a BlockedException is raised
+           if the motor doesn't turn.
+        :return: Final motor position.
+        :rtype: TachoInfo
+        :raises BlockedException: When the motor is blocked, the motor is then stopped.
+
+        A single command is sent with a tacho limit, the firmware stops the motor when
+        the limit is reached, so that the link latency has no effect on the final
+        position. Motor state is read after the estimated move duration, and again
+        after the remaining duration computed from measured speed, until the firmware
+        reports that the motor is idle.
+        """
+        if tacho_units <= 0:
+            raise ValueError("tacho_units must be greater than 0!")
+        _, period = self._turn_parameters(power)
+
+        tacho = self.get_tacho()
+        state = self._get_new_state()._replace(power=power, tacho_limit=tacho_units)
+        if brake:
+            state = state._replace(mode=state.mode | Mode.BRAKE)
+        logger.debug("updating motor information")
+        self._set_state(state)
+
+        # Rotation count is not reset by the firmware when a new limit is set.
+        direction = 1 if power > 0 else -1
+        target = tacho.rotation_count + direction * tacho_units
+        speed = max(1, abs(power)) * DEGREES_PER_SECOND_PER_POWER
+        last_tacho = tacho
+        last_time = moving_time = time.time()
+        delay = tacho_units / speed
+
+        try:
+            while True:
+                time.sleep(max(period, delay))
+                state, tacho = self._read_state()
+                current_time = time.time()
+                if state.run_state == RunState.IDLE:
+                    logger.debug("limit reached: %s", tacho)
+                    return tacho
+                advance = direction * (tacho.rotation_count - last_tacho.rotation_count)
+                if advance > 0:
+                    speed = advance / (current_time - last_time)
+                    last_tacho = tacho
+                    last_time = moving_time = current_time
+                elif current_time - moving_time > timeout:
+                    raise BlockedException("Blocked!")
+                remaining = direction * (target - tacho.rotation_count)
+                delay = max(0, remaining) / speed
+        except BaseException:
+            if brake:
+                self.brake()
+            else:
+                self.idle()
+            raise
+
+    def move_to(self, position, power=75, brake=True, timeout=1):
+        """Move the motor to a position without blocking.
+
+        :param int position: Target tachometer count, in degrees.
+        :param int power: Motor power, only the absolute value is used, direction is
+           deduced from current position.
+        :param bool brake: Whether to hold the motor once the target is reached.
+        :param int timeout: Number of seconds after which the move fails with
+           a BlockedException if the motor doesn't turn.
+        :return: A future resolved with the last read :class:`TachoInfo` once the
+           motor is stopped. Cancel it to stop the motor early.
+        :rtype: concurrent.futures.Future
+
+        The motor is tracked in background by the brick :class:`MotorPoller`, shared
+        with other motors of the same brick, so that several moves can run
+        concurrently without occupying the calling thread. A new move of the same
+        motor cancels the previous one.
+
+        To wait for the move to complete, use the future result:
+
+        >>> m.move_to(360).result()  # doctest: +SKIP
+
+        Or from a coroutine:
+
+        >>> await asyncio.wrap_future(m.move_to(360))  # doctest: +SKIP
+        """
+        tacho = self.get_tacho()
+        direction = 1 if position > tacho.tacho_count else -1
+        power = direction * abs(power)
+        target = TachoInfo(position, None, None)
+        move = _Move(self, power, tacho, target, brake, timeout)
+        if tacho.tacho_count == position:
+            move.future.set_result(tacho)
+            return move.future
+        state = self._get_new_state()._replace(power=power)
+        logger.debug("updating motor information")
         self._set_state(state)
+        get_poller(self.brick).add(move)
+        return move.future
 
     def weak_turn(self, power, tacho_units):
         """Tries to turn a motor for the specified distance. This function
@@ -385,13 +632,13 @@ class Motor(BaseMotor):
         RegulationMode.SPEED
         """
         tacho_limit = tacho_units
-        state = self._get_new_state()
-
         # Update modifiers even if they aren't used, might have been changed
-        state.mode = Mode.ON
-        state.regulation_mode = RegulationMode.IDLE
-        state.power = power
-        state.tacho_limit = tacho_limit
+        state = self._get_new_state()._replace(
+            mode=Mode.ON,
+            regulation_mode=RegulationMode.IDLE,
+            power=power,
+            tacho_limit=tacho_limit,
+        )
 
         logger.debug("updating motor information")
         self._set_state(state)
@@ -421,6 +668,7 @@ class SynchronizedMotors(BaseMotor):
             raise ValueError("motors belong to different bricks")
         self.leader = leader
         self.follower = follower
+        self.brick = leader.brick
         # Being from the same brick, they both have the same com method.
         self.method = self.leader.method
 
@@ -443,8 +691,11 @@ class SynchronizedMotors(BaseMotor):
         self.follower._set_state(state)
 
     def get_tacho(self):
-        leadertacho = self.leader.get_tacho()
-        followertacho = self.follower.get_tacho()
+        leader_values, follower_values = self.brick.get_output_states(
+            [self.leader.port, self.follower.port]
+        )
+        _, leadertacho = self.leader._update_state(leader_values)
+        _, followertacho = self.follower._update_state(follower_values)
         return SynchronizedTacho(leadertacho, followertacho)
 
     def reset_position(self, relative):
@@ -488,13 +739,15 @@ class SynchronizedMotors(BaseMotor):
     def idle(self):
         self._disable()
 
-    def turn(self, power, tacho_units, brake=True, timeout=1):
+    def turn(self, power, tacho_units, brake=True, timeout=1, predict=False):
         self._enable()
         # non-emulation is a nightmare, tacho is being counted differently
         try:
             if power < 0:
                 self.leader, self.follower = self.follower, self.leader
-            BaseMotor.turn(self, power, tacho_units, brake, timeout, emulate=True)
+            BaseMotor.turn(
+                self, power, tacho_units, brake, timeout, emulate=True, predict=predict
+            )
         finally:
             if power < 0:
                 self.leader, self.follower = self.follower, self.leader
@@ -507,3 +760,199 @@ class SynchronizedMotors(BaseMotor):
         return self.leader._is_blocked(
             tacho.leader_tacho, last_tacho.leader_tacho, direction
         )
+
+
+class _Move:
+    """A motor move tracked by a :class:`MotorPoller`."""
+
+    def __init__(self, motor, power, tacho, target, brake, timeout):
+        self.motor = motor
+        self.direction = 1 if power > 0 else -1
+        self.target = target
+        self.brake = brake
+        self.timeout = timeout
+        self.future = concurrent.futures.Future()
+        self.threshold, self.period = motor._turn_parameters(power)
+        # Start with the theoretical speed, it is refined with each position read.
+        self.speed = max(1, abs(power)) * DEGREES_PER_SECOND_PER_POWER
+        latency = motor.brick.latency
+        if latency is None:
+            latency = self.threshold / self.speed
+        self.latency = latency
+        self.tacho = self.last_tacho = tacho
+        self.last_time = self.moving_time = time.time()
+        self._schedule(self.last_time)
+
+    def _schedule(self, now):
+        """Compute time of next position read, or time of stop command."""
+        self.poll_time = self.stop_time = None
+        lead = self.tacho.distance(self.target, self.direction) / self.speed
+        lead -= self.latency
+        if lead <= self.latency:
+            # Reading position again would make the stop command late.
+            self.stop_time = now + max(0, lead)
+        else:
+            # Halve the wait to refine the speed estimation near the target.
+            self.poll_time = now + max(self.period, lead / 2)
+
+    @property
+    def wake_time(self):
+        return self.poll_time if self.stop_time is None else self.stop_time
+
+    def update(self, state, tacho, now):
+        """Update with a new motor state, return True if the motor is stopped."""
+        self.tacho = tacho
+        if state.run_state == RunState.IDLE:
+            return True
+        advance = self.last_tacho.distance(tacho, self.direction)
+        if advance > 0 and now > self.last_time:
+            self.speed = advance / (now - self.last_time)
+            self.last_tacho = tacho
+            self.last_time = self.moving_time = now
+        else:
+            if now - self.moving_time > self.timeout:
+                if tacho.is_near(self.target, self.threshold):
+                    self.stop_time = now
+                    return False
+                raise BlockedException("Blocked!")
+            # Poll again after a period while the motor is blocked.
+            distance = tacho.distance(self.target, self.direction)
+            self.speed = max(1, distance) / (self.latency + 2 * self.period)
+        self._schedule(now)
+        return False
+
+
+class MotorPoller:
+    """Track motor moves of a brick in a background thread.
+
+    :param nxt.brick.Brick brick: Brick to poll.
+
+    All motors moving at the same time are polled together using
+    :meth:`nxt.brick.Brick.get_output_states`, the poll period is adapted to the
+    closest motor from its target. The background thread is started
+    when a move is added and exits when no move is left.
+
+    Use :func:`get_poller` to get the poller shared by all motors of a brick. The
+    poller only keeps a weak reference to the brick, moves keep it alive through their
+    motor.
+    """
+
+    def __init__(self, brick):
+        self._brick = weakref.ref(brick)
+        self._lock = threading.Lock()
+        self._moves = {}
+        self._thread = None
+        self._wake = threading.Event()
+
+    def add(self, move):
+        """Start tracking a move, replacing any current move of the same motor."""
+        port = move.motor.port
+        with self._lock:
+            old = self._moves.get(port)
+            self._moves[port] = move
+            if old is not None:
+                old.future.cancel()
+            if self._thread is None:
+                self._start()
+        self._wake.set()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            delay = self.step()
+            with self._lock:
+                if not self._moves:
+                    self._thread = None
+                    return
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def step(self):
+        """Read state of motors due for polling, and stop motors on target.
+
+        :return: Delay until the next step, in seconds, or ``None`` if no move is
+           left.
+        :rtype: float or None
+        """
+        with self._lock:
+            moves = list(self._moves.values())
+        now = time.time()
+        polled = []
+        for move in moves:
+            if move.future.cancelled():
+                self._finish(move)
+            elif move.stop_time is not None:
+                if move.stop_time <= now:
+                    self._finish(move)
+            elif move.poll_time <= now:
+                polled.append(move)
+        if polled:
+            # Read all motors due for polling at once.
+            try:
+                states = self._brick().get_output_states(
+                    [move.motor.port for move in polled]
+                )
+            except Exception as e:
+                for move in polled:
+                    self._finish(move, e)
+                polled = []
+                states = []
+            now = time.time()
+            for move, values in zip(polled, states):
+                try:
+                    state, tacho = move.motor._update_state(values)
+                    stopped = move.update(state, tacho, now)
+                except Exception as e:
+                    self._finish(move, e)
+                    continue
+                if stopped or move.stop_time is not None and move.stop_time <= now:
+                    self._finish(move)
+        with self._lock:
+            if not self._moves:
+                return None
+            wake_time = min(move.wake_time for move in self._moves.values())
+        return max(0, wake_time - time.time())
+
+    def _finish(self, move, exc=None):
+        """Stop a motor and resolve its future."""
+        with self._lock:
+            current = self._moves.get(move.motor.port) is move
+            if current:
+                del self._moves[move.motor.port]
+        if current:
+            try:
+                if move.brake:
+                    move.motor.brake()
+                else:
+                    move.motor.idle()
+            except Exception as e:
+                exc = exc or e
+        if not move.future.set_running_or_notify_cancel():
+            return
+        if exc is not None:
+            move.future.set_exception(exc)
+        else:
+            move.future.set_result(move.tacho)
+
+
+_pollers: "weakref.WeakKeyDictionary[nxt.brick.Brick, MotorPoller]" = (
+    weakref.WeakKeyDictionary()
+)
+_pollers_lock = threading.Lock()
+
+
+def get_poller(brick):
+    """Return the motor poller shared by all motors of a brick.
+
+    :param nxt.brick.Brick brick: Brick to poll.
+    :return: The brick poller, created on first call.
+    :rtype: MotorPoller
+    """
+    with _pollers_lock:
+        poller = _pollers.get(brick)
+        if poller is None:
+            poller = _pollers[brick] = MotorPoller(brick)
+        return poller
@@ -84,3 +84,58 @@ class BaseAnalogSensor(nxt.sensor.Sensor):
         This can be used to reset accumulated value for some sensor modes.
         """
         self._brick.reset_input_scaled_value(self._port)
+
+
+class Sampler:
+    """Read several analog sensors of the same brick at once.
+
+    :param sensors: Analog sensors to read.
+    :type sensors: list(BaseAnalogSensor)
+    :raises ValueError: When sensors belong to different bricks.
+
+    Values of all input ports are read in one go using
+    :meth:`nxt.brick.Brick.get_all_input_values`, instead of one request per sensor.
+
+    >>> touch = b.get_sensor(Port.S1, Touch)  # doctest: +SKIP
+    >>> light = b.get_sensor(Port.S3, Light)  # doctest: +SKIP
+    >>> sampler = Sampler([touch, light])  # doctest: +SKIP
+    >>> touch_reading, light_reading = sampler.get_input_values()  # doctest: +SKIP
+    """
+
+    def __init__(self, sensors):
+        self._sensors = list(sensors)
+        bricks = {sensor._brick for sensor in self._sensors}
+        if len(bricks) > 1:
+            raise ValueError("sensors belong to different bricks")
+        self._brick = bricks.pop() if bricks else None
+
+    def get_input_values(self):
+        """Get raw sensor readings for all sensors.
+
+        :return: One object with the read values for each sensor, in the same order
+           as given to the constructor.
+        :rtype: list(RawReading)
+        """
+        if self._brick is None:
+            return []
+        all_values = self._brick.get_all_input_values()
+        return [RawReading(*all_values[sensor._port.value]) for sensor in self._sensors]
+
+    def get_valid_input_values(self):
+        """Wait until all inputs are valid, then get raw sensor readings.
+
+        :return: One object with the read values for each sensor, in the same order
+           as given to the constructor.
+        :rtype: list(RawReading)
+        :raises InvalidReading: On timeout trying to get valid readings.
+        """
+        tries = 10
+        tries_delay_s = 0.1
+        readings = self.get_input_values()
+        while not all(reading.valid for reading in readings):
+            tries -= 1
+            if tries == 0:
+                raise InvalidReading()
+            time.sleep(tries_delay_s)
+            readings = self.get_input_values()
+        return readings
@@ -14,15 +14,36 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+import contextlib
 import logging
 import struct
+import threading
 import time
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, NamedTuple
 
 import nxt.sensor
 from nxt.error import DirectProtocolError, I2CError, I2CPendingError
 
+if TYPE_CHECKING:
+    import nxt.brick
+
 logger = logging.getLogger(__name__)
 
+#: Maximum number of bytes read in a single I2C transaction.
+I2C_MAX_READ = 16
+
+#: Maximum time to wait for a sensor to answer after port initialization, and delay
+#: between two tries, in seconds.
+I2C_INIT_TIMEOUT = 0.2
+I2C_INIT_POLL = 0.005
+
+#: Minimum and maximum delay between two status requests of a pending transaction, in
+#: seconds.
+I2C_MIN_BACKOFF = 0.001
+I2C_MAX_BACKOFF = 0.032
+
 
 class SensorInfo:
     def __init__(self, version, product_id, sensor_type):
@@ -46,16 +67,49 @@ class SensorInfo:
         return outstr
 
 
+class Register(NamedTuple):
+    """I2C register description, compiled from an `I2C_ADDRESS` entry."""
+
+    #: Register address.
+    address: int
+    #: Register values layout.
+    layout: struct.Struct
+    #: Message used to access the register: device address and register address.
+    prefix: bytes
+
+
+@dataclass
+class I2CStats:
+    """I2C read transactions statistics."""
+
+    #: Number of read transactions.
+    transactions: int = 0
+    #: Number of status requests.
+    polls: int = 0
+    #: Number of status requests which found the transaction still pending.
+    pending: int = 0
+    #: Learned time between transaction start and first status request, in seconds.
+    wait_estimate: float = 0.0
+
+
 class BaseDigitalSensor(nxt.sensor.Sensor):
     """Object for digital sensors.
 
     :param bool check_compatible: Check sensor class match the connected sensor.
+    :param bool fast_init: Poll the sensor until it answers instead of waiting a fixed
+       delay after port initialization.
 
     If `check_compatible` is ``True``, queries the sensor for its name and print
     a warning if the wrong sensor class is used.
 
+    With `fast_init`, sensor identification is read while polling and cached for the
+    port. Once a sensor answered, other sensor objects created for the same port do
+    not initialize it again, they also use the cached identification. This is used by
+    sensor autodetection, see :meth:`nxt.brick.Brick.get_sensor`.
+
     `I2C_ADDRESS` is the dictionary storing name to I2C address mappings. It should be
-    updated in every subclass. When subclassing this class, make sure to call
+    updated in every subclass, it is compiled to `I2C_REGISTERS` when the class is
+    created. When subclassing this class, make sure to call
     :func:`add_compatible_sensor` to add compatible sensor data.
     """
 
@@ -69,19 +123,25 @@ class BaseDigitalSensor(nxt.sensor.Sensor):
         "factory_scale_divisor": (0x13, "B"),
     }
 
-    def __init__(self, brick, port, check_compatible=True):
+    def __init__(self, brick, port, check_compatible=True, fast_init=False):
         super().__init__(brick, port)
-        self.set_input_mode(nxt.sensor.Type.LOW_SPEED_9V, nxt.sensor.Mode.RAW)
-        self.last_poll = time.time()
-        self.poll_delay = 0.01
-        time.sleep(0.1)  # Give I2C time to initialize
+        self._bus = get_bus(brick, port)
+        self._i2c_stats = I2CStats()
+        with self._bus.lock:
+            if not self._bus.initialized:
+                self.set_input_mode(nxt.sensor.Type.LOW_SPEED_9V, nxt.sensor.Mode.RAW)
+                if fast_init:
+                    self._wait_ready()
+                else:
+                    self._bus.last_time = time.time()
+                    time.sleep(0.1)  # Give I2C time to initialize
         # Don't do type checking if this class has no compatible sensors listed.
         try:
             self.compatible_sensors
         except AttributeError:
             check_compatible = False
         if check_compatible:
-            sensor = self.get_sensor_info()
+            sensor = self.get_sensor_info(cached=True)
             if sensor not in self.compatible_sensors:
                 logger.warning(
                     "wrong sensor class chosen for sensor %s on port %s",
@@ -99,15 +159,72 @@ class BaseDigitalSensor(nxt.sensor.Sensor):
                 )
 
     def _ls_get_status(self, size):
+        """Wait for the end of a transaction, polling its status.
+
+        The first poll is done after the usual transaction time of the sensor, learned
+        from previous transactions. If the transaction is still pending, the delay
+        between polls is doubled at each try.
+        """
+        stats = self._i2c_stats
+        start = self._request_time
+        delay = start + stats.wait_estimate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        backoff = max(I2C_MIN_BACKOFF, stats.wait_estimate / 4)
+        stats.transactions += 1
         for n in range(30):  # https://code.google.com/p/nxt-python/issues/detail?id=35
+            if n:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, I2C_MAX_BACKOFF)
+            poll_time = time.time()
+            stats.polls += 1
             try:
                 b = self._brick.ls_get_status(self._port)
                 if b >= size:
+                    if n == 0:
+                        # Ready at first poll, try to poll earlier next time.
+                        stats.wait_estimate *= 0.9
+                    else:
+                        stats.wait_estimate = (
+                            stats.wait_estimate + (poll_time - start)
+                        ) / 2
                     return b
             except I2CPendingError:
-                pass
+                stats.pending += 1
         raise I2CError("ls_get_status timeout")
 
+    @property
+    def i2c_stats(self):
+        """I2C transactions statistics of this sensor.
+
+        :rtype: I2CStats
+        """
+        return I2CStats(**vars(self._i2c_stats))
+
+    @property
+    def poll_delay(self):
+        """Minimum delay between two transactions on the sensor port, in seconds.
+
+        This is shared by all sensor objects using the same port, see :class:`I2CBus`.
+        """
+        return self._bus.poll_delay
+
+    @poll_delay.setter
+    def poll_delay(self, value):
+        self._bus.poll_delay = value
+
+    @property
+    def last_poll(self):
+        """Time of the last transaction on the sensor port.
+
+        This is shared by all sensor objects using the same port, see :class:`I2CBus`.
+        """
+        return self._bus.last_time
+
+    @last_poll.setter
+    def last_poll(self, value):
+        self._bus.last_time = value
+
     def _i2c_command(self, address, value, format):
         """Write one or several values to an I2C register.
 
@@ -115,14 +232,12 @@ class BaseDigitalSensor(nxt.sensor.Sensor):
         :param tuple value: Tuple of values to write.
         :param str format: Format string using :mod:`struct` syntax.
         """
-        value = struct.pack(format, *value)
-        msg = bytes((self.I2C_DEV, address)) + value
-        now = time.time()
-        if self.last_poll + self.poll_delay > now:
-            diff = now - self.last_poll
-            time.sleep(self.poll_delay - diff)
-        self.last_poll = time.time()
-        self._brick.ls_write(self._port, msg, 0)
+        self._i2c_write(bytes((self.I2C_DEV, address)) + struct.pack(format, *value))
+
+    def _i2c_write(self, msg):
+        with self._bus.lock:
+            self._bus.wait()
+            self._brick.ls_write(self._port, msg, 0)
 
     def _i2c_query(self, address, format):
         """Read one or several values from an I2C register.
@@ -132,14 +247,25 @@ class BaseDigitalSensor(nxt.sensor.Sensor):
         :return: Read values in a tuple.
         :rtype: tuple
         """
-        size = struct.calcsize(format)
-        msg = bytes((self.I2C_DEV, address))
-        now = time.time()
-        if self.last_poll + self.poll_delay > now:
-            diff = now - self.last_poll
-            time.sleep(self.poll_delay - diff)
-        self.last_poll = time.time()
-        self._brick.ls_write(self._port, msg, size)
+        return self._i2c_read(bytes((self.I2C_DEV, address)), struct.Struct(format))
+
+    def _i2c_read(self, prefix, layout):
+        with self._bus.lock:
+            self._i2c_request(prefix, layout)
+            return self._i2c_collect(layout)
+
+    def _i2c_request(self, prefix, layout):
+        """Start a read transaction, see :meth:`_i2c_collect`.
+
+        Bus lock must be held until the transaction is collected.
+        """
+        self._bus.wait()
+        self._brick.ls_write(self._port, prefix, layout.size)
+        self._request_time = time.time()
+
+    def _i2c_collect(self, layout):
+        """Wait for the end of a read transaction and decode the result."""
+        size = layout.size
         try:
             self._ls_get_status(size)
         finally:
@@ -147,8 +273,56 @@ class BaseDigitalSensor(nxt.sensor.Sensor):
             data = self._brick.ls_read(self._port)
         if len(data) < size:
             raise I2CError("Read failure: Not enough bytes")
-        data = struct.unpack(format, data[-size:])
-        return data
+        return layout.unpack_from(data, len(data) - size)
+
+    def _i2c_read_retry(self, prefix, layout, tries=3):
+        for n in range(tries):
+            try:
+                return self._i2c_read(prefix, layout)
+            except DirectProtocolError:
+                pass
+        raise I2CError("read_value timeout")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _compile_registers(cls)
+
+    def _check_registers(self):
+        dev, addresses = self._registers_source
+        if addresses is not self.I2C_ADDRESS or dev != self.I2C_DEV:
+            # Addresses changed on this instance.
+            _compile_registers(self)
+
+    def register(self, name):
+        """Return a register description.
+
+        :param str name: Name of the register.
+        :return: Register description, compiled from `I2C_ADDRESS`.
+        :rtype: Register
+
+        Register descriptions are compiled once per class, they can be kept and given
+        to :meth:`read_register` and :meth:`write_register` to avoid any lookup in
+        tight loops.
+        """
+        self._check_registers()
+        return self.I2C_REGISTERS[name]
+
+    def read_register(self, register):
+        """Read one or several values from a register.
+
+        :param Register register: Register to read, see :meth:`register`.
+        :return: Read values in a tuple.
+        :rtype: tuple
+        """
+        return self._i2c_read_retry(register.prefix, register.layout)
+
+    def write_register(self, register, value):
+        """Write one or several values to a register.
+
+        :param Register register: Register to write, see :meth:`register`.
+        :param tuple value: Tuple of values to write.
+        """
+        self._i2c_write(register.prefix + register.layout.pack(*value))
 
     def read_value(self, name):
         """Read one or several values from the sensor.
@@ -160,13 +334,61 @@ class BaseDigitalSensor(nxt.sensor.Sensor):
         The `name` parameter is an index inside `I2C_ADDRESS` dictionary, which gives
         the corresponding I2C register address and format string.
         """
-        address, fmt = self.I2C_ADDRESS[name]
-        for n in range(3):
-            try:
-                return self._i2c_query(address, fmt)
-            except DirectProtocolError:
-                pass
-        raise I2CError("read_value timeout")
+        return self.read_register(self.register(name))
+
+    def read_values(self, *names):
+        """Read several values from the sensor, using as few transactions as possible.
+
+        :param str names: Names of the values to read.
+        :return: Read values, one tuple per name.
+        :rtype: tuple
+
+        Values are looked up in `I2C_ADDRESS` like for :meth:`read_value`. Registers
+        are sorted by address and read as a single block as long as the covered
+        address range fits in :data:`I2C_MAX_READ` bytes, so that contiguous registers
+        are read in one transaction and decoded together.
+        """
+        return self._read_values(names)
+
+    def _read_values(self, names, tries=3):
+        self._check_registers()
+        plan = self._read_plans.get(names)
+        if plan is None:
+            plan = self._read_plans[names] = self._plan_read(names)
+        values = [None] * len(names)
+        for prefix, layout, regs in plan:
+            (data,) = self._i2c_read_retry(prefix, layout, tries)
+            for index, offset, reg_layout in regs:
+                values[index] = reg_layout.unpack_from(data, offset)
+        return tuple(values)
+
+    def _plan_read(self, names):
+        """Group registers in blocks of contiguous addresses."""
+        regs = sorted(
+            ((self.I2C_REGISTERS[name], index) for index, name in enumerate(names)),
+            key=lambda r: (r[0].address, r[1]),
+        )
+        plan = []
+        block = []
+        for reg in regs + [None]:
+            if block and (
+                reg is None
+                or reg[0].address + reg[0].layout.size - block[0][0].address
+                > I2C_MAX_READ
+            ):
+                start = block[0][0].address
+                end = max(r.address + r.layout.size for r, _ in block)
+                plan.append(
+                    (
+                        bytes((self.I2C_DEV, start)),
+                        struct.Struct(f"{end - start}s"),
+                        [(index, r.address - start, r.layout) for r, index in block],
+                    )
+                )
+                block = []
+            if reg is not None:
+                block.append(reg)
+        return plan
 
     def write_value(self, name, value):
         """Write one or several values to the sensor.
@@ -177,18 +399,44 @@ class BaseDigitalSensor(nxt.sensor.Sensor):
         The `name` parameter is an index inside `I2C_ADDRESS` dictionary, which gives
         the corresponding I2C register address and format string.
         """
-        address, fmt = self.I2C_ADDRESS[name]
-        self._i2c_command(address, value, fmt)
+        self.write_register(self.register(name), value)
 
-    def get_sensor_info(self):
-        version = self.read_value("version")[0].decode("windows-1252").split("\0")[0]
-        product_id = (
-            self.read_value("product_id")[0].decode("windows-1252").split("\0")[0]
-        )
-        sensor_type = (
-            self.read_value("sensor_type")[0].decode("windows-1252").split("\0")[0]
+    def _wait_ready(self):
+        """Wait until the sensor answers, reading its identification."""
+        deadline = time.time() + I2C_INIT_TIMEOUT
+        while True:
+            try:
+                self._read_sensor_info(tries=1)
+            except DirectProtocolError:
+                if time.time() >= deadline:
+                    logger.debug("no answer from sensor on port %s", self._port)
+                    return
+                time.sleep(I2C_INIT_POLL)
+            else:
+                self._bus.initialized = True
+                return
+
+    def _read_sensor_info(self, tries=3):
+        values = self._read_values(("version", "product_id", "sensor_type"), tries)
+        info = SensorInfo(
+            *(value.decode("windows-1252").split("\0")[0] for (value,) in values)
         )
-        return SensorInfo(version, product_id, sensor_type)
+        self._bus.sensor_info = info
+        return info
+
+    def get_sensor_info(self, cached=False):
+        """Read sensor identification.
+
+        :param bool cached: If ``True``, return the identification read previously
+           for this port when available.
+        :return: Sensor identification.
+        :rtype: SensorInfo
+
+        Identification is cached per port until the port is initialized again.
+        """
+        if cached and self._bus.sensor_info is not None:
+            return self._bus.sensor_info
+        return self._read_sensor_info()
 
     @classmethod
     def add_compatible_sensor(cls, version, product_id, sensor_type):
@@ -211,6 +459,165 @@ class BaseDigitalSensor(nxt.sensor.Sensor):
             _add_mapping(cls, version, product_id, sensor_type)
 
 
+def _compile_registers(target):
+    """Compile `I2C_ADDRESS` of a sensor class or instance."""
+    target.I2C_REGISTERS = {
+        name: Register(address, struct.Struct(fmt), bytes((target.I2C_DEV, address)))
+        for name, (address, fmt) in target.I2C_ADDRESS.items()
+    }
+    target._registers_source = (target.I2C_DEV, target.I2C_ADDRESS)
+    # Cache of read_values blocks.
+    target._read_plans = {}
+
+
+_compile_registers(BaseDigitalSensor)
+
+
+class I2CBus:
+    """Low speed bus of a brick input port.
+
+    :param key: Identifier of the bus, used to order locking.
+
+    The bus is shared by all sensor objects using the same port, use :func:`get_bus`
+    to get it. It makes sure that transactions from different objects or threads do
+    not mix, and that they are spaced by at least :attr:`poll_delay`. Transactions
+    on other ports are not delayed.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        #: Lock held during a transaction.
+        self.lock = threading.RLock()
+        #: Minimum delay between two transactions, in seconds.
+        self.poll_delay = 0.01
+        #: Time of the last transaction start.
+        self.last_time = float("-inf")
+        #: Whether a sensor answered since the port was configured, see
+        #: :class:`BaseDigitalSensor` `fast_init` parameter.
+        self.initialized = False
+        #: Sensor identification, if known.
+        self.sensor_info = None
+
+    def reset(self):
+        """Forget about the connected sensor, when the port is configured again."""
+        self.initialized = False
+        self.sensor_info = None
+
+    def ready_time(self):
+        """Return the earliest time the next transaction can start."""
+        return self.last_time + self.poll_delay
+
+    def wait(self):
+        """Wait until the next transaction can start, and record its start time."""
+        delay = self.ready_time() - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self.last_time = time.time()
+
+
+_buses: "weakref.WeakKeyDictionary[nxt.brick.Brick, dict[nxt.sensor.Port, I2CBus]]" = (
+    weakref.WeakKeyDictionary()
+)
+_buses_lock = threading.Lock()
+
+
+def get_bus(brick, port):
+    """Return the low speed bus of a brick input port.
+
+    :param nxt.brick.Brick brick: Brick of the port.
+    :param nxt.sensor.Port port: Input port identifier.
+    :return: The port bus, created on first call.
+    :rtype: I2CBus
+    """
+    with _buses_lock:
+        buses = _buses.setdefault(brick, {})
+        bus = buses.get(port)
+        if bus is None:
+            bus = buses[port] = I2CBus((id(brick), port.value))
+        return bus
+
+
+def reset_bus(brick, port):
+    """Forget about the sensor connected to a brick input port.
+
+    :param nxt.brick.Brick brick: Brick of the port.
+    :param nxt.sensor.Port port: Input port identifier.
+
+    This is called by :meth:`nxt.brick.Brick.set_input_mode`, as the sensor must be
+    initialized again when the port mode changes.
+    """
+    with _buses_lock:
+        bus = _buses.get(brick, {}).get(port)
+    if bus is not None:
+        bus.reset()
+
+
+def read_sensors(reads):
+    """Read values from several digital sensors, overlapping transactions.
+
+    :param reads: Sequence of (sensor, name) pairs, see
+       :meth:`BaseDigitalSensor.read_value`.
+    :return: Read values, one tuple per pair.
+    :rtype: list[tuple]
+    :raises nxt.error.I2CError: When a read still fails after retries.
+
+    Reading sensors one after the other waits for the end of each transaction before
+    starting the next one. Instead, this starts a transaction on every port, then
+    collects the results, so that sensors work at the same time and the total time is
+    close to the time of the slowest sensor.
+
+    When several reads use the same port, they are done in successive rounds. Failed
+    reads are retried in the next round, like :meth:`BaseDigitalSensor.read_value`.
+
+    >>> us, compass = b.get_sensor(Port.S1), b.get_sensor(Port.S2)  # doctest: +SKIP
+    >>> read_sensors([(us, "measurement_byte_0"), (compass, "heading")])
+    ... # doctest: +SKIP
+    """
+    results = [None] * len(reads)
+    pending = [
+        (index, sensor, sensor.register(name))
+        for index, (sensor, name) in enumerate(reads)
+    ]
+    tries = [0] * len(reads)
+    while pending:
+        # Take at most one read per port.
+        buses = {}
+        later = []
+        for read in pending:
+            bus = read[1]._bus
+            if bus in buses:
+                later.append(read)
+            else:
+                buses[bus] = read
+        with contextlib.ExitStack() as stack:
+            # Lock in a fixed order to avoid dead locks.
+            for bus in sorted(buses, key=lambda bus: bus.key):
+                stack.enter_context(bus.lock)
+            # Start with ports which can be used first.
+            batch = sorted(buses.values(), key=lambda read: read[1]._bus.ready_time())
+            started = []
+            for read in batch:
+                index, sensor, reg = read
+                try:
+                    sensor._i2c_request(reg.prefix, reg.layout)
+                except DirectProtocolError:
+                    later.append(read)
+                    tries[index] += 1
+                else:
+                    started.append(read)
+            for read in started:
+                index, sensor, reg = read
+                try:
+                    results[index] = sensor._i2c_collect(reg.layout)
+                except DirectProtocolError:
+                    later.append(read)
+                    tries[index] += 1
+        if any(tries[read[0]] >= 3 for read in later):
+            raise I2CError("read_value timeout")
+        pending = sorted(later, key=lambda read: read[0])
+    return results
+
+
 class _SCompatibility(SensorInfo):
     """An object that helps manage the sensor mappings."""
 
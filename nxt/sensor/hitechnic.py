@@ -40,8 +40,7 @@ class Compass(BaseDigitalSensor):
 
     def get_heading(self):
         """Returns heading from North in degrees."""
-        two_degree_heading = self.read_value("heading")[0]
-        adder = self.read_value("adder")[0]
+        (two_degree_heading,), (adder,) = self.read_values("heading", "adder")
         heading = two_degree_heading * 2 + adder
 
         return heading
@@ -64,7 +63,7 @@ class Compass(BaseDigitalSensor):
         and returns true if heading is NOT between the new max and min
         """
         if minval > maxval:
-            (maxval, minval) = (minval, maxval)
+            maxval, minval = (minval, maxval)
             inverted = True
         else:
             inverted = False
@@ -640,9 +639,9 @@ class SuperPro(BaseDigitalSensor):
             ("analog_a2", "a2"),
             ("analog_a3", "a3"),
         ]
+        values = self.read_values(*(pin[0] for pin in analog_in_pin_name_map))
         analog_raw_map = {}
-        for pin in analog_in_pin_name_map:
-            raw = self.read_value(pin[0])[0]
+        for pin, (raw,) in zip(analog_in_pin_name_map, values):
             low = (raw & 0xFF00) >> 8
             high = raw & 0x00FF
             analog_input = low + high * 4
@@ -166,6 +166,11 @@ class DIST(BaseDigitalSensor):
 DIST.add_compatible_sensor(None, "mndsnsrs", "DIST")
 
 
+def _bcd(value, high_mask):
+    """Decode a BCD register, using the given mask for the tens digit."""
+    return str((value & high_mask) >> 4) + str(value & 0xF)
+
+
 class RTC(BaseDigitalSensor):
     """Class for the RealTime Clock sensor (DS1307)"""
 
@@ -189,52 +194,26 @@ class RTC(BaseDigitalSensor):
         super().__init__(brick, port, check_compatible=False)
 
     def get_seconds(self):
-        gs = self.read_value("seconds")[0]
-        gs2 = gs & 0xF  # bitmasks
-        gs3 = gs & 0x70
-        gs3 = gs3 >> 4
-        return str(gs3) + str(gs2)
+        return _bcd(self.read_value("seconds")[0], 0x70)
 
     def get_minutes(self):
-        gm = self.read_value("minutes")[0]
-        gm2 = gm & 0xF
-        gm3 = gm & 0x70
-        gm3 = gm3 >> 4
-        return str(gm3) + str(gm2)
+        return _bcd(self.read_value("minutes")[0], 0x70)
 
     def get_hours(self):
-        gh = self.read_value("hours")[0]
-        gh2 = gh & 0xF
-        gh3 = gh & 0x30
-        gh3 = gh3 >> 4
-        return str(gh3) + str(gh2)
+        return _bcd(self.read_value("hours")[0], 0x30)
 
     def get_day(self):
-        gwd = self.read_value("day")[0]
-        gwd = gwd & 0x07
-        return gwd
+        return self.read_value("day")[0] & 0x07
 
     def get_month(self):
-        gmo = self.read_value("month")[0]
-        gmo2 = gmo & 0xF
-        gmo3 = gmo & 0x10
-        gmo3 = gmo3 >> 4
-        return str(gmo3) + str(gmo2)
+        return _bcd(self.read_value("month")[0], 0x10)
 
     def get_year(self):
         """Last two digits (10 for 2010)"""
-        gy = self.read_value("year")[0]
-        gy2 = gy & 0xF
-        gy3 = gy & 0xF0
-        gy3 = gy3 >> 4
-        return str(gy3) + str(gy2)
+        return _bcd(self.read_value("year")[0], 0xF0)
 
     def get_date(self):
-        gd = self.read_value("date")[0]
-        gd2 = gd & 0xF
-        gd3 = gd & 0x60
-        gd3 = gd3 >> 4
-        return str(gd3) + str(gd2)
+        return _bcd(self.read_value("date")[0], 0x60)
 
     def hour_mode(self, mode):
         """Writes mode bit and re-enters hours, which is required"""
@@ -263,18 +242,27 @@ class RTC(BaseDigitalSensor):
             logger.error("cannot get mer in 24-hour mode")
 
     def get_sample(self):
-        """Returns a struct_time() tuple which can be processed by the time module."""
+        """Returns a struct_time() tuple which can be processed by the time module.
+
+        All registers are read in a single transaction.
+        """
         import time
 
+        seconds, minutes, hours, day, date, month, year = (
+            value[0]
+            for value in self.read_values(
+                "seconds", "minutes", "hours", "day", "date", "month", "year"
+            )
+        )
         return time.struct_time(
             (
-                int(self.get_year()) + 2000,
-                int(self.get_month()),
-                int(self.get_date()),
-                int(self.get_hours()),
-                int(self.get_minutes()),
-                int(self.get_seconds()),
-                int(self.get_day()),
+                int(_bcd(year, 0xF0)) + 2000,
+                int(_bcd(month, 0x10)),
+                int(_bcd(date, 0x60)),
+                int(_bcd(hours, 0x30)),
+                int(_bcd(minutes, 0x70)),
+                int(_bcd(seconds, 0x70)),
+                day & 0x07,
                 0,  # Should be the Julian Day, but computing that is hard.
                 0,  # No daylight savings time to worry about here.
             )
@@ -800,6 +788,10 @@ class PS2(BaseDigitalSensor):
             "y_right_joystick": (0x47, "<b"),
         }
     )
+    _JOYSTICK_NAMES = {
+        (xy, lr): f"{xy}_{lr}_joystick" for xy in "xy" for lr in ("left", "right")
+    }
+    _BUTTONS_NAMES = {1: "button_set_1", 2: "button_set_2"}
 
     class ControllerState:
         class Buttons:
@@ -859,22 +851,21 @@ class PS2(BaseDigitalSensor):
         self.write_value("command", (value,))
 
     def get_joystick(self, xy, lr):
-        addressname = str(xy) + "_" + str(lr) + "_joystick"
-        return self.read_value(addressname)[0]
+        return self.read_value(self._JOYSTICK_NAMES[xy, lr])[0]
 
     def get_buttons(self, setnum):
-        addressname = "button_set_" + str(setnum)
-        return self.read_value(addressname)[0]
+        return self.read_value(self._BUTTONS_NAMES[setnum])[0]
 
     def get_sample(self):
-        return self.ControllerState(
-            self.get_buttons(1),
-            self.get_buttons(2),
-            self.get_joystick("x", "left"),
-            self.get_joystick("y", "left"),
-            self.get_joystick("x", "right"),
-            self.get_joystick("y", "right"),
+        values = self.read_values(
+            "button_set_1",
+            "button_set_2",
+            "x_left_joystick",
+            "y_left_joystick",
+            "x_right_joystick",
+            "y_right_joystick",
         )
+        return self.ControllerState(*(value[0] for value in values))
 
 
 PS2.add_compatible_sensor(None, "mndsnsrs", "PSPNX")  # Tested with version 'V2.00'
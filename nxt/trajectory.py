@@ -0,0 +1,260 @@
+# nxt.trajectory module -- Stream motor commands to follow trajectories
+# Copyright (C) 2021  Nicolas Schodet
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import bisect
+import logging
+import time
+from collections.abc import Callable, Iterable, Sequence
+from typing import Optional, Union
+
+import nxt.brick
+import nxt.motor
+
+__all__ = ["PositionTrajectory", "SpeedTrajectory", "TrajectoryExecutor"]
+
+logger = logging.getLogger(__name__)
+
+
+def _check_times(times: Sequence[float]) -> None:
+    if len(times) < 2:
+        raise ValueError("at least two setpoints are needed")
+    if any(t1 >= t2 for t1, t2 in zip(times, times[1:])):
+        raise ValueError("setpoints must be sorted by increasing time")
+
+
+class PositionTrajectory:
+    """Motor trajectory given as positions at given times.
+
+    :param points: Sequence of (time, position) setpoints, sorted by time. Time is in
+       seconds from the trajectory start, position is in degrees relative to the motor
+       position at start.
+    :raises ValueError: When there are less than two setpoints or when they are not
+       sorted.
+
+    Position is linearly interpolated between setpoints, so that the motor turns at
+    constant speed between two setpoints.
+    """
+
+    def __init__(self, points: Iterable[tuple[float, float]]) -> None:
+        points = list(points)
+        self._times = [t for t, _ in points]
+        self._positions = [p for _, p in points]
+        _check_times(self._times)
+
+    @property
+    def duration(self) -> float:
+        """Time of the last setpoint, in seconds."""
+        return self._times[-1]
+
+    def position(self, t: float) -> float:
+        """Return position at a given time.
+
+        :param t: Time in seconds from the trajectory start.
+        :return: Position in degrees, first or last position outside the trajectory.
+        """
+        times, positions = self._times, self._positions
+        if t <= times[0]:
+            return positions[0]
+        if t >= times[-1]:
+            return positions[-1]
+        i = bisect.bisect_right(times, t)
+        t0, t1 = times[i - 1], times[i]
+        p0, p1 = positions[i - 1], positions[i]
+        return p0 + (p1 - p0) * (t - t0) / (t1 - t0)
+
+    def speed(self, t: float) -> float:
+        """Return speed at a given time.
+
+        :param t: Time in seconds from the trajectory start.
+        :return: Speed in degrees per second, 0 outside the trajectory.
+        """
+        times, positions = self._times, self._positions
+        if t < times[0] or t >= times[-1]:
+            return 0.0
+        i = bisect.bisect_right(times, t)
+        return (positions[i] - positions[i - 1]) / (times[i] - times[i - 1])
+
+
+class SpeedTrajectory:
+    """Motor trajectory given as speeds at given times.
+
+    :param points: Sequence of (time, speed) setpoints, sorted by time. Time is in
+       seconds from the trajectory start, speed is in degrees per second.
+    :raises ValueError: When there are less than two setpoints or when they are not
+       sorted.
+
+    Speed is linearly interpolated between setpoints, so that the motor accelerates
+    smoothly. Position relative to the motor position at start is the integral of the
+    speed.
+    """
+
+    def __init__(self, points: Iterable[tuple[float, float]]) -> None:
+        points = list(points)
+        self._times = [t for t, _ in points]
+        self._speeds = [s for _, s in points]
+        _check_times(self._times)
+        # Position at each setpoint.
+        self._positions = [0.0]
+        for i in range(1, len(self._times)):
+            dt = self._times[i] - self._times[i - 1]
+            area = (self._speeds[i - 1] + self._speeds[i]) * dt / 2
+            self._positions.append(self._positions[-1] + area)
+
+    @property
+    def duration(self) -> float:
+        """Time of the last setpoint, in seconds."""
+        return self._times[-1]
+
+    def speed(self, t: float) -> float:
+        """Return speed at a given time.
+
+        :param t: Time in seconds from the trajectory start.
+        :return: Speed in degrees per second, 0 outside the trajectory.
+        """
+        times, speeds = self._times, self._speeds
+        if t < times[0] or t >= times[-1]:
+            return 0.0
+        i = bisect.bisect_right(times, t)
+        t0, t1 = times[i - 1], times[i]
+        s0, s1 = speeds[i - 1], speeds[i]
+        return s0 + (s1 - s0) * (t - t0) / (t1 - t0)
+
+    def position(self, t: float) -> float:
+        """Return position at a given time.
+
+        :param t: Time in seconds from the trajectory start.
+        :return: Position in degrees, first or last position outside the trajectory.
+        """
+        times = self._times
+        if t <= times[0]:
+            return 0.0
+        if t >= times[-1]:
+            return self._positions[-1]
+        i = bisect.bisect_right(times, t)
+        t0 = times[i - 1]
+        s0 = self._speeds[i - 1]
+        return self._positions[i - 1] + (s0 + self.speed(t)) * (t - t0) / 2
+
+
+Trajectory = Union[PositionTrajectory, SpeedTrajectory]
+
+
+class TrajectoryExecutor:
+    """Make several motors of a brick follow trajectories.
+
+    :param period: Time between two updates, in seconds.
+    :param gain: Position error correction, in degrees per second per degree of error.
+       If not zero, motors positions are read at each update to correct the speed.
+    :param brake: Whether to hold the motors at the end, else they are left idle.
+
+    At each update, the speed of each motor is taken from its trajectory and sent to
+    the brick as a speed regulated power, using messages which require no reply. Only
+    changed powers are sent. Updates are scheduled at fixed times from the start so
+    that errors do not accumulate, and trajectories are evaluated ahead of time by the
+    time taken by a message to reach the brick, half the brick link latency (see
+    :attr:`nxt.brick.Brick.latency`).
+
+    Without position correction, the position is only controlled through speed, it is
+    recommended to enable correction for long trajectories.
+
+    Example:
+
+    >>> ex = TrajectoryExecutor(gain=2)
+    >>> x = PositionTrajectory([(0, 0), (1, 360), (2, 360), (3, 0)])
+    >>> y = SpeedTrajectory([(0, 0), (1, 360), (2, 0)])
+    >>> ex.add(m_x, x)  # doctest: +SKIP
+    >>> ex.add(m_y, y)  # doctest: +SKIP
+    >>> ex.run()  # doctest: +SKIP
+    """
+
+    def __init__(self, period: float = 0.05, gain: float = 0.0, brake: bool = True):
+        self.period = period
+        self.gain = gain
+        self.brake = brake
+        self._tracks: list[tuple[nxt.motor.Motor, Trajectory]] = []
+        self._brick: Optional[nxt.brick.Brick] = None
+
+    def add(self, motor: nxt.motor.Motor, trajectory: Trajectory) -> None:
+        """Add a motor and the trajectory it should follow.
+
+        :param motor: Motor to control.
+        :param trajectory: Trajectory to follow.
+        :raises ValueError: When motor does not belong to the same brick as other
+           motors, or when it was already added.
+        """
+        if self._brick is not None and motor.brick is not self._brick:
+            raise ValueError("motors belong to different bricks")
+        if any(m.port == motor.port for m, _ in self._tracks):
+            raise ValueError("motor already added")
+        self._brick = motor.brick
+        self._tracks.append((motor, trajectory))
+
+    def _read_positions(self) -> list[int]:
+        assert self._brick is not None
+        states = self._brick.get_output_states([m.port for m, _ in self._tracks])
+        return [values[7] for values in states]
+
+    def run(self, stop: Callable[[], bool] = lambda: False) -> None:
+        """Follow trajectories, return when the longest one is done.
+
+        :param stop: Called before each update, if it returns ``True``, stop the motors
+           and return.
+        """
+        if not self._tracks:
+            return
+        assert self._brick is not None
+        latency = self._brick.latency or 0.0
+        ahead = latency / 2
+        duration = max(trajectory.duration for _, trajectory in self._tracks)
+        if self.gain:
+            origins = self._read_positions()
+        powers: list[Optional[int]] = [None] * len(self._tracks)
+        start = time.time()
+        tick = 0
+        try:
+            while not stop():
+                t = tick * self.period
+                if t > duration:
+                    break
+                if self.gain:
+                    positions = self._read_positions()
+                    # Position was read when the request reached the brick.
+                    read_t = time.time() - start - ahead
+                for i, (motor, trajectory) in enumerate(self._tracks):
+                    speed = trajectory.speed(t + ahead)
+                    if self.gain:
+                        error = trajectory.position(read_t) - (
+                            positions[i] - origins[i]
+                        )
+                        speed += self.gain * error
+                    power = round(speed / nxt.motor.DEGREES_PER_SECOND_PER_POWER)
+                    power = max(-100, min(100, power))
+                    if power != powers[i]:
+                        motor.run(power, regulated=True)
+                        powers[i] = power
+                tick += 1
+                now = time.time()
+                delay = start + tick * self.period - now
+                if delay >= 0:
+                    time.sleep(delay)
+                else:
+                    # Late, skip missed updates.
+                    next_tick = int((now - start) / self.period) + 1
+                    logger.debug("late, skipping %d updates", next_tick - tick)
+                    tick = next_tick
+        finally:
+            for motor, _ in self._tracks:
+                if self.brake:
+                    motor.brake()
+                else:
+                    motor.idle()
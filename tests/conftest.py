@@ -10,11 +10,13 @@
 # but WITHOUT ANY WARRANTY; without even the implied warranty of
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 
 import pytest
 
 import nxt.brick
+import nxt.sensor.digital
+from nxt.motor import Mode, Port, RegulationMode, RunState
 
 
 def pytest_addoption(parser):
@@ -61,11 +63,14 @@ def mtime():
     mtime.sleep.side_effect = sleepf
 
     with (
+        patch("nxt.backend.devfile.time", new=mtime),
         patch("nxt.brick.time", new=mtime),
+        patch("nxt.control.time", new=mtime),
         patch("nxt.motcont.time", new=mtime),
         patch("nxt.motor.time", new=mtime),
         patch("nxt.sensor.analog.time", new=mtime),
         patch("nxt.sensor.digital.time", new=mtime),
+        patch("nxt.trajectory.time", new=mtime),
     ):
         yield mtime
 
@@ -85,16 +90,33 @@ def make_brick_mock():
     def get_sensor(*args, **kwargs):
         return nxt.brick.Brick.get_sensor(b, *args, **kwargs)
 
+    def detect_sensors(*args, **kwargs):
+        return nxt.brick.Brick.detect_sensors(b, *args, **kwargs)
+
+    def detect_sensor(*args, **kwargs):
+        return nxt.brick.Brick._detect_sensor(b, *args, **kwargs)
+
     def get_motor(*args, **kwargs):
         return nxt.brick.Brick.get_motor(b, *args, **kwargs)
 
+    def get_output_states(ports):
+        return [b.get_output_state(port) for port in ports]
+
+    def set_input_mode(port, sensor_type, sensor_mode):
+        nxt.sensor.digital.reset_bus(b, port)
+
     b._sock.bsize = 60
     b._sock.type = "usb"
+    b.latency = None
     b.find_files = find_files
     b.find_modules = find_modules
     b.open_file = open_file
     b.get_sensor = get_sensor
+    b.detect_sensors = detect_sensors
+    b._detect_sensor = detect_sensor
     b.get_motor = get_motor
+    b.get_output_states = get_output_states
+    b.set_input_mode.side_effect = set_input_mode
     return b
 
 
@@ -108,3 +130,38 @@ def mbrick(mtime):
 def mbrick2(mtime):
     """A second brick with mocked low level functions."""
     return make_brick_mock()
+
+
+def output_state(port, tacho):
+    """Return an idle output state, with all tachometers at the given count."""
+    return (port, 0, Mode.IDLE, RegulationMode.IDLE, 0, RunState.IDLE, 0) + (tacho,) * 3
+
+
+def run_call(port, power, regulated=False):
+    """Return the brick call expected from :meth:`nxt.motor.Motor.run`."""
+    mode = Mode.ON | Mode.REGULATED if regulated else Mode.ON
+    return call.set_output_state(
+        port, power, mode, RegulationMode.SPEED, 0, RunState.RUNNING, 0
+    )
+
+
+def brake_call(port):
+    """Return the brick call expected from :meth:`nxt.motor.Motor.brake`."""
+    return call.set_output_state(
+        port,
+        0,
+        Mode.ON | Mode.REGULATED | Mode.BRAKE,
+        RegulationMode.SPEED,
+        0,
+        RunState.RUNNING,
+        0,
+    )
+
+
+@pytest.fixture
+def mmotors(mbrick):
+    """Motors on port A and B of the mocked brick, idle at position 0."""
+    mbrick.get_output_state.side_effect = lambda port: output_state(port, 0)
+    motors = [mbrick.get_motor(Port.A), mbrick.get_motor(Port.B)]
+    mbrick.reset_mock()
+    return motors
@@ -23,7 +23,7 @@ def msock():
         spec_set=(
             "connect",
             "close",
-            "send",
+            "sendall",
             "recv",
         )
     )
@@ -100,7 +100,7 @@ def test_bluetooth(mbluetooth, mbluetooth_import, msock):
     some_len = bytes.fromhex("0400")
     some_bytes_with_len = some_len + some_bytes
     sock.send(some_bytes)
-    assert msock.send.call_args == call(some_bytes_with_len)
+    assert msock.sendall.call_args == call(some_bytes_with_len)
     # Recv.
     msock.recv.side_effect = [some_len, some_bytes]
     r = sock.recv()
@@ -113,6 +113,26 @@ def test_bluetooth(mbluetooth, mbluetooth_import, msock):
     sock.close()
 
 
+def test_bluetooth_framing(mbluetooth, mbluetooth_import, msock):
+    backend = nxt.backend.bluetooth.get_backend()
+    bricks = list(backend.find(host="00:01:02:03:04:05"))
+    sock = bricks[0]._sock
+    # Short reads and several replies in one read.
+    msock.recv.side_effect = [
+        bytes.fromhex("04"),
+        bytes.fromhex("00 0102"),
+        bytes.fromhex("0304 0200 0506 01"),
+        bytes.fromhex("00 07"),
+        b"",
+    ]
+    assert sock.recv() == bytes.fromhex("01020304")
+    assert sock.recv() == bytes.fromhex("0506")
+    assert sock.recv() == bytes.fromhex("07")
+    assert msock.recv.call_count == 4
+    with pytest.raises(ConnectionError):
+        sock.recv()
+
+
 def test_bluetooth_by_name(mbluetooth, mbluetooth_import, msock):
     # Instantiate backend.
     backend = nxt.backend.bluetooth.get_backend()
@@ -10,6 +10,7 @@
 # but WITHOUT ANY WARRANTY; without even the implied warranty of
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
+import asyncio
 from unittest.mock import Mock, call, patch
 
 import pytest
@@ -24,13 +25,34 @@ def mdev():
             "read",
             "write",
             "close",
+            "fileno",
         )
     )
+    dev.fileno.return_value = 3
     return dev
 
 
 @pytest.fixture
-def mopen(mdev):
+def mos():
+    with patch("nxt.backend.devfile.os") as os:
+        os.pipe.return_value = (10, 11)
+        yield os
+
+
+@pytest.fixture
+def mselect(mdev):
+    with patch("nxt.backend.devfile.select") as select:
+        # By default, device is always ready.
+        select.select.side_effect = lambda r, w, x, t: (
+            [d for d in r if d is mdev],
+            w,
+            [],
+        )
+        yield select
+
+
+@pytest.fixture
+def mopen(mdev, mos, mselect):
     with patch("nxt.backend.devfile.open") as fopen:
         fopen.return_value = mdev
         yield fopen
@@ -54,7 +76,7 @@ def mplatform():
         yield platform
 
 
-def test_devfile(mopen, mtty, mdev):
+def test_devfile(mopen, mtty, mdev, mos):
     # Instantiate backend.
     backend = nxt.backend.devfile.get_backend()
     # Find brick.
@@ -63,13 +85,16 @@ def test_devfile(mopen, mtty, mdev):
     brick = bricks[0]
     assert mopen.called
     assert mtty.setraw.called
+    assert mos.set_blocking.call_args == call(3, False)
     sock = brick._sock
     # str.
     assert str(sock).startswith("DevFile (/dev")
+    assert sock.pipelining
     # Send.
     some_bytes = bytes.fromhex("01020304")
     some_len = bytes.fromhex("0400")
     some_bytes_with_len = some_len + some_bytes
+    mdev.write.side_effect = len
     sock.send(some_bytes)
     assert mdev.write.call_args == call(some_bytes_with_len)
     # Recv.
@@ -80,10 +105,126 @@ def test_devfile(mopen, mtty, mdev):
     # Close.
     brick.close()
     assert mdev.close.called
+    assert mos.close.mock_calls == [call(10), call(11)]
     # Duplicated close.
     sock.close()
 
 
+def test_devfile_partial(mopen, mtty, mdev):
+    backend = nxt.backend.devfile.get_backend()
+    bricks = list(backend.find(filename="/dev/nxt"))
+    sock = bricks[0]._sock
+    # Short write.
+    mdev.write.side_effect = [3, 3]
+    sock.send(bytes.fromhex("01020304"))
+    assert mdev.write.call_count == 2
+    assert mdev.write.call_args == call(bytes.fromhex("020304"))
+    # Short reads and several replies in one read.
+    mdev.read.side_effect = [
+        bytes.fromhex("0400 01"),
+        bytes.fromhex("020304 0100 05"),
+    ]
+    assert sock.recv() == bytes.fromhex("01020304")
+    assert sock.recv() == bytes.fromhex("05")
+    assert mdev.read.call_count == 2
+
+
+def test_devfile_nonblocking(mopen, mtty, mdev, mselect):
+    backend = nxt.backend.devfile.get_backend()
+    brick = list(backend.find(filename="/dev/nxt"))[0]
+    sock = brick._sock
+    # Write would block.
+    mdev.write.side_effect = [None, 6]
+    sock.send(bytes.fromhex("01020304"))
+    assert mdev.write.call_count == 2
+    assert mselect.select.call_args == call([10], [mdev], [], None)
+    # Read with no data available.
+    mdev.read.side_effect = [None, bytes.fromhex("0100 05"), b""]
+    assert sock.recv() == bytes.fromhex("05")
+    with pytest.raises(ConnectionError):
+        sock.recv()
+
+
+def test_devfile_timeout(mopen, mtty, mdev, mselect, mtime):
+    backend = nxt.backend.devfile.get_backend()
+    brick = list(backend.find(filename="/dev/nxt", devfile_timeout="0.5"))[0]
+    sock = brick._sock
+    assert sock.timeout == 0.5
+    assert not sock.pipelining
+    mdev.write.side_effect = len
+    sock.send(bytes.fromhex("0003"))
+    mselect.select.side_effect = None
+    mselect.select.return_value = ([], [], [])
+    with pytest.raises(TimeoutError):
+        sock.recv()
+    assert mselect.select.call_args == call([mdev, 10], [], [], 0.5)
+    # Late reply is dropped.
+    sock.send(bytes.fromhex("0004"))
+    mselect.select.return_value = ([mdev], [], [])
+    mdev.read.side_effect = [bytes.fromhex("0300 020300 0300 020400")]
+    assert sock.recv() == bytes.fromhex("020400")
+    # Reply is lost, next command is not disturbed.
+    sock.send(bytes.fromhex("0003"))
+    mselect.select.return_value = ([], [], [])
+    with pytest.raises(TimeoutError):
+        sock.recv()
+    sock.send(bytes.fromhex("0004"))
+    sock.send(bytes.fromhex("8005"))
+    sock.send(bytes.fromhex("0006"))
+    mselect.select.return_value = ([mdev], [], [])
+    mdev.read.side_effect = [bytes.fromhex("0300 020400 0300 020600")]
+    assert sock.recv() == bytes.fromhex("020400")
+    assert sock.recv() == bytes.fromhex("020600")
+
+
+def test_devfile_cancel(mopen, mtty, mdev, mselect, mos):
+    backend = nxt.backend.devfile.get_backend()
+    brick = list(backend.find(filename="/dev/nxt"))[0]
+    sock = brick._sock
+    # Nothing pending, ignored.
+    sock.cancel()
+    assert not mos.write.called
+    mdev.read.side_effect = [bytes.fromhex("0100 05")]
+    assert sock.recv() == bytes.fromhex("05")
+
+    # Cancelled while waiting.
+    def select(r, w, x, t):
+        sock.cancel()
+        return [10], [], []
+
+    mselect.select.side_effect = select
+    with pytest.raises(ConnectionAbortedError):
+        sock.recv()
+    assert mos.write.call_args == call(11, b"\0")
+    assert mos.read.call_args == call(10, 1)
+    # Cancellation is consumed.
+    mos.write.reset_mock()
+    sock.cancel()
+    assert not mos.write.called
+
+
+def test_devfile_async(mopen, mtty, mdev):
+    backend = nxt.backend.devfile.get_backend()
+    brick = list(backend.find(filename="/dev/nxt"))[0]
+    sock = brick._sock
+    mdev.read.side_effect = [bytes.fromhex("0100 05")]
+    loop = Mock(spec_set=("create_future", "add_reader", "remove_reader"))
+
+    def add_reader(fd, callback, *args):
+        assert fd == 3
+        callback(*args)
+
+    async def run():
+        real_loop = asyncio.get_running_loop()
+        loop.create_future.side_effect = real_loop.create_future
+        loop.add_reader.side_effect = add_reader
+        with patch("nxt.backend.devfile.asyncio.get_running_loop", return_value=loop):
+            return await sock.recv_async()
+
+    assert asyncio.run(run()) == bytes.fromhex("05")
+    assert loop.remove_reader.call_args == call(3)
+
+
 def test_devfile_linux(mopen, mtty, mglob, mplatform):
     mplatform.system.return_value = "Linux"
     mglob.glob.return_value = ["/dev/rfcomm0"]
@@ -132,6 +273,7 @@ def test_devfile_real():
     sock = brick._sock
     # str.
     assert str(sock).startswith("DevFile (/dev")
+    assert sock.pipelining
     # Send.
     sock.send(bytes.fromhex("019b"))
     # Recv.
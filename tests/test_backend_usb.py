@@ -11,9 +11,11 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 import array
+import threading
 from unittest.mock import Mock, call, patch
 
 import pytest
+from usb.core import USBError
 
 import nxt.backend.usb
 
@@ -41,6 +43,14 @@ def musb(mdev):
         yield usb_core
 
 
+def fake_read(data):
+    def read(buf, timeout):
+        buf[: len(data)] = array.array("B", data)
+        return len(data)
+
+    return read
+
+
 def test_usb(musb, mdev):
     # Instantiate backend.
     backend = nxt.backend.usb.get_backend()
@@ -60,9 +70,9 @@ def test_usb(musb, mdev):
     # Send.
     some_bytes = bytes.fromhex("01020304")
     sock.send(some_bytes)
-    assert epout.write.call_args == call(some_bytes)
+    assert epout.write.call_args == call(some_bytes, None)
     # Recv.
-    epin.read.return_value = array.array("B", (1, 2, 3, 4))
+    epin.read.side_effect = fake_read(some_bytes)
     r = sock.recv()
     assert r == some_bytes
     assert epin.read.called
@@ -72,6 +82,127 @@ def test_usb(musb, mdev):
     sock.close()
 
 
+def test_usb_timeouts(musb, mdev):
+    backend = nxt.backend.usb.get_backend()
+    epout = Mock(spec_set=("write",))
+    epin = Mock(spec_set=("read",))
+    mdev.get_active_configuration.return_value = {(0, 0): (epout, epin)}
+    bricks = list(backend.find(usb_read_timeout="100", usb_write_timeout=50))
+    sock = bricks[0]._sock
+    sock.send(bytes.fromhex("01020304"))
+    assert epout.write.call_args == call(bytes.fromhex("01020304"), 50)
+    # Receive buffer is reused.
+    epin.read.side_effect = fake_read(bytes.fromhex("01020304"))
+    assert sock.recv() == bytes.fromhex("01020304")
+    epin.read.side_effect = fake_read(bytes.fromhex("0506"))
+    assert sock.recv() == bytes.fromhex("0506")
+    assert epin.read.call_args_list[0][0][0] is epin.read.call_args_list[1][0][0]
+    assert epin.read.call_args[0][1] == 100
+
+
+def test_usb_reset(musb, mdev):
+    backend = nxt.backend.usb.get_backend()
+    mdev.get_active_configuration.return_value = {(0, 0): (Mock(), Mock())}
+    with patch("nxt.backend.usb._reset_devices", new=set()):
+        list(backend.find(usb_reset="never"))
+        assert not mdev.reset.called
+        list(backend.find(usb_reset="once"))
+        assert mdev.reset.call_count == 1
+        # Known device, no reset.
+        list(backend.find(usb_reset="once"))
+        assert mdev.reset.call_count == 1
+        list(backend.find())
+        assert mdev.reset.call_count == 2
+    with pytest.raises(ValueError):
+        list(backend.find(usb_reset="sometimes"))
+
+
+def make_dev(address):
+    dev = Mock(
+        spec_set=(
+            "reset",
+            "set_configuration",
+            "get_active_configuration",
+            "bus",
+            "address",
+        )
+    )
+    dev.bus = 1
+    dev.address = address
+    dev.get_active_configuration.return_value = {(0, 0): (Mock(), Mock())}
+    return dev
+
+
+@pytest.fixture
+def mmonitor(musb):
+    musb.USBError = USBError
+    added = []
+    removed = []
+    monitor = nxt.backend.usb.Monitor(added.append, removed.append)
+    return monitor, added, removed
+
+
+def test_monitor_add_remove(musb, mmonitor):
+    monitor, added, removed = mmonitor
+    dev1, dev2 = make_dev(2), make_dev(3)
+    musb.find.return_value = [dev1, dev2]
+    bricks = monitor.scan()
+    assert len(bricks) == 2
+    assert sorted(b._sock._dev.address for b in added) == [2, 3]
+    assert dev1.reset.called and dev2.reset.called
+    # Nothing new.
+    assert monitor.scan() == []
+    assert len(added) == 2
+    assert dev1.reset.call_count == 1
+    # Unplug one.
+    musb.find.return_value = [dev2]
+    with patch.object(nxt.brick.Brick, "close") as mclose:
+        assert monitor.scan() == []
+        # Closing is left to the caller.
+        assert mclose.call_count == 0
+    assert len(removed) == 1
+    assert removed[0]._sock._dev is dev1
+
+
+def test_monitor_connect_error(musb, mmonitor):
+    monitor, added, removed = mmonitor
+    dev = make_dev(2)
+    dev.reset.side_effect = [USBError("mocked"), None]
+    musb.find.return_value = [dev]
+    assert monitor.scan() == []
+    assert added == []
+    # Retried on next scan.
+    assert len(monitor.scan()) == 1
+    assert len(added) == 1
+
+
+def test_monitor_callback_error(musb):
+    musb.USBError = USBError
+    on_add = Mock(side_effect=RuntimeError("mocked"))
+    monitor = nxt.backend.usb.Monitor(on_add)
+    musb.find.return_value = [make_dev(2), make_dev(3)]
+    # All bricks are registered and given to the callback despite errors.
+    assert len(monitor.scan()) == 2
+    assert on_add.call_count == 2
+    assert monitor.scan() == []
+
+
+def test_monitor_start_stop(musb, mmonitor):
+    monitor, added, removed = mmonitor
+    musb.find.return_value = [make_dev(2)]
+    found = threading.Event()
+    monitor._on_add = lambda brick: found.set()
+    monitor.start()
+    try:
+        with pytest.raises(RuntimeError):
+            monitor.start()
+        assert found.wait(5)
+    finally:
+        monitor.stop()
+    # Can be stopped twice.
+    monitor.stop()
+
+
 @pytest.mark.nxt("usb")
 def test_usb_real():
     # Instantiate backend.
@@ -17,6 +17,8 @@ import pytest
 import nxt.brick
 import nxt.error
 import nxt.motor
+import nxt.sensor
+import nxt.sensor.digital
 
 
 @pytest.fixture
@@ -67,6 +69,26 @@ def test_reply_error(sock, brick):
         brick.boot(sure=True)
 
 
+def test_latency(sock, brick, mtime):
+    rtts = [0.1, 0.1, 0.2, 5.0]
+
+    def recv():
+        mtime.sleep(rtts.pop(0))
+        if rtts:
+            return bytes.fromhex("020d00 01020304")
+        else:
+            return bytes.fromhex("028800 0102 0304")
+
+    sock.recv.side_effect = recv
+    assert brick.latency is None
+    assert brick.measure_latency(2) == pytest.approx(0.1)
+    brick.keep_alive()
+    assert brick.latency == pytest.approx(0.1 + nxt.brick.LATENCY_WEIGHT * 0.1)
+    # System commands are ignored.
+    brick.get_firmware_version()
+    assert brick.latency == pytest.approx(0.1 + nxt.brick.LATENCY_WEIGHT * 0.1)
+
+
 class TestSystem:
     """Test system commands."""
 
@@ -340,6 +362,14 @@ class TestDirect:
         )
         assert sock.mock_calls == sent(bytes.fromhex("8005 02 01 20"))
 
+    def test_set_input_mode_reset_bus(self, sock, brick):
+        bus = nxt.sensor.digital.get_bus(brick, nxt.sensor.Port.S3)
+        bus.initialized = True
+        brick.set_input_mode(
+            nxt.sensor.Port.S3, nxt.sensor.Type.SWITCH, nxt.sensor.Mode.BOOL
+        )
+        assert not bus.initialized
+
     def test_get_output_state(self, sock, brick):
         sock.recv.return_value = bytes.fromhex(
             "020600 01 9c 01 00 fb 20 01020304 11121314 21222324 31323334"
@@ -368,6 +398,151 @@ class TestDirect:
         assert block_tacho_count == 0x24232221
         assert rotation_count == 0x34333231
 
+    def test_get_output_states(self, sock, brick):
+        sock.recv.side_effect = [
+            bytes.fromhex(
+                "020600 00 32 01 00 00 20 00000000 10000000 00000000 00000000"
+            ),
+            bytes.fromhex(
+                "020600 02 ce 01 00 00 20 00000000 f0ffffff 00000000 00000000"
+            ),
+        ]
+        a, c = brick.get_output_states([nxt.motor.Port.A, nxt.motor.Port.C])
+        assert sock.mock_calls == sent_recved(bytes.fromhex("0006 00")) + sent_recved(
+            bytes.fromhex("0006 02")
+        )
+        assert a[0] == nxt.motor.Port.A
+        assert a[7] == 16
+        assert c[0] == nxt.motor.Port.C
+        assert c[1] == -50
+        assert c[7] == -16
+
+    def test_get_output_states_pipelining(self, brick):
+        sock = Mock(spec_set=("send", "recv", "close", "pipelining"))
+        sock.pipelining = True
+        sock.recv.side_effect = [
+            bytes.fromhex(
+                "020600 00 32 01 00 00 20 00000000 10000000 00000000 00000000"
+            ),
+            bytes.fromhex(
+                "020600 01 32 01 00 00 20 00000000 20000000 00000000 00000000"
+            ),
+        ]
+        brick._sock = sock
+        a, b = brick.get_output_states([nxt.motor.Port.A, nxt.motor.Port.B])
+        assert sock.mock_calls == [
+            call.send(bytes.fromhex("0006 00")),
+            call.send(bytes.fromhex("0006 01")),
+            call.recv(),
+            call.recv(),
+        ]
+        assert a[7] == 16
+        assert b[0] == nxt.motor.Port.B
+        assert b[7] == 32
+
+    def test_get_all_output_states(self, brick):
+        sock = Mock(spec_set=("send", "recv", "close", "bsize"))
+        sock.bsize = 60
+        brick._sock = sock
+        iomap = (
+            nxt.brick.OUTPUT_IOMAP_STRUCT.pack(
+                100, 50, 1000, 360, 0, 0, 5, 75, 70, 96, 32, 32, 0x20, 1, 0, 0
+            )
+            + nxt.brick.OUTPUT_IOMAP_STRUCT.pack(
+                -10, -10, -20, 0, 0, 0, 0, 0, 0, 96, 32, 32, 0, 0, 0, 0
+            )
+            + nxt.brick.OUTPUT_IOMAP_STRUCT.pack(
+                0, 0, 0, 0, 0, 0, 7, -50, 0, 96, 32, 32, 0x20, 2, 0, -20
+            )
+        )
+        output_mod_bin = b"Output.mod\0\0\0\0\0\0\0\0\0\0"
+        sock.recv.side_effect = [
+            bytes.fromhex("029000 42")
+            + output_mod_bin
+            + bytes.fromhex("01000200 00000000 6100"),
+            bytes.fromhex("029200 42"),
+            bytes.fromhex("029400 01000200 3c00") + iomap[:60],
+            bytes.fromhex("029400 01000200 2400") + iomap[60:],
+            bytes.fromhex("029400 01000200 3c00") + iomap[:60],
+            bytes.fromhex("029400 01000200 2400") + iomap[60:],
+        ]
+        a, b, c = brick.get_all_output_states()
+        assert a == (
+            nxt.motor.Port.A,
+            75,
+            nxt.motor.Mode.ON | nxt.motor.Mode.REGULATED,
+            nxt.motor.RegulationMode.SPEED,
+            0,
+            nxt.motor.RunState.RUNNING,
+            360,
+            100,
+            50,
+            1000,
+        )
+        assert b[0] == nxt.motor.Port.B
+        assert b[2] == nxt.motor.Mode.IDLE
+        assert b[7:] == (-10, -10, -20)
+        assert c[0] == nxt.motor.Port.C
+        assert c[1] == -50
+        assert c[3] == nxt.motor.RegulationMode.SYNC
+        assert c[4] == -20
+        # Module identifier is cached.
+        brick.get_all_output_states()
+        assert sock.mock_calls == (
+            sent_recved(bytes.fromhex("0190") + output_mod_bin)
+            + sent_recved(bytes.fromhex("0192 42"))
+            + sent_recved(bytes.fromhex("0194 01000200 0000 3c00"))
+            + sent_recved(bytes.fromhex("0194 01000200 3c00 2400"))
+            + sent_recved(bytes.fromhex("0194 01000200 0000 3c00"))
+            + sent_recved(bytes.fromhex("0194 01000200 3c00 2400"))
+        )
+
+    def test_get_all_input_values(self, brick):
+        sock = Mock(spec_set=("send", "recv", "close", "bsize"))
+        sock.bsize = 118
+        brick._sock = sock
+        iomap = (
+            nxt.brick.INPUT_IOMAP_STRUCT.pack(
+                0, 183, 183, 1, 1, 0x20, 1, 0, 0, 0, 0, 0, 0
+            )
+            + nxt.brick.INPUT_IOMAP_STRUCT.pack(0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1)
+            + nxt.brick.INPUT_IOMAP_STRUCT.pack(
+                0, 726, 250, 250, 5, 0x80, 0, 0, 0, 0, 0, 0, 0
+            )
+            + nxt.brick.INPUT_IOMAP_STRUCT.pack(0, 1, 2, -3, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+        )
+        input_mod_bin = b"Input.mod\0\0\0\0\0\0\0\0\0\0\0"
+        sock.recv.side_effect = [
+            bytes.fromhex("029000 42")
+            + input_mod_bin
+            + bytes.fromhex("01000300 00000000 6c00"),
+            bytes.fromhex("029200 42"),
+            bytes.fromhex("029400 01000300 5000") + iomap,
+        ]
+        s1, s2, s3, s4 = brick.get_all_input_values()
+        assert sock.mock_calls == (
+            sent_recved(bytes.fromhex("0190") + input_mod_bin)
+            + sent_recved(bytes.fromhex("0192 42"))
+            + sent_recved(bytes.fromhex("0194 01000300 0000 5000"))
+        )
+        assert s1 == (
+            nxt.sensor.Port.S1,
+            True,
+            False,
+            nxt.sensor.Type.SWITCH,
+            nxt.sensor.Mode.BOOL,
+            183,
+            183,
+            1,
+            183,
+        )
+        assert s2[0] == nxt.sensor.Port.S2
+        assert s2[1] is False
+        assert s3[3] == nxt.sensor.Type.LIGHT_ACTIVE
+        assert s3[4] == nxt.sensor.Mode.PERCENT
+        assert s3[5:] == (726, 250, 250, 250)
+        assert s4[7] == -3
+
     def test_get_input_values(self, sock, brick):
         sock.recv.return_value = bytes.fromhex(
             "020700 02 01 00 01 20 0102 1112 2122 3132"
@@ -0,0 +1,142 @@
+# test_control -- Test nxt.control module
+# Copyright (C) 2021  Nicolas Schodet
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+import threading
+from unittest.mock import call
+
+import pytest
+from conftest import output_state, run_call
+
+from nxt.control import PID, Controller
+from nxt.motor import Mode, Port, RegulationMode, RunState
+
+
+def test_pid_proportional():
+    pid = PID(2, output_limit=50)
+    assert pid.update(10, 0.1) == 20
+    assert pid.update(-100, 0.1) == -50
+
+
+def test_pid_integral_derivative():
+    pid = PID(0, ki=1, kd=0.5)
+    assert pid.update(10, 0.5) == 5
+    # Integral: 5 + 5, derivative: 0.5 * 0 / 0.5.
+    assert pid.update(10, 0.5) == 10
+    # Integral: 10 + 2, derivative: 0.5 * -6 / 0.5.
+    assert pid.update(4, 0.5) == 12 - 6
+    pid.reset()
+    assert pid.update(10, 0.5) == 5
+
+
+def test_pid_anti_windup():
+    pid = PID(1, ki=10, output_limit=100)
+    for _ in range(10):
+        assert pid.update(100, 1) == 100
+    # Integral did not grow while saturated, output comes back at once.
+    assert pid.update(-10, 0.01) == pytest.approx(-11)
+
+
+def test_pid_rate_limit():
+    pid = PID(10, rate_limit=100)
+    assert pid.update(10, 0.1) == 10
+    assert pid.update(10, 0.1) == 20
+    assert pid.update(-10, 0.5) == -30
+
+
+def test_controller_position(mbrick, mmotors, mtime):
+    positions = {Port.A: iter([0, 50, 100]), Port.B: iter([0, 0, 0])}
+    mbrick.get_output_state.side_effect = lambda port: output_state(
+        port, next(positions[port])
+    )
+    c = Controller(period=0.1)
+    c.add(mmotors[0], PID(0.5), target=100)
+    c.add(mmotors[1], PID(0.5), target=-20)
+    c.step()
+    mtime.sleep(0.1)
+    c.step()
+    mtime.sleep(0.12)
+    c.step()
+    c.stop(brake=False)
+    assert mbrick.mock_calls == [
+        call.get_output_state(Port.A),
+        call.get_output_state(Port.B),
+        run_call(Port.A, 50),
+        run_call(Port.B, -10),
+        call.get_output_state(Port.A),
+        call.get_output_state(Port.B),
+        run_call(Port.A, 25),
+        call.get_output_state(Port.A),
+        call.get_output_state(Port.B),
+        run_call(Port.A, 0),
+        call.set_output_state(
+            Port.A, 0, Mode.IDLE, RegulationMode.IDLE, 0, RunState.IDLE, 0
+        ),
+        call.set_output_state(
+            Port.B, 0, Mode.IDLE, RegulationMode.IDLE, 0, RunState.IDLE, 0
+        ),
+    ]
+    stats = c.stats
+    assert stats.ticks == 3
+    assert stats.rate == pytest.approx(2 / 0.22)
+    assert stats.jitter_mean == pytest.approx(0.01)
+    assert stats.jitter_max == pytest.approx(0.02)
+
+
+def test_controller_speed(mbrick, mmotors, mtime):
+    positions = iter([0, 30, 90])
+    mbrick.get_output_state.side_effect = lambda port: output_state(
+        port, next(positions)
+    )
+    c = Controller(period=0.1)
+    c.add(mmotors[0], PID(0.1), target=600, speed=True)
+    c.step()
+    mtime.sleep(0.1)
+    c.step()
+    mtime.sleep(0.1)
+    c.set_target(mmotors[0], 400)
+    c.step()
+    # Speeds: 0, 300, 600.
+    assert mbrick.mock_calls == [
+        call.get_output_state(Port.A),
+        run_call(Port.A, 60),
+        call.get_output_state(Port.A),
+        run_call(Port.A, 30),
+        call.get_output_state(Port.A),
+        run_call(Port.A, -20),
+    ]
+
+
+def test_controller_add(mbrick, mbrick2, mmotors):
+    c = Controller()
+    c.add(mmotors[0], PID(1))
+    mbrick2.get_output_state.return_value = output_state(Port.B, 0)
+    with pytest.raises(ValueError):
+        c.add(mbrick2.get_motor(Port.B), PID(1))
+
+
+def test_controller_thread(mbrick, mmotors):
+    stepped = threading.Event()
+
+    def get_output_state(port):
+        stepped.set()
+        return output_state(port, 0)
+
+    mbrick.get_output_state.side_effect = get_output_state
+    c = Controller(period=0.01)
+    c.add(mmotors[0], PID(1), target=10)
+    c.start()
+    with pytest.raises(RuntimeError):
+        c.start()
+    assert stepped.wait(5)
+    c.stop()
+    assert run_call(Port.A, 10) in mbrick.mock_calls
+    assert c.stats.ticks >= 1
@@ -10,10 +10,14 @@
 # but WITHOUT ANY WARRANTY; without even the implied warranty of
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
-from unittest.mock import call
+import gc
+import threading
+import weakref
+from unittest.mock import MagicMock, call
 
 import pytest
 
+import nxt.brick
 import nxt.error
 import nxt.motcont
 import nxt.motor
@@ -106,6 +110,125 @@ def test_is_ready_error(mbrick, mc):
         mc.is_ready(nxt.motor.Port.B)
 
 
+def test_wait_ready(mbrick, mtime, mc):
+    mbrick.message_read.side_effect = [
+        (1, msg("0 0")),
+        (1, msg("1 1")),
+        (1, msg("0 1")),
+    ]
+    assert mc.wait_ready([nxt.motor.Port.A, nxt.motor.Port.B]) is True
+    # Only the port not yet ready is polled again.
+    assert mbrick.mock_calls == [
+        call.message_write(1, msg("3 0")),
+        call.message_write(1, msg("3 1")),
+        call.message_read(0, 1, 1),
+        call.message_read(0, 1, 1),
+        call.message_write(1, msg("3 0")),
+        call.message_read(0, 1, 1),
+    ]
+    # Requests are spaced, replies are read after the last one.
+    assert mtime.sleep.mock_calls == [
+        call(0.010),
+        call(0.015),
+        call(pytest.approx(0.010)),
+        call(0.015),
+    ]
+    assert mc.last_ready(nxt.motor.Port.A) == (True, mtime.time())
+    assert mc.last_ready(nxt.motor.Port.C) is None
+
+
+def test_wait_ready_late_reply(mbrick, mtime, mc):
+    mbrick.message_read.side_effect = [
+        (1, msg("0 1")),
+        nxt.error.EmptyMailboxError(""),
+        (1, msg("1 1")),
+    ]
+    assert mc.wait_ready([nxt.motor.Port.A, nxt.motor.Port.B]) is True
+    assert mbrick.message_read.call_count == 3
+    assert mtime.sleep.mock_calls[-1] == call(0.010)
+
+
+def test_wait_ready_timeout(mbrick, mtime, mc):
+    mbrick.message_read.return_value = (1, msg("2 0"))
+    assert mc.wait_ready(nxt.motor.Port.C, timeout=0.1) is False
+    assert mc.last_ready(nxt.motor.Port.C)[0] is False
+
+
+def test_ready_poller(mbrick, mtime, mc):
+    mbrick.message_read.side_effect = [
+        (1, msg("0 0")),
+        (1, msg("1 0")),
+        (1, msg("0 1")),
+        (1, msg("1 0")),
+        (1, msg("1 1")),
+    ]
+    p = nxt.motcont.ReadyPoller(mc)
+    p._start = lambda: None
+    assert p.step() is None
+    fa = p.cmd(nxt.motor.Port.A, 10, 100)
+    fb = p.watch(nxt.motor.Port.B)
+    fab = p.watch([nxt.motor.Port.A, nxt.motor.Port.B])
+    assert p.step() == p.period
+    assert mc.last_ready(nxt.motor.Port.B)[0] is False
+    assert p.step() == p.period
+    assert fa.result(0) is None
+    assert not fb.done() and not fab.done()
+    assert p.step() is None
+    assert fb.done() and fab.done()
+    assert mbrick.mock_calls == [
+        call.message_write(1, msg("1 0 010 000100 2")),
+        call.message_write(1, msg("3 0")),
+        call.message_write(1, msg("3 1")),
+        call.message_read(0, 1, 1),
+        call.message_read(0, 1, 1),
+        call.message_write(1, msg("3 0")),
+        call.message_write(1, msg("3 1")),
+        call.message_read(0, 1, 1),
+        call.message_read(0, 1, 1),
+        call.message_write(1, msg("3 1")),
+        call.message_read(0, 1, 1),
+    ]
+
+
+def test_ready_poller_error(mbrick, mtime, mc):
+    mbrick.message_read.return_value = (1, msg("2 1"))
+    p = nxt.motcont.ReadyPoller(mc)
+    p._start = lambda: None
+    f = p.watch(nxt.motor.Port.B)
+    assert p.step() is None
+    with pytest.raises(nxt.error.ProtocolError):
+        f.result(0)
+
+
+def test_ready_poller_thread(mbrick, mc):
+    mbrick.message_read.return_value = (1, msg("0 1"))
+    p = nxt.motcont.get_ready_poller(mc)
+    assert nxt.motcont.get_ready_poller(mc) is p
+    assert p.watch(nxt.motor.Port.A).result(5) is None
+
+
+def test_ready_poller_weak():
+    brick = nxt.brick.Brick(MagicMock())
+    mc = nxt.motcont.MotCont(brick)
+    nxt.motcont.get_ready_poller(mc)
+    ref = weakref.ref(brick)
+    del brick, mc
+    gc.collect()
+    assert ref() is None
+
+
+def test_lock(mbrick, mc):
+    # Commands are not sent while another exchange is in progress.
+    with mc._lock:
+        t = threading.Thread(target=mc.cmd, args=(nxt.motor.Port.A, 10, 100))
+        t.start()
+        t.join(0.05)
+        assert t.is_alive()
+        assert not mbrick.message_write.called
+    t.join(5)
+    assert mbrick.message_write.called
+
+
 def test_set_output_state(mbrick, mc):
     mc.set_output_state(nxt.motor.Port.C, -100, 1000, speedreg=1)
     mc.set_output_state(nxt.motor.Port.C, 10, 0, speedreg=0)
@@ -138,3 +261,79 @@ def test_stop(mbrick):
     assert mbrick.mock_calls == [
         call.stop_program(),
     ]
+
+
+@pytest.fixture
+def sched(mc):
+    s = nxt.motcont.MotContScheduler(mc)
+    s._start = lambda: None
+    return s
+
+
+def run_all(s, mtime):
+    while (delay := s.step()) is not None:
+        if delay:
+            mtime.sleep(delay)
+
+
+def test_scheduler_ports(mbrick, mtime, sched):
+    f1 = sched.cmd(nxt.motor.Port.B, -100, 1000)
+    f2 = sched.cmd(nxt.motor.Port.B, 10, 0)
+    # Not delayed by the second command on port B.
+    f3 = sched.cmd(nxt.motor.Port.C, 10, 0)
+    f4 = sched.reset_tacho(nxt.motor.Port.B)
+    run_all(sched, mtime)
+    assert mbrick.mock_calls == [
+        call.message_write(1, msg("1 1 200 001000 2")),
+        call.message_write(1, msg("1 2 010 000000 2")),
+        call.message_write(1, msg("1 1 010 000000 2")),
+        call.message_write(1, msg("2 1")),
+    ]
+    assert mtime.sleep.mock_calls == [call(pytest.approx(0.015))]
+    assert all(f.done() for f in (f1, f2, f3, f4))
+
+
+def test_scheduler_is_ready(mbrick, mtime, sched):
+    mbrick.message_read.side_effect = [(1, msg("1 1")), (1, msg("2 0"))]
+    f1 = sched.is_ready(nxt.motor.Port.B)
+    f2 = sched.is_ready(nxt.motor.Port.C)
+    # Held until the end of is_ready exchanges.
+    f3 = sched.set_output_state(nxt.motor.Port.A, 10, 0)
+    run_all(sched, mtime)
+    assert mbrick.mock_calls == [
+        call.message_write(1, msg("3 1")),
+        call.message_read(0, 1, 1),
+        call.message_write(1, msg("3 2")),
+        call.message_read(0, 1, 1),
+        call.message_write(1, msg("4 0 010 000000 1")),
+    ]
+    assert mtime.sleep.mock_calls == [
+        call(0.015),
+        call(pytest.approx(0.010)),
+        call(0.015),
+        call(pytest.approx(0.010)),
+    ]
+    assert f1.result() is True
+    assert f2.result() is False
+    assert f3.result() is None
+
+
+def test_scheduler_error(mbrick, mtime, sched):
+    mbrick.message_read.return_value = (1, msg("0 1"))
+    f = sched.is_ready(nxt.motor.Port.B)
+    run_all(sched, mtime)
+    with pytest.raises(nxt.error.ProtocolError):
+        f.result()
+    with pytest.raises(ValueError):
+        sched.cmd((nxt.motor.Port.A, nxt.motor.Port.B, nxt.motor.Port.C), 10, 0)
+
+
+def test_scheduler_thread(mbrick, mc):
+    s = nxt.motcont.MotContScheduler(mc)
+    futures = [s.cmd(nxt.motor.Port.A, 10, 0), s.cmd(nxt.motor.Port.B, 20, 0)]
+    for f in futures:
+        f.result(5)
+    assert mbrick.mock_calls == [
+        call.message_write(1, msg("1 0 010 000000 2")),
+        call.message_write(1, msg("1 1 020 000000 2")),
+    ]
@@ -10,10 +10,14 @@
 # but WITHOUT ANY WARRANTY; without even the implied warranty of
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
-from unittest.mock import MagicMock, call
+import concurrent.futures
+import gc
+import weakref
+from unittest.mock import MagicMock, call, patch
 
 import pytest
 
+import nxt.brick
 import nxt.motor
 from nxt.motor import Mode, Port, RegulationMode, RunState
 
@@ -57,6 +61,35 @@ def msyncmotor(mmotor, mmotorb):
     return m
 
 
+def test_records():
+    state, tacho = nxt.motor.get_tacho_and_state(
+        (Port.A, 50, Mode.ON, RegulationMode.SPEED, 0, RunState.RUNNING, 360, 1, 2, 3)
+    )
+    assert state.power == 50
+    assert state.run_state == RunState.RUNNING
+    assert state.to_list() == [
+        50,
+        Mode.ON,
+        RegulationMode.SPEED,
+        0,
+        RunState.RUNNING,
+        360,
+    ]
+    assert tacho == (1, 2, 3)
+    assert tacho.rotation_count == 3
+    with pytest.raises(AttributeError):
+        state.power = 0
+    with pytest.raises(AttributeError):
+        tacho.x = 0
+    assert state._replace(power=0).power == 0
+    assert tacho.get_target(10, -1) == nxt.motor.TachoInfo(-9, None, None)
+    # Previous constructors taking a list of values.
+    assert nxt.motor.TachoInfo([1, 2, 3]) == tacho
+    assert isinstance(nxt.motor.TachoInfo([1, 2, 3]), nxt.motor.TachoInfo)
+    assert nxt.motor.OutputState(state.to_list()) == state
+    assert isinstance(state._replace(power=0), nxt.motor.OutputState)
+
+
 def test_reset_position(mbrick, mmotor):
     mmotor.reset_position(True)
     mmotor.reset_position(False)
@@ -166,6 +199,71 @@ def test_turn(mbrick, mmotor, mtime):
     ]
 
 
+def test_turn_latency(mbrick, mmotor, mtime):
+    def state(tacho):
+        return (
+            Port.A,
+            50,
+            Mode.ON | Mode.REGULATED,
+            RegulationMode.SPEED,
+            0,
+            RunState.RUNNING,
+            0,
+            tacho,
+            tacho,
+            tacho,
+        )
+
+    # Threshold is 50 * 9 * 0.1 = 45 degrees.
+    mbrick.latency = 0.1
+    mbrick.get_output_state.side_effect = [state(0), state(300), state(320)]
+    mmotor.turn(50, 360)
+    assert mbrick.get_output_state.call_count == 3
+    assert mtime.sleep.mock_calls[0] == call(0.1)
+
+
+def test_turn_latency_fast(mmotor, mbrick):
+    mbrick.latency = 0.002
+    threshold, period = mmotor._turn_parameters(-100)
+    assert threshold == nxt.motor.MIN_THRESHOLD
+    assert period == 0.01
+
+
+def test_turn_predict(mbrick, mmotor, mtime):
+    # Motor is slower than theoretical speed, 400 degrees per second.
+    def get_output_state(port):
+        tacho = int(mtime.time() * 400)
+        return (port, 50, Mode.ON, RegulationMode.SPEED, 0, RunState.RUNNING, 0) + (
+            tacho,
+        ) * 3
+
+    mbrick.latency = 0.05
+    mbrick.get_output_state.side_effect = get_output_state
+    mmotor.turn(50, 360, predict=True)
+    # Brake command sent when the motor is 0.05 s from the target.
+    assert mtime.time() * 400 == pytest.approx(340, abs=3)
+    assert mbrick.get_output_state.call_count < 8
+    assert mbrick.mock_calls[-1] == call.set_output_state(
+        Port.A,
+        0,
+        Mode.ON | Mode.REGULATED | Mode.BRAKE,
+        RegulationMode.SPEED,
+        0,
+        RunState.RUNNING,
+        0,
+    )
+
+
+def test_turn_predict_blocked(mbrick, mmotor, mtime):
+    mbrick.latency = 0.05
+    with pytest.raises(nxt.motor.BlockedException):
+        mmotor.turn(50, 360, brake=False, timeout=0.5, predict=True)
+    assert mtime.time() > 0.5
+    assert mbrick.mock_calls[-1] == call.set_output_state(
+        Port.A, 0, Mode.IDLE, RegulationMode.IDLE, 0, RunState.IDLE, 0
+    )
+
+
 def test_turn_blocked(mbrick, mmotor, mtime):
     mtime.time.side_effect = [0, 0, 1, 2]
     with pytest.raises(nxt.motor.BlockedException):
@@ -237,6 +335,202 @@ def test_turn_stopped(mbrick, mmotor, mtime):
     ]
 
 
+def test_turn_limited(mbrick, mmotor, mtime):
+    def state(run_state, tacho):
+        return (Port.A, 50, Mode.ON, RegulationMode.SPEED, 0, run_state, 360) + (
+            tacho,
+        ) * 3
+
+    mbrick.get_output_state.side_effect = [
+        state(RunState.IDLE, 100),
+        state(RunState.RUNNING, 400),
+        state(RunState.IDLE, 460),
+    ]
+    tacho = mmotor.turn_limited(50, 360)
+    assert tacho.rotation_count == 460
+    assert mbrick.mock_calls == [
+        call.get_output_state(Port.A),
+        call.set_output_state(
+            Port.A,
+            50,
+            Mode.ON | Mode.REGULATED | Mode.BRAKE,
+            RegulationMode.SPEED,
+            0,
+            RunState.RUNNING,
+            360,
+        ),
+        call.get_output_state(Port.A),
+        call.get_output_state(Port.A),
+    ]
+    # First read after theoretical duration, then after remaining duration at
+    # measured speed: 60 / (300 / 0.8).
+    assert mtime.sleep.mock_calls == [call(0.8), call(pytest.approx(0.16))]
+
+
+def test_turn_limited_blocked(mbrick, mmotor, mtime):
+    mbrick.get_output_state.return_value = (
+        Port.A,
+        -50,
+        Mode.ON,
+        RegulationMode.SPEED,
+        0,
+        RunState.RUNNING,
+        360,
+    ) + (0,) * 3
+    with pytest.raises(nxt.motor.BlockedException):
+        mmotor.turn_limited(-50, 360, brake=False, timeout=0.5)
+    assert mbrick.mock_calls[1] == call.set_output_state(
+        Port.A,
+        -50,
+        Mode.ON | Mode.REGULATED,
+        RegulationMode.SPEED,
+        0,
+        RunState.RUNNING,
+        360,
+    )
+    assert mbrick.mock_calls[-1] == call.set_output_state(
+        Port.A, 0, Mode.IDLE, RegulationMode.IDLE, 0, RunState.IDLE, 0
+    )
+
+
+@pytest.fixture
+def mpoller(mbrick):
+    """Poller with no background thread, use step() to run it."""
+    with patch.object(nxt.motor.MotorPoller, "_start"):
+        poller = nxt.motor.get_poller(mbrick)
+
+        def run():
+            while (delay := poller.step()) is not None:
+                nxt.motor.time.sleep(delay)
+
+        poller.run = run
+        yield poller
+
+
+def moving_state(speeds):
+    """Return get_output_state side effect for motors turning at constant speed."""
+
+    def get_output_state(port):
+        tacho = int(nxt.motor.time.time() * speeds[port])
+        return (port, 50, Mode.ON, RegulationMode.SPEED, 0, RunState.RUNNING, 0) + (
+            tacho,
+        ) * 3
+
+    return get_output_state
+
+
+BRAKE_A = call.set_output_state(
+    Port.A,
+    0,
+    Mode.ON | Mode.REGULATED | Mode.BRAKE,
+    RegulationMode.SPEED,
+    0,
+    RunState.RUNNING,
+    0,
+)
+
+
+def test_move_to(mbrick, mmotor, mtime, mpoller):
+    mbrick.latency = 0.05
+    mbrick.get_output_state.side_effect = moving_state({Port.A: 400})
+    f = mmotor.move_to(360, 50)
+    assert mbrick.mock_calls[1] == call.set_output_state(
+        Port.A,
+        50,
+        Mode.ON | Mode.REGULATED,
+        RegulationMode.SPEED,
+        0,
+        RunState.RUNNING,
+        0,
+    )
+    assert not f.done()
+    mpoller.run()
+    assert f.result().tacho_count < 360
+    assert mtime.time() * 400 == pytest.approx(340, abs=3)
+    assert mbrick.get_output_state.call_count < 8
+    assert mbrick.mock_calls[-1] == BRAKE_A
+
+
+def test_move_to_concurrent(mbrick, mmotor, mmotorb, mtime, mpoller):
+    mbrick.latency = 0.05
+    mbrick.get_output_state.side_effect = moving_state({Port.A: 400, Port.B: -200})
+    fa = mmotor.move_to(360, 50)
+    fb = mmotorb.move_to(-180, 50, brake=False)
+    mpoller.run()
+    assert fa.result().tacho_count == pytest.approx(340, abs=5)
+    # Result is the last read position, B is stopped without reading it again.
+    assert -180 < fb.result().tacho_count < -150
+    assert mbrick.mock_calls[-1] == call.set_output_state(
+        Port.B, 0, Mode.IDLE, RegulationMode.IDLE, 0, RunState.IDLE, 0
+    )
+    assert BRAKE_A in mbrick.mock_calls
+
+
+def test_move_to_idle(mbrick, mmotor, mtime, mpoller):
+    f = mmotor.move_to(-360)
+    mpoller.run()
+    # Motor state is idle (default mock state), move is considered finished.
+    assert f.result().tacho_count == 0
+    assert mbrick.get_output_state.call_count == 2
+
+
+def test_move_to_on_target(mbrick, mmotor, mpoller):
+    f = mmotor.move_to(0)
+    assert f.result().tacho_count == 0
+    assert mpoller.step() is None
+    assert mbrick.mock_calls == [call.get_output_state(Port.A)]
+
+
+def test_move_to_cancel(mbrick, mmotor, mtime, mpoller):
+    mbrick.get_output_state.side_effect = moving_state({Port.A: 400})
+    f = mmotor.move_to(360)
+    assert f.cancel()
+    mpoller.run()
+    assert f.cancelled()
+    assert mbrick.mock_calls[-1] == BRAKE_A
+
+
+def test_move_to_replace(mbrick, mmotor, mtime, mpoller):
+    mbrick.latency = 0.05
+    mbrick.get_output_state.side_effect = moving_state({Port.A: 400})
+    f1 = mmotor.move_to(360)
+    f2 = mmotor.move_to(180)
+    mpoller.run()
+    assert f1.cancelled()
+    assert f2.result().tacho_count < 180
+    assert mbrick.mock_calls.count(BRAKE_A) == 1
+
+
+def test_move_to_blocked(mbrick, mmotor, mtime, mpoller):
+    mbrick.get_output_state.side_effect = moving_state({Port.A: 0})
+    f = mmotor.move_to(360, timeout=0.5)
+    mpoller.run()
+    with pytest.raises(nxt.motor.BlockedException):
+        f.result()
+    assert mtime.time() > 0.5
+    assert mbrick.mock_calls[-1] == BRAKE_A
+
+
+def test_move_to_thread(mbrick, mmotor):
+    # Time is mocked, use a large latency so that the motor is stopped at once.
+    mbrick.latency = 1
+    f = mmotor.move_to(36)
+    assert isinstance(f, concurrent.futures.Future)
+    assert f.result(timeout=5).tacho_count == 0
+    assert mbrick.mock_calls[-1] == BRAKE_A
+
+
+def test_poller_weak():
+    brick = nxt.brick.Brick(MagicMock())
+    poller = nxt.motor.get_poller(brick)
+    assert nxt.motor.get_poller(brick) is poller
+    ref = weakref.ref(brick)
+    del brick
+    gc.collect()
+    assert ref() is None
+    assert poller not in nxt.motor._pollers.values()
+
+
 def test_sync_run(mbrick, msyncmotor):
     msyncmotor.run(50)
     assert mbrick.mock_calls == [
@@ -26,10 +26,13 @@ from nxt.sensor import Mode, Port, Type
 
 @pytest.fixture
 def mdigital(monkeypatch):
-    m = Mock(spec_set=("read_value", "write_value"))
+    m = Mock(spec_set=("read_value", "read_values", "write_value"))
     monkeypatch.setattr(
         nxt.sensor.digital.BaseDigitalSensor, "read_value", m.read_value
     )
+    monkeypatch.setattr(
+        nxt.sensor.digital.BaseDigitalSensor, "read_values", m.read_values
+    )
     monkeypatch.setattr(
         nxt.sensor.digital.BaseDigitalSensor, "write_value", m.write_value
     )
@@ -108,6 +111,40 @@ class TestGeneric:
         ]
         assert mtime.sleep.mock_calls == (retries - 1) * [call(0.1)]
 
+    def test_sampler(self, mbrick, mbrick2, mtime):
+        s1 = mbrick.get_sensor(Port.S1, nxt.sensor.analog.BaseAnalogSensor)
+        s3 = mbrick.get_sensor(Port.S3, nxt.sensor.analog.BaseAnalogSensor)
+        idle = (Type.NO_SENSOR, Mode.RAW, 1023, 1023, 1023, 1023)
+        mbrick.get_all_input_values.side_effect = [
+            [
+                (Port.S1, True, False, Type.SWITCH, Mode.BOOL, 1, 2, 3, 2),
+                (Port.S2, True, False, *idle),
+                (Port.S3, False, False, Type.LIGHT_ACTIVE, Mode.RAW, 5, 6, 7, 6),
+                (Port.S4, True, False, *idle),
+            ],
+            [
+                (Port.S1, True, False, Type.SWITCH, Mode.BOOL, 1, 2, 3, 2),
+                (Port.S2, True, False, *idle),
+                (Port.S3, True, False, Type.LIGHT_ACTIVE, Mode.RAW, 5, 6, 7, 6),
+                (Port.S4, True, False, *idle),
+            ],
+        ]
+        sampler = nxt.sensor.analog.Sampler([s3, s1])
+        v3, v1 = sampler.get_valid_input_values()
+        assert v1.port == Port.S1
+        assert v1.scaled_value == 3
+        assert v3.port == Port.S3
+        assert v3.valid is True
+        assert v3.raw_value == 5
+        assert mbrick.mock_calls == [
+            call.get_all_input_values(),
+            call.get_all_input_values(),
+        ]
+        assert mtime.sleep.mock_calls == [call(0.1)]
+        s2 = mbrick2.get_sensor(Port.S2, nxt.sensor.analog.BaseAnalogSensor)
+        with pytest.raises(ValueError):
+            nxt.sensor.analog.Sampler([s1, s2])
+
     def test_touch(self, mbrick):
         assert (
             nxt.sensor.generic.Touch.get_sample is nxt.sensor.generic.Touch.is_pressed
@@ -202,10 +239,9 @@ class TestDigital:
 
     def test_get_sensor_info(self, mbrick):
         s = mbrick.get_sensor(Port.S1, nxt.sensor.digital.BaseDigitalSensor, False)
-        mbrick.ls_get_status.return_value = 8
+        mbrick.ls_get_status.return_value = 16
         mbrick.ls_read.side_effect = [
-            self.version_bin,
-            self.product_id_bin,
+            self.version_bin + self.product_id_bin,
             self.sensor_type_bin,
         ]
         info = s.get_sensor_info()
@@ -213,12 +249,10 @@ class TestDigital:
         assert info.product_id == "LEGO"
         assert info.sensor_type == "Sonar"
         print(info)
+        assert s.get_sensor_info(cached=True) is info
         assert mbrick.mock_calls == [
             call.set_input_mode(Port.S1, Type.LOW_SPEED_9V, Mode.RAW),
-            call.ls_write(Port.S1, bytes((0x02, 0x00)), 8),
-            call.ls_get_status(Port.S1),
-            call.ls_read(Port.S1),
-            call.ls_write(Port.S1, bytes((0x02, 0x08)), 8),
+            call.ls_write(Port.S1, bytes((0x02, 0x00)), 16),
             call.ls_get_status(Port.S1),
             call.ls_read(Port.S1),
             call.ls_write(Port.S1, bytes((0x02, 0x10)), 8),
@@ -226,18 +260,65 @@ class TestDigital:
             call.ls_read(Port.S1),
         ]
 
+    def test_fast_init(self, mbrick, mtime):
+        cls = nxt.sensor.digital.BaseDigitalSensor
+        mbrick.ls_get_status.side_effect = [
+            nxt.error.DirectProtocolError("bus error"),
+            16,
+            8,
+        ]
+        mbrick.ls_read.side_effect = [
+            b"",
+            self.version_bin + self.product_id_bin,
+            self.sensor_type_bin,
+        ]
+        start = mtime.time()
+        s = cls(mbrick, Port.S1, fast_init=True)
+        # Less than the fixed delay.
+        assert mtime.time() - start < 0.1
+        assert s.get_sensor_info(cached=True).product_id == "LEGO"
+        mbrick.reset_mock()
+        # Port is not initialized again, identification is cached.
+        cls.add_compatible_sensor("V1.0", "LEGO", "Sonar")
+        try:
+            s2 = cls(mbrick, Port.S1)
+        finally:
+            del cls.compatible_sensors
+        assert mbrick.mock_calls == []
+        # Unless mode is changed.
+        s2.set_input_mode(Type.LOW_SPEED_9V, Mode.RAW)
+        cls(mbrick, Port.S1, False)
+        assert mtime.time() - start > 0.1
+
+    def test_mode_changed(self, mbrick, mtime):
+        cls = nxt.sensor.digital.BaseDigitalSensor
+        mbrick.ls_get_status.side_effect = [16, 8]
+        mbrick.ls_read.side_effect = [
+            self.version_bin + self.product_id_bin,
+            self.sensor_type_bin,
+        ]
+        cls(mbrick, Port.S1, fast_init=True)
+        bus = nxt.sensor.digital.get_bus(mbrick, Port.S1)
+        assert bus.initialized and bus.sensor_info is not None
+        # Port used by an analog sensor.
+        mbrick.get_sensor(Port.S1, nxt.sensor.generic.Touch)
+        assert not bus.initialized and bus.sensor_info is None
+        mbrick.reset_mock()
+        cls(mbrick, Port.S1, False)
+        assert mbrick.mock_calls == [
+            call.set_input_mode(Port.S1, Type.LOW_SPEED_9V, Mode.RAW),
+        ]
+
     def test_check_compatible(self, mbrick, caplog):
         class DummySensor(nxt.sensor.digital.BaseDigitalSensor):
             pass
 
         DummySensor.add_compatible_sensor(None, "NXT-PYTH", "Dummy")
-        mbrick.ls_get_status.return_value = 8
+        mbrick.ls_get_status.return_value = 16
         mbrick.ls_read.side_effect = [
-            b"V3\0\0\0\0\0\0",
-            b"NXT-PYTH",
+            b"V3\0\0\0\0\0\0NXT-PYTH",
             b"Dummy\0\0\0",
-            b"V2\0\0\0\0\0\0",
-            b"NXT-PYTH",
+            b"V2\0\0\0\0\0\0NXT-PYTH",
             b"Plop\0\0\0\0",
         ]
         DummySensor(mbrick, Port.S1)
@@ -267,6 +348,53 @@ class TestDigital:
             call.ls_read(Port.S1),
         ]
 
+    def test_status_backoff(self, mbrick, mtime):
+        s = mbrick.get_sensor(Port.S1, nxt.sensor.digital.BaseDigitalSensor, False)
+        pending = nxt.error.I2CPendingError("pending")
+        mbrick.ls_get_status.side_effect = [pending, pending, pending, 8, 8]
+        mbrick.ls_read.return_value = self.product_id_bin
+        mtime.sleep.reset_mock()
+        s.read_value("product_id")
+        # Delay doubles between polls.
+        assert mtime.sleep.mock_calls == [
+            call(pytest.approx(0.001)),
+            call(pytest.approx(0.002)),
+            call(pytest.approx(0.004)),
+        ]
+        stats = s.i2c_stats
+        assert (stats.transactions, stats.polls, stats.pending) == (1, 4, 3)
+        assert stats.wait_estimate == pytest.approx(0.007 / 2)
+        mtime.sleep.reset_mock()
+        mtime.sleep(1)
+        s.read_value("product_id")
+        # First poll is delayed by the learned time.
+        assert mtime.sleep.mock_calls == [call(1), call(pytest.approx(0.0035))]
+        assert s.i2c_stats.polls == 5
+        assert s.i2c_stats.wait_estimate == pytest.approx(0.0035 * 0.9)
+
+    def test_bus(self, mbrick, mbrick2, mtime):
+        cls = nxt.sensor.digital.BaseDigitalSensor
+        s1 = mbrick.get_sensor(Port.S1, cls, False)
+        s1b = mbrick.get_sensor(Port.S1, cls, False)
+        s2 = mbrick.get_sensor(Port.S2, cls, False)
+        other = cls(mbrick2, Port.S1, False)
+        assert s1._bus is s1b._bus
+        assert s1._bus is not s2._bus and s1._bus is not other._bus
+        s1.poll_delay = 0.02
+        assert s1b.poll_delay == 0.02
+        mtime.sleep(1)
+        mtime.sleep.reset_mock()
+        start = mtime.time()
+        s1.write_value("factory_scale_factor", (1,))
+        s2.write_value("factory_scale_factor", (1,))
+        other.write_value("factory_scale_factor", (1,))
+        # Same port, even with another object.
+        s1b.write_value("factory_scale_factor", (1,))
+        assert mtime.sleep.mock_calls == [call(pytest.approx(0.02))]
+        assert s1b.last_poll == pytest.approx(start + 0.02)
+        s1.last_poll = 0
+        assert s1b.last_poll == 0
+
     def test_status_timeout(self, mbrick):
         s = mbrick.get_sensor(Port.S1, nxt.sensor.digital.BaseDigitalSensor, False)
         mbrick.ls_get_status.side_effect = (
@@ -310,6 +438,112 @@ class TestDigital:
         ] * 3
         assert mbrick.mock_calls == mock_calls
 
+    def test_read_values(self, mbrick):
+        s = mbrick.get_sensor(Port.S1, nxt.sensor.digital.BaseDigitalSensor, False)
+        s.I2C_ADDRESS = dict(
+            s.I2C_ADDRESS,
+            a=(0x42, "<H"),
+            b=(0x44, "<b"),
+            c=(0x47, "<B"),
+            d=(0x53, "<B"),
+            e=(0x42, "<B"),
+        )
+        mbrick.ls_get_status.return_value = 16
+        mbrick.ls_read.side_effect = [
+            bytes((0x34, 0x12, 0xFF, 0, 0, 0x56)),
+            bytes((0x78,)),
+        ]
+        assert s.read_values("c", "a", "d", "b") == ((0x56,), (0x1234,), (0x78,), (-1,))
+        assert mbrick.mock_calls == [
+            call.set_input_mode(Port.S1, Type.LOW_SPEED_9V, Mode.RAW),
+            call.ls_write(Port.S1, bytes((0x02, 0x42)), 6),
+            call.ls_get_status(Port.S1),
+            call.ls_read(Port.S1),
+            # Does not fit in the first read.
+            call.ls_write(Port.S1, bytes((0x02, 0x53)), 1),
+            call.ls_get_status(Port.S1),
+            call.ls_read(Port.S1),
+        ]
+        # Several values at the same address.
+        mbrick.ls_get_status.return_value = 2
+        mbrick.ls_read.side_effect = [bytes((0x34, 0x12))]
+        assert s.read_values("e", "a") == ((0x34,), (0x1234,))
+
+    def test_registers(self, mbrick):
+        class DummySensor(nxt.sensor.digital.BaseDigitalSensor):
+            I2C_DEV = 0x10
+            I2C_ADDRESS = {"value": (0x42, "<h"), "command": (0x41, "B")}
+
+        reg = DummySensor.I2C_REGISTERS["value"]
+        assert reg.address == 0x42
+        assert reg.layout.format == "<h"
+        assert reg.prefix == bytes((0x10, 0x42))
+        s = DummySensor(mbrick, Port.S1)
+        assert s.register("value") is reg
+        mbrick.ls_get_status.return_value = 2
+        mbrick.ls_read.return_value = bytes((0xFE, 0xFF))
+        assert s.read_register(reg) == (-2,)
+        s.write_register(s.register("command"), (0x12,))
+        assert mbrick.mock_calls == [
+            call.set_input_mode(Port.S1, Type.LOW_SPEED_9V, Mode.RAW),
+            call.ls_write(Port.S1, bytes((0x10, 0x42)), 2),
+            call.ls_get_status(Port.S1),
+            call.ls_read(Port.S1),
+            call.ls_write(Port.S1, bytes((0x10, 0x41, 0x12)), 0),
+        ]
+        # Base class is not changed.
+        assert "value" not in nxt.sensor.digital.BaseDigitalSensor.I2C_REGISTERS
+
+    def test_read_sensors(self, mbrick):
+        s1 = mbrick.get_sensor(Port.S1, nxt.sensor.digital.BaseDigitalSensor, False)
+        s2 = mbrick.get_sensor(Port.S2, nxt.sensor.digital.BaseDigitalSensor, False)
+        mbrick.reset_mock()
+        mbrick.ls_get_status.side_effect = [
+            8,
+            nxt.error.I2CPendingError("pending"),
+            1,
+            nxt.error.DirectProtocolError("bus error"),
+            1,
+        ]
+        mbrick.ls_read.side_effect = [
+            self.version_bin,
+            bytes((42,)),
+            bytes((0,)),
+            bytes((43,)),
+        ]
+        values = nxt.sensor.digital.read_sensors(
+            [
+                (s1, "version"),
+                (s2, "factory_scale_factor"),
+                (s1, "factory_scale_divisor"),
+            ]
+        )
+        assert values == [(self.version_bin,), (42,), (43,)]
+        assert mbrick.mock_calls == [
+            # Transactions started on both ports.
+            call.ls_write(Port.S1, bytes((0x02, 0x00)), 8),
+            call.ls_write(Port.S2, bytes((0x02, 0x12)), 1),
+            call.ls_get_status(Port.S1),
+            call.ls_read(Port.S1),
+            call.ls_get_status(Port.S2),
+            call.ls_get_status(Port.S2),
+            call.ls_read(Port.S2),
+            # Second read on the same port, retried after an error.
+            call.ls_write(Port.S1, bytes((0x02, 0x13)), 1),
+            call.ls_get_status(Port.S1),
+            call.ls_read(Port.S1),
+            call.ls_write(Port.S1, bytes((0x02, 0x13)), 1),
+            call.ls_get_status(Port.S1),
+            call.ls_read(Port.S1),
+        ]
+
+    def test_read_sensors_timeout(self, mbrick):
+        s1 = mbrick.get_sensor(Port.S1, nxt.sensor.digital.BaseDigitalSensor, False)
+        mbrick.ls_get_status.side_effect = nxt.error.DirectProtocolError("bus error")
+        with pytest.raises(nxt.error.I2CError):
+            nxt.sensor.digital.read_sensors([(s1, "version")])
+        assert mbrick.ls_write.call_count == 3
+
     def test_find_class(self):
         def test(info, cls):
             found = nxt.sensor.digital.find_class(nxt.sensor.digital.SensorInfo(*info))
@@ -340,27 +574,60 @@ class TestDigital:
         test(("Vx.xx", "HiTechnc", "MotorCon"), nxt.sensor.hitechnic.MotorCon)
 
     def test_get_sensor(self, mbrick):
-        mbrick.ls_get_status.return_value = 8
+        mbrick.ls_get_status.return_value = 16
         mbrick.ls_read.side_effect = [
-            self.version_bin,
-            self.product_id_bin,
+            self.version_bin + self.product_id_bin,
             self.sensor_type_bin,
         ]
         assert mbrick.get_sensor(Port.S1).__class__ is nxt.sensor.generic.Ultrasonic
         assert mbrick.mock_calls == [
             call.set_input_mode(Port.S1, Type.LOW_SPEED_9V, Mode.RAW),
-            call.ls_write(Port.S1, bytes((0x02, 0x00)), 8),
-            call.ls_get_status(Port.S1),
-            call.ls_read(Port.S1),
-            call.ls_write(Port.S1, bytes((0x02, 0x08)), 8),
+            call.ls_write(Port.S1, bytes((0x02, 0x00)), 16),
             call.ls_get_status(Port.S1),
             call.ls_read(Port.S1),
             call.ls_write(Port.S1, bytes((0x02, 0x10)), 8),
             call.ls_get_status(Port.S1),
             call.ls_read(Port.S1),
-            call.set_input_mode(Port.S1, Type.LOW_SPEED_9V, Mode.RAW),
         ]
 
+    def test_detect_sensors(self, mbrick, mtime):
+        ids = {
+            Port.S1: [self.version_bin + self.product_id_bin, self.sensor_type_bin],
+            Port.S2: [self.version_bin + b"Unknown\0", self.sensor_type_bin],
+        }
+        raw = {Port.S3: 500, Port.S4: 1023}
+
+        def ls_get_status(port):
+            if port not in ids:
+                raise nxt.error.DirectProtocolError("bus error")
+            return 16
+
+        def ls_read(port):
+            return ids[port].pop(0) if port in ids else b""
+
+        def get_input_values(port):
+            return (port, True, False, Type.NO_SENSOR, Mode.RAW, raw[port], 0, 0, 0)
+
+        mbrick.ls_get_status.side_effect = ls_get_status
+        mbrick.ls_read.side_effect = ls_read
+        mbrick.get_input_values.side_effect = get_input_values
+        sensors = mbrick.detect_sensors()
+        assert list(sensors) == list(Port)
+        assert type(sensors[Port.S1]) is nxt.sensor.generic.Ultrasonic
+        assert type(sensors[Port.S2]) is nxt.sensor.digital.BaseDigitalSensor
+        assert type(sensors[Port.S3]) is nxt.sensor.analog.BaseAnalogSensor
+        assert sensors[Port.S4] is None
+        for port in Port:
+            assert (
+                call.set_input_mode(port, Type.LOW_SPEED_9V, Mode.RAW)
+                in mbrick.mock_calls
+            )
+        assert call.set_input_mode(Port.S3, Type.NO_SENSOR, Mode.RAW) in (
+            mbrick.mock_calls
+        )
+        # No fixed initialization delay.
+        assert call(0.1) not in mtime.sleep.mock_calls
+
 
 class TestGenericDigital:
     """Test LEGO digital sensors."""
@@ -498,6 +765,14 @@ class TestMindsensors:
         #  - Pretty sure struct_time is not right too.
         mdigital.read_value.side_effect = [(0x32,)]
         assert s.get_seconds() == "32"
+        mdigital.read_values.return_value = tuple(
+            (v,) for v in (0x32, 0x59, 0x23, 0x03, 0x25, 0x12, 0x24)
+        )
+        st = s.get_sample()
+        assert tuple(st)[:7] == (2024, 12, 25, 23, 59, 32, 3)
+        assert mdigital.read_values.mock_calls == [
+            call("seconds", "minutes", "hours", "day", "date", "month", "year")
+        ]
 
     def test_accl(self, mbrick, mdigital):
         assert (
@@ -676,17 +951,15 @@ class TestMindsensors:
 
     def test_ps2(self, mbrick, mdigital):
         s = mbrick.get_sensor(Port.S1, nxt.sensor.mindsensors.PS2, False)
-        mdigital.read_value.side_effect = [
-            (42,),
-            (0x55,),
-            # TODO: read everything in one read.
+        mdigital.read_value.side_effect = [(42,), (0x55,)]
+        mdigital.read_values.return_value = (
             (0x55,),
             (0x55,),
             (42,),
             (43,),
             (44,),
             (45,),
-        ]
+        )
         s.command(s.Commands.POWER_ON)
         assert s.get_joystick("x", "left") == 42
         assert s.get_buttons(1) == 0x55
@@ -711,12 +984,14 @@ class TestMindsensors:
             call.write_value("command", (ord("E"),)),
             call.read_value("x_left_joystick"),
             call.read_value("button_set_1"),
-            call.read_value("button_set_1"),
-            call.read_value("button_set_2"),
-            call.read_value("x_left_joystick"),
-            call.read_value("y_left_joystick"),
-            call.read_value("x_right_joystick"),
-            call.read_value("y_right_joystick"),
+            call.read_values(
+                "button_set_1",
+                "button_set_2",
+                "x_left_joystick",
+                "y_left_joystick",
+                "x_right_joystick",
+                "y_right_joystick",
+            ),
         ]
 
 
@@ -729,11 +1004,11 @@ class TestHitechnic:
             is nxt.sensor.hitechnic.Compass.get_heading
         )
         s = mbrick.get_sensor(Port.S1, nxt.sensor.hitechnic.Compass, False)
-        mdigital.read_value.return_value = (10,)
+        mdigital.read_values.return_value = ((10,), (10,))
         assert s.get_heading() == 30
         assert s.get_relative_heading(0) == 30
         assert s.get_relative_heading(-170) == -160
-        mdigital.read_value.return_value = (-10,)
+        mdigital.read_values.return_value = ((-10,), (-10,))
         assert s.get_relative_heading(170) == 160
         assert s.is_in_range(-40, -20) is True
         assert s.is_in_range(-20, -40) is False
@@ -743,8 +1018,7 @@ class TestHitechnic:
         with pytest.raises(ValueError):
             s.set_mode(s.Modes.CALIBRATION_FAILED)
         assert mdigital.mock_calls == [
-            call.read_value("heading"),
-            call.read_value("adder"),
+            call.read_values("heading", "adder"),
         ] * 6 + [
             call.read_value("mode"),
             call.write_value("mode", (0x43,)),
@@ -947,10 +1221,9 @@ class TestHitechnic:
 
     def test_superpro(self, mbrick, mdigital):
         s = mbrick.get_sensor(Port.S1, nxt.sensor.hitechnic.SuperPro, False)
-        mdigital.read_value.side_effect = [[0x00], [0x00], [0x00], [0x00]]
-        s.get_analog()
-        mdigital.read_value.side_effect = [[0x00], [0x00], [0x00], [0x00]]
-        s.get_analog_volts()
+        mdigital.read_values.return_value = ((0x0100,), (0x0201,), (0x0,), (0x0,))
+        assert s.get_analog() == {"a0": 1, "a1": 6, "a2": 0, "a3": 0}
+        assert s.get_analog_volts()["a0"] == pytest.approx(3.3 / 1023)
         mdigital.read_value.side_effect = [[0x00]]
         s.get_digital()
         s.set_digital([0, 1, 0, 1, 0, 1, 0, 1])
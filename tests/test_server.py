@@ -0,0 +1,147 @@
+# test_server -- Test nxt.command.server module
+# Copyright (C) 2021  Nicolas Schodet
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+import threading
+import urllib.request
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+import nxt.command.server
+
+
+@pytest.fixture
+def mbrick():
+    brick = Mock(spec_set=("_lock", "_sock", "get_battery_level"))
+    brick._lock = threading.Lock()
+    brick._sock.type = "usb"
+    brick.get_battery_level.return_value = 7890
+    return brick
+
+
+@pytest.fixture
+def metrics(mbrick):
+    return nxt.command.server.Metrics(mbrick)
+
+
+def lines(metrics):
+    return metrics.render().splitlines()
+
+
+def commands(opcode, reply, count):
+    return f'nxt_server_commands_total{{opcode="{opcode}",reply="{reply}"}} {count}'
+
+
+def test_metrics_empty(metrics):
+    out = lines(metrics)
+    assert "nxt_server_reconnects_total 0" in out
+    assert "nxt_server_brick_latency_seconds_count 0" in out
+    assert not any("quantile" in line for line in out)
+    assert "nxt_brick_battery_volts 7.89" in out
+
+
+def test_metrics_commands(metrics):
+    metrics.connection("1.2.3.4")
+    metrics.connection("1.2.3.4")
+    metrics.connection("5.6.7.8")
+    metrics.command("1.2.3.4", bytes.fromhex("000b"), bytes.fromhex("020b00"), 1, 2)
+    metrics.command("5.6.7.8", bytes.fromhex("8003"), None, 0.5, None)
+    metrics.command("5.6.7.8", bytes.fromhex("00ff"), bytes.fromhex("02ffbe"), 0, 4)
+    metrics.error()
+    out = lines(metrics)
+    assert commands("DIRECT_GET_BATT_LVL", "true", 1) in out
+    assert commands("DIRECT_PLAY_TONE", "false", 1) in out
+    assert commands("0xff", "true", 1) in out
+    assert 'nxt_server_client_commands_total{client="1.2.3.4"} 1' in out
+    assert 'nxt_server_client_commands_total{client="5.6.7.8"} 2' in out
+    assert 'nxt_server_connections_total{client="1.2.3.4"} 2' in out
+    assert "nxt_server_reconnects_total 1" in out
+    assert "nxt_server_received_bytes_total 6" in out
+    assert "nxt_server_sent_bytes_total 6" in out
+    assert "nxt_server_errors_total 1" in out
+    assert "nxt_server_queue_delay_seconds_sum 1.5" in out
+    assert "nxt_server_queue_delay_seconds_count 3" in out
+    assert 'nxt_server_brick_latency_seconds{quantile="0.5"} 4' in out
+    assert "nxt_server_brick_latency_seconds_sum 6.0" in out
+    assert "nxt_server_brick_latency_seconds_count 2" in out
+
+
+def test_metrics_quantiles(metrics):
+    for i in range(100):
+        metrics.command("c", bytes.fromhex("000b"), b"", 0, i)
+    out = lines(metrics)
+    assert 'nxt_server_brick_latency_seconds{quantile="0.5"} 50' in out
+    assert 'nxt_server_brick_latency_seconds{quantile="0.9"} 90' in out
+    assert 'nxt_server_brick_latency_seconds{quantile="0.99"} 99' in out
+
+
+def test_metrics_battery(mbrick, metrics):
+    with patch("nxt.command.server.time.monotonic") as monotonic:
+        monotonic.return_value = 100
+        metrics.render()
+        monotonic.return_value = 105
+        metrics.render()
+        assert mbrick.get_battery_level.call_count == 1
+        monotonic.return_value = 110
+        mbrick.get_battery_level.side_effect = [OSError]
+        out = lines(metrics)
+        assert mbrick.get_battery_level.call_count == 2
+        assert not any("battery" in line for line in out)
+
+
+def test_metrics_http(metrics):
+    httpd = nxt.command.server.start_metrics_server(metrics, "127.0.0.1", 0)
+    try:
+        base = f"http://127.0.0.1:{httpd.server_address[1]}"
+        with urllib.request.urlopen(base + "/metrics") as r:
+            assert r.headers["Content-Type"].startswith("text/plain")
+            assert b"nxt_server_commands_total" in r.read()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(base + "/other")
+    finally:
+        httpd.shutdown()
+
+
+def test_serve(mbrick, metrics):
+    channel = Mock(spec_set=("recv", "send", "close"))
+    channel.recv.side_effect = [
+        bytes.fromhex("000b"),
+        bytes.fromhex("8003f401f401"),
+        bytes.fromhex("98"),
+        bytes.fromhex("99"),
+    ]
+    mbrick._sock.recv.return_value = bytes.fromhex("020b00401f")
+    nxt.command.server.serve(mbrick, channel, ("1.2.3.4", 1234), metrics)
+    assert mbrick._sock.send.mock_calls == [
+        call(bytes.fromhex("000b")),
+        call(bytes.fromhex("8003f401f401")),
+    ]
+    assert channel.send.mock_calls == [
+        call(bytes.fromhex("020b00401f")),
+        call(b"usb"),
+    ]
+    assert channel.close.called
+    assert not mbrick._lock.locked()
+    out = lines(metrics)
+    assert commands("DIRECT_GET_BATT_LVL", "true", 1) in out
+    assert commands("DIRECT_PLAY_TONE", "false", 1) in out
+    assert 'nxt_server_connections_total{client="1.2.3.4"} 1' in out
+    assert "nxt_server_brick_latency_seconds_count 1" in out
+    assert "nxt_server_errors_total 0" in out
+
+
+def test_serve_error(mbrick, metrics):
+    channel = Mock(spec_set=("recv", "send", "close"))
+    channel.recv.side_effect = [bytes.fromhex("42")]
+    nxt.command.server.serve(mbrick, channel, ("1.2.3.4", 1234), metrics)
+    assert channel.close.called
+    assert "nxt_server_errors_total 1" in lines(metrics)
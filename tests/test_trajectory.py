@@ -0,0 +1,150 @@
+# test_trajectory -- Test nxt.trajectory module
+# Copyright (C) 2021  Nicolas Schodet
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+from unittest.mock import call
+
+import pytest
+from conftest import brake_call, output_state, run_call
+
+import nxt.motor
+from nxt.motor import Mode, Port, RegulationMode, RunState
+from nxt.trajectory import PositionTrajectory, SpeedTrajectory, TrajectoryExecutor
+
+
+def test_position_trajectory():
+    tr = PositionTrajectory([(0, 0), (1, 360), (3, 0)])
+    assert tr.duration == 3
+    assert tr.position(-1) == 0
+    assert tr.position(0.5) == 180
+    assert tr.position(2) == 180
+    assert tr.position(4) == 0
+    assert tr.speed(-1) == 0
+    assert tr.speed(0) == 360
+    assert tr.speed(1) == -180
+    assert tr.speed(3) == 0
+
+
+def test_speed_trajectory():
+    tr = SpeedTrajectory([(0, 0), (1, 360), (2, 360), (3, 0)])
+    assert tr.duration == 3
+    assert tr.speed(0.5) == 180
+    assert tr.speed(1.5) == 360
+    assert tr.speed(3) == 0
+    assert tr.position(0) == 0
+    assert tr.position(0.5) == 45
+    assert tr.position(1) == 180
+    assert tr.position(2) == 540
+    assert tr.position(5) == 720
+
+
+def test_trajectory_invalid():
+    with pytest.raises(ValueError):
+        PositionTrajectory([(0, 0)])
+    with pytest.raises(ValueError):
+        SpeedTrajectory([(0, 0), (1, 100), (1, 0)])
+
+
+def test_executor(mbrick, mmotors, mtime):
+    ex = TrajectoryExecutor(period=0.25, brake=False)
+    ex.add(mmotors[0], PositionTrajectory([(0, 0), (1, 450)]))
+    ex.add(mmotors[1], SpeedTrajectory([(0, 0), (0.5, -900)]))
+    ex.run()
+    assert mbrick.mock_calls == [
+        # t = 0
+        run_call(Port.A, 50, regulated=True),
+        run_call(Port.B, 0, regulated=True),
+        # t = 0.25, power for A does not change, not sent.
+        run_call(Port.B, -50, regulated=True),
+        # t = 0.5
+        run_call(Port.B, 0, regulated=True),
+        # t = 1
+        run_call(Port.A, 0, regulated=True),
+        call.set_output_state(
+            Port.A, 0, Mode.IDLE, RegulationMode.IDLE, 0, RunState.IDLE, 0
+        ),
+        call.set_output_state(
+            Port.B, 0, Mode.IDLE, RegulationMode.IDLE, 0, RunState.IDLE, 0
+        ),
+    ]
+    assert mtime.time() == 1.25
+
+
+def test_executor_latency(mbrick, mmotors, mtime):
+    mbrick.latency = 0.2
+    ex = TrajectoryExecutor(period=0.25)
+    ex.add(mmotors[0], PositionTrajectory([(0, 0), (0.5, 450), (1, 450)]))
+    ex.run()
+    # Evaluated 0.1 s ahead, stop command sent at 0.5 - 0.1 = 0.4 s, i.e. at
+    # t = 0.5 as period is 0.25.
+    assert mbrick.mock_calls == [
+        run_call(Port.A, 100, regulated=True),
+        run_call(Port.A, 0, regulated=True),
+        brake_call(Port.A),
+    ]
+
+
+def test_executor_gain(mbrick, mmotors, mtime):
+    positions = iter([0, 0, 90])
+    mbrick.get_output_state.side_effect = lambda port: output_state(
+        port, next(positions)
+    )
+    ex = TrajectoryExecutor(period=0.25, gain=2)
+    ex.add(mmotors[0], PositionTrajectory([(0, 0), (0.25, 90)]))
+    ex.run()
+    assert mbrick.mock_calls == [
+        # Origin.
+        call.get_output_state(Port.A),
+        # t = 0, no error.
+        call.get_output_state(Port.A),
+        run_call(Port.A, 40, regulated=True),
+        # t = 0.25, on target.
+        call.get_output_state(Port.A),
+        run_call(Port.A, 0, regulated=True),
+        brake_call(Port.A),
+    ]
+
+
+def test_executor_stop(mbrick, mmotors, mtime):
+    ex = TrajectoryExecutor()
+    ex.add(mmotors[0], PositionTrajectory([(0, 0), (10, 3600)]))
+    ex.run(stop=lambda: mtime.time() > 1)
+    assert mbrick.mock_calls == [
+        run_call(Port.A, 40, regulated=True),
+        brake_call(Port.A),
+    ]
+
+
+def test_executor_late(mbrick, mmotors, mtime):
+    def set_output_state(*args):
+        # Slow link.
+        mtime.sleep(0.6)
+
+    mbrick.set_output_state.side_effect = set_output_state
+    ex = TrajectoryExecutor(period=0.25)
+    ex.add(mmotors[0], SpeedTrajectory([(0, 900), (1, 0)]))
+    ex.run()
+    # Updates at 0.5 and 1.0 are skipped.
+    assert mbrick.mock_calls == [
+        run_call(Port.A, 100, regulated=True),
+        run_call(Port.A, 25, regulated=True),
+        brake_call(Port.A),
+    ]
+
+
+def test_executor_add(mbrick, mbrick2, mmotors):
+    ex = TrajectoryExecutor()
+    ex.add(mmotors[0], PositionTrajectory([(0, 0), (1, 0)]))
+    with pytest.raises(ValueError):
+        ex.add(mmotors[0], PositionTrajectory([(0, 0), (1, 0)]))
+    mbrick2.get_output_state.return_value = output_state(Port.B, 0)
+    with pytest.raises(ValueError):
+        ex.add(nxt.motor.Motor(mbrick2, Port.B), PositionTrajectory([(0, 0), (1, 0)]))